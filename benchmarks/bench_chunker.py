@@ -0,0 +1,65 @@
+"""청크 분할기 처리량 측정
+
+실행: python -m benchmarks.bench_chunker [--size-mb 8] [--repeat 3]
+"""
+import argparse
+import json
+import random
+import time
+from src.rag.chunker import TextChunker
+
+def make_inputs(size: int) -> dict:
+    rng = random.Random(0)
+    english_words = ["retrieval", "vector", "chunk", "model", "token", "index", "query", "document"]
+    korean_words = ["문서", "검색", "임베딩", "모델", "질문", "답변", "청크", "색인"]
+
+    def prose(words, ender):
+        parts = []
+        length = 0
+        while length < size:
+            sentence = " ".join(rng.choice(words) for _ in range(rng.randint(5, 15))) + ender
+            if rng.random() < 0.1:
+                sentence += "\n\n"
+            parts.append(sentence)
+            length += len(sentence)
+        return "".join(parts)[:size]
+
+    return {
+        "english": prose(english_words, ". "),
+        "korean": prose(korean_words, "입니다. "),
+        # 구분자가 전혀 없는 최악의 경우
+        "no_punctuation": "".join(rng.choice("abcdefghij ") for _ in range(size)),
+    }
+
+def bench(text: str, chunker: TextChunker, repeat: int) -> dict:
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+    best = float("inf")
+    chunks = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = sum(1 for _ in chunker.iter_chunks(text))
+        best = min(best, time.perf_counter() - start)
+    return {"mb": round(size_mb, 2), "seconds": round(best, 4), "mb_per_s": round(size_mb / best, 2), "chunks": chunks}
+
+def main():
+    parser = argparse.ArgumentParser(description="청크 분할기 처리량 측정")
+    parser.add_argument("--size-mb", type=float, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    inputs = make_inputs(int(args.size_mb * 1024 * 1024))
+    configs = {
+        "chars_1000_200": TextChunker(1000, 200, unit="chars"),
+        "tokens_512_64": TextChunker(512, 64, unit="tokens"),
+    }
+    results = {
+        f"{config}/{name}": bench(text, chunker, args.repeat)
+        for config, chunker in configs.items()
+        for name, text in inputs.items()
+    }
+    for key, result in results.items():
+        print(f"{key:40s} {result['mb_per_s']:8.2f} MB/s  ({result['chunks']} chunks, {result['seconds']}s)")
+    print(json.dumps(results, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,524 @@
+"""업로드/검색/채팅 스트리밍 종단 간 벤치마크 (가짜 OpenAI/Anthropic 서버 사용, 네트워크 불필요)
+
+가짜 제공자 서버와 앱(uvicorn)을 각각 별도 프로세스로 띄우고 임시 작업 디렉터리에서
+/documents/upload, /documents/search, /chat/stream을 실제 HTTP로 호출한다.
+처리량, 지연 시간 p50/p95/p99, 첫 토큰까지 걸린 시간(TTFT), 앱 프로세스의 최대 RSS를
+JSON 파일로 저장하므로 버전 간 결과를 비교할 수 있다.
+
+실행: python -m benchmarks.bench_e2e [--output bench_e2e.json] [--baseline 이전결과.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import httpx
+import numpy as np
+from benchmarks.fake_providers import FakeProviderConfig, add_config_arguments, config_from_args, config_to_args
+from src.core.config import model_settings
+
+ROOT = Path(__file__).resolve().parent.parent
+API = "/api/v1"
+OPENAI_MODEL = "gpt-4o"
+ANTHROPIC_MODEL = "claude-3-5-sonnet-20241022"
+
+# 로컬 가짜 서버를 상대로 하므로 분당 요청/토큰 한도는 풀고 동시 호출 수만 설정값 유지
+UNLIMITED_RATE = {"requests_per_minute": 10 ** 9, "tokens_per_minute": 10 ** 12}
+
+_WORDS = ["문서", "검색", "임베딩", "모델", "질문", "답변", "청크", "색인", "벡터", "요약",
+          "retrieval", "vector", "chunk", "model", "token", "index", "query", "latency"]
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def make_document(index: int, size: int) -> bytes:
+    """문서마다 내용이 달라 중복 업로드로 재사용되지 않는 텍스트"""
+    rng = random.Random(index)
+    parts = [f"문서 {index}번\n\n"]
+    length = 0
+    while length < size:
+        sentence = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(6, 14))) + f" {index}-{length}입니다. "
+        if rng.random() < 0.1:
+            sentence += "\n\n"
+        parts.append(sentence)
+        length += len(sentence.encode("utf-8"))
+    return "".join(parts).encode("utf-8")
+
+def make_queries(count: int) -> List[str]:
+    rng = random.Random(1)
+    return [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(2, 5))) for _ in range(count)]
+
+def summarize(values: List[float]) -> Optional[Dict]:
+    """밀리초 단위 요약 통계 (값이 없으면 None)"""
+    if not values:
+        return None
+    data = np.asarray(values, dtype=np.float64) * 1000
+    p50, p95, p99 = np.percentile(data, [50, 95, 99])
+    return {
+        "count": len(values),
+        "mean": round(float(data.mean()), 2),
+        "p50": round(float(p50), 2),
+        "p95": round(float(p95), 2),
+        "p99": round(float(p99), 2),
+        "max": round(float(data.max()), 2)
+    }
+
+class RssSampler:
+    """프로세스와 그 자식 프로세스들의 RSS 합계를 주기적으로 읽어 최댓값 기록 (Linux /proc)"""
+
+    def __init__(self, pid: int, interval: float = 0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def supported(self) -> bool:
+        return os.path.exists(f"/proc/{self.pid}/status")
+
+    def start(self):
+        if self.supported:
+            self._thread.start()
+
+    def stop(self) -> Optional[float]:
+        """최대 RSS(MB) 반환 (측정할 수 없으면 None)"""
+        if not self._thread.is_alive():
+            return None
+        self._stop.set()
+        self._thread.join()
+        # 샘플 사이의 순간 최댓값을 놓치지 않도록 메인 프로세스의 커널 기록 최댓값(VmHWM)과 비교
+        peak = max(self.peak_bytes, _status_kb(self.pid, "VmHWM") * 1024)
+        return round(peak / (1024 * 1024), 1)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            total = sum(_status_kb(pid, "VmRSS") for pid in _process_tree(self.pid)) * 1024
+            self.peak_bytes = max(self.peak_bytes, total)
+
+def _status_kb(pid: int, key: str) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(key + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+def _process_tree(pid: int) -> List[int]:
+    pids = [pid]
+    for current in pids:
+        try:
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return pids
+
+class Servers:
+    """가짜 제공자 서버와 앱 서버 프로세스 (임시 디렉터리를 작업 디렉터리로 사용)"""
+
+    def __init__(self, provider_config: FakeProviderConfig, workdir: Path, app_env: Dict[str, str] = None):
+        self.provider_config = provider_config
+        self.workdir = workdir
+        self.app_env = app_env or {}
+        self.provider_port = free_port()
+        self.app_port = free_port()
+        self.provider: Optional[subprocess.Popen] = None
+        self.app: Optional[subprocess.Popen] = None
+        self.rss: Optional[RssSampler] = None
+
+    @property
+    def app_url(self) -> str:
+        return f"http://127.0.0.1:{self.app_port}"
+
+    @property
+    def provider_url(self) -> str:
+        return f"http://127.0.0.1:{self.provider_port}"
+
+    def start(self):
+        env = {**os.environ, "PYTHONPATH": str(ROOT)}
+        self.provider = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.fake_providers", "--port", str(self.provider_port),
+             *config_to_args(self.provider_config)],
+            cwd=ROOT, env=env
+        )
+        providers = {
+            name: {**limits, **UNLIMITED_RATE}
+            for name, limits in model_settings.gateway_config["providers"].items()
+        }
+        app_env = {
+            **env,
+            "STATIC_PATH": str(ROOT / "static"),
+            "OPENAI_BASE_URL": f"{self.provider_url}/v1",
+            "ANTHROPIC_BASE_URL": self.provider_url,
+            "RAG_EMBEDDING_BACKEND": "openai",
+            "GATEWAY_PROVIDERS": json.dumps(providers),
+            **self.app_env
+        }
+        self._log = open(self.workdir / "server.log", "wb")
+        self.app = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1",
+             "--port", str(self.app_port), "--log-level", "warning"],
+            cwd=self.workdir, env=app_env, stdout=self._log, stderr=subprocess.STDOUT
+        )
+        self.rss = RssSampler(self.app.pid)
+        self.rss.start()
+
+    async def wait_ready(self, client: httpx.AsyncClient, timeout: float = 60.0):
+        deadline = time.monotonic() + timeout
+        for url in (f"{self.provider_url}/stats", f"{self.app_url}{API}/chat/models"):
+            while True:
+                if self.app.poll() is not None:
+                    raise RuntimeError(f"앱 서버가 종료되었습니다 (로그: {self.workdir / 'server.log'})")
+                try:
+                    if (await client.get(url)).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"서버가 준비되지 않았습니다: {url}")
+                await asyncio.sleep(0.2)
+
+    def stop(self) -> Optional[float]:
+        """서버 종료 후 앱 프로세스의 최대 RSS(MB) 반환"""
+        peak = self.rss.stop() if self.rss else None
+        for process in (self.app, self.provider):
+            if process and process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.wait()
+        if self.app is not None:
+            self._log.close()
+        if peak is None:
+            peak = _children_max_rss_mb()
+        return peak
+
+def _children_max_rss_mb() -> Optional[float]:
+    """/proc가 없을 때 종료된 자식 프로세스 중 가장 큰 최대 RSS (가짜 제공자 서버 포함)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # macOS는 바이트, Linux는 KB 단위
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+async def run_concurrently(count: int, concurrency: int, work) -> float:
+    """work(i)를 count번, 최대 concurrency개씩 동시에 실행하고 전체 소요 시간(초) 반환"""
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(count):
+        queue.put_nowait(i)
+
+    async def worker():
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await work(i)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, count))))
+    return time.perf_counter() - started
+
+async def bench_upload(client: httpx.AsyncClient, base: str, count: int, size: int, concurrency: int) -> Dict:
+    """업로드 요청 지연과 수집 완료(파싱, 청크 분할, 임베딩, 저장)까지의 시간"""
+    documents = [make_document(i, size) for i in range(count)]
+    request_latencies, ingest_latencies = [], []
+    chunks = 0
+    errors = 0
+
+    async def upload(i: int):
+        nonlocal chunks, errors
+        started = time.perf_counter()
+        response = await client.post(
+            f"{base}{API}/documents/upload",
+            files={"file": (f"bench_{i}.txt", documents[i], "text/plain")}
+        )
+        request_latencies.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            errors += 1
+            return
+        job_id = response.json()["job_id"]
+        while True:
+            job = (await client.get(f"{base}{API}/documents/jobs/{job_id}")).json()
+            if job["status"] in ("completed", "error", "cancelled"):
+                break
+            await asyncio.sleep(0.05)
+        if job["status"] != "completed":
+            errors += 1
+            return
+        ingest_latencies.append(time.perf_counter() - started)
+        chunks += job.get("chunks_total") or 0
+
+    elapsed = await run_concurrently(count, concurrency, upload)
+    total_mb = sum(len(document) for document in documents) / (1024 * 1024)
+    return {
+        "requests": count,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "documents_per_s": round(len(ingest_latencies) / elapsed, 2),
+        "mb_per_s": round(total_mb / elapsed, 3),
+        "chunks_per_s": round(chunks / elapsed, 1),
+        "request_latency_ms": summarize(request_latencies),
+        "ingest_latency_ms": summarize(ingest_latencies)
+    }
+
+async def bench_search(client: httpx.AsyncClient, base: str, count: int, concurrency: int, mode: Optional[str]) -> Dict:
+    queries = make_queries(count)
+    latencies = []
+    errors = 0
+
+    async def search(i: int):
+        nonlocal errors
+        started = time.perf_counter()
+        response = await client.post(f"{base}{API}/documents/search", json={"query": queries[i], "top_k": 3, "mode": mode})
+        if response.status_code != 200:
+            errors += 1
+            return
+        latencies.append(time.perf_counter() - started)
+
+    elapsed = await run_concurrently(count, concurrency, search)
+    return {
+        "requests": count,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_s": round(len(latencies) / elapsed, 2),
+        "latency_ms": summarize(latencies)
+    }
+
+async def bench_chat(client: httpx.AsyncClient, base: str, model: str, count: int, concurrency: int, rag_enabled: bool) -> Dict:
+    """SSE 스트림을 끝까지 읽으며 첫 token 이벤트까지의 시간과 전체 시간 측정"""
+    questions = make_queries(count)
+    latencies, ttfts = [], []
+    output_tokens = input_tokens = cached_input_tokens = 0
+    errors = 0
+    error_messages = set()
+
+    async def chat(i: int):
+        nonlocal output_tokens, input_tokens, cached_input_tokens, errors
+        payload = {"question": questions[i], "model": model, "rag_enabled": rag_enabled}
+        started = time.perf_counter()
+        first_token = None
+        failed = False
+        event = None
+        async with client.stream("POST", f"{base}{API}/chat/stream", json=payload) as response:
+            if response.status_code != 200:
+                await response.aread()
+                errors += 1
+                error_messages.add(f"HTTP {response.status_code}")
+                return
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    event = line[7:]
+                    if event == "token" and first_token is None:
+                        first_token = time.perf_counter() - started
+                    elif event == "error":
+                        failed = True
+                elif line.startswith("data: ") and event == "usage":
+                    usage = json.loads(line[6:])
+                    output_tokens += usage.get("output_tokens", 0)
+                    input_tokens += usage.get("input_tokens", 0)
+                    cached_input_tokens += usage.get("cached_input_tokens", 0)
+                elif line.startswith("data: ") and event == "error":
+                    error_messages.add(json.loads(line[6:]).get("message"))
+        if failed or first_token is None:
+            errors += 1
+            return
+        latencies.append(time.perf_counter() - started)
+        ttfts.append(first_token)
+
+    elapsed = await run_concurrently(count, concurrency, chat)
+    return {
+        "requests": count,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_s": round(len(latencies) / elapsed, 2),
+        "output_tokens_per_s": round(output_tokens / elapsed, 1),
+        # 입력 토큰 중 프롬프트 캐시에서 읽힌 비율
+        "cache_hit_rate": round(cached_input_tokens / input_tokens, 3) if input_tokens else None,
+        "ttft_ms": summarize(ttfts),
+        "latency_ms": summarize(latencies),
+        # 오류 원인 확인용 (서로 다른 메시지 최대 5개)
+        "error_messages": sorted(error_messages)[:5]
+    }
+
+async def run(args: argparse.Namespace, workdir: Path) -> Dict:
+    provider_config = config_from_args(args)
+    servers = Servers(provider_config, workdir)
+    results: Dict[str, Dict] = {}
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    servers.start()
+    try:
+        async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+            await servers.wait_ready(client)
+            for api_type in ("openai", "anthropic"):
+                await client.post(f"{servers.app_url}{API}/chat/set-api-key", json={"api_type": api_type, "api_key": "bench"})
+
+            results["upload"] = await bench_upload(client, servers.app_url, args.documents, int(args.document_kb * 1024), args.concurrency)
+            results["search"] = await bench_search(client, servers.app_url, args.searches, args.concurrency, args.search_mode)
+            for name, model in (("chat_openai", OPENAI_MODEL), ("chat_anthropic", ANTHROPIC_MODEL)):
+                results[name] = await bench_chat(client, servers.app_url, model, args.chats, args.concurrency, not args.no_rag)
+            provider_stats = (await client.get(f"{servers.provider_url}/stats")).json()
+    finally:
+        peak_rss_mb = servers.stop()
+    # 모든 요청이 실패한 단계는 측정값이 없으므로 무효 (기준 결과로 쓰이지 않도록 표시)
+    for result in results.values():
+        result["valid"] = result["errors"] < result["requests"]
+    return {
+        "valid": all(result["valid"] for result in results.values()),
+        "results": results,
+        "peak_rss_mb": peak_rss_mb,
+        "provider_stats": provider_stats
+    }
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# 비교 출력에 쓰는 지표 (경로, 클수록 좋은지)
+_COMPARED = [
+    (("results", "upload", "documents_per_s"), True),
+    (("results", "upload", "ingest_latency_ms", "p95"), False),
+    (("results", "search", "requests_per_s"), True),
+    (("results", "search", "latency_ms", "p50"), False),
+    (("results", "search", "latency_ms", "p95"), False),
+    (("results", "search", "latency_ms", "p99"), False),
+    (("results", "chat_openai", "ttft_ms", "p50"), False),
+    (("results", "chat_openai", "ttft_ms", "p95"), False),
+    (("results", "chat_openai", "latency_ms", "p95"), False),
+    (("results", "chat_anthropic", "ttft_ms", "p50"), False),
+    (("results", "chat_anthropic", "ttft_ms", "p95"), False),
+    (("results", "chat_anthropic", "latency_ms", "p95"), False),
+    (("peak_rss_mb",), False),
+]
+
+def _lookup(report: Dict, path) -> Optional[float]:
+    value = report
+    for key in path:
+        if not isinstance(value, dict) or value.get(key) is None:
+            return None
+        value = value[key]
+    return value
+
+def _has_errors(report: Dict, phase: str) -> bool:
+    result = report.get("results", {}).get(phase)
+    return result is None or result.get("errors", 0) > 0
+
+def compare(baseline: Dict, current: Dict) -> List[str]:
+    """기준 결과 대비 변화율 (개선이면 +, 악화면 -로 표시)
+
+    어느 한쪽에서라도 오류가 난 단계는 실패한 요청이 지연 시간/처리량을 왜곡하므로 비교하지 않고,
+    무효 단계가 있는 실행끼리는 최대 RSS도 비교하지 않는다.
+    """
+    lines = []
+    skipped = set()
+    for path, higher_is_better in _COMPARED:
+        if path[0] == "results":
+            if _has_errors(baseline, path[1]) or _has_errors(current, path[1]):
+                skipped.add(path[1])
+                continue
+        elif not (baseline.get("valid", True) and current.get("valid", True)):
+            skipped.add(path[0])
+            continue
+        before, after = _lookup(baseline, path), _lookup(current, path)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before * 100 if before else 0.0
+        better = change >= 0 if higher_is_better else change <= 0
+        lines.append(f"{'.'.join(path[1:] if path[0] == 'results' else path):40s} {before:>10} -> {after:>10}  "
+                     f"({change:+.1f}%, {'개선' if better else '악화'})")
+    if skipped:
+        lines.append(f"오류가 있어 비교하지 않음: {', '.join(sorted(skipped))}")
+    return lines
+
+def print_summary(report: Dict):
+    for name, result in report["results"].items():
+        latency = result.get("latency_ms") or result.get("ingest_latency_ms") or {}
+        ttft = result.get("ttft_ms") or {}
+        throughput = result.get("requests_per_s", result.get("documents_per_s"))
+        line = f"{name:16s} {throughput:>8} /s  p50 {latency.get('p50')}ms  p95 {latency.get('p95')}ms  p99 {latency.get('p99')}ms"
+        if ttft:
+            line += f"  TTFT p50 {ttft.get('p50')}ms"
+        if result.get("cache_hit_rate") is not None:
+            line += f"  캐시 적중 {result['cache_hit_rate']:.1%}"
+        if result["errors"]:
+            line += f"  오류 {result['errors']}/{result['requests']}"
+        if not result["valid"]:
+            line += "  (무효)"
+        print(line)
+    print(f"최대 RSS: {report['peak_rss_mb']} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description="업로드/검색/채팅 종단 간 벤치마크 (가짜 제공자 서버 사용)")
+    parser.add_argument("--output", default="bench_e2e.json", help="결과 JSON 파일 경로")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON 파일")
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--document-kb", type=float, default=64)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--search-mode", default=None, help="vector, lexical, hybrid (기본값은 rag.search_mode)")
+    parser.add_argument("--chats", type=int, default=40, help="제공자별 채팅 요청 수")
+    parser.add_argument("--no-rag", action="store_true", help="채팅에서 문서 검색을 끔")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--keep-workdir", action="store_true", help="임시 작업 디렉터리(데이터, 서버 로그)를 남김")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bento_bench_"))
+    try:
+        measured = asyncio.run(run(args, workdir))
+    finally:
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "parameters": {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "keep_workdir")}
+        },
+        **measured
+    }
+    Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print_summary(report)
+    print(f"결과 저장: {args.output}")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        print(f"기준 결과 대비 ({baseline['meta'].get('revision')} -> {report['meta']['revision']}):")
+        if baseline["meta"].get("parameters") != report["meta"]["parameters"]:
+            print("  주의: 기준 결과와 실행 매개변수가 달라 직접 비교하기 어렵습니다")
+        for line in compare(baseline, report):
+            print("  " + line)
+    if not report["valid"]:
+        failed = [name for name, result in report["results"].items() if not result["valid"]]
+        print(f"모든 요청이 실패한 단계가 있어 이 결과는 기준 결과로 쓸 수 없습니다: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+"""OpenAI/Anthropic API를 흉내 내는 로컬 서버 (벤치마크용, 실제 키와 네트워크 불필요)
+
+지원 엔드포인트:
+- OpenAI: POST /v1/embeddings, POST /v1/chat/completions (stream), GET /v1/models/{model}
+- Anthropic: POST /v1/messages (stream), GET /v1/models/{model}
+
+응답 지연, 토큰 생성 속도, 오류 주입(응답 전 429/5xx, 스트림 도중 오류)을 설정할 수 있다.
+프롬프트 캐시도 흉내 내서, 이전 요청과 같은 앞부분은 캐시 토큰으로 보고하고 그만큼 prefill 지연을 줄인다.
+앱에서는 OPENAI_BASE_URL=http://127.0.0.1:<port>/v1, ANTHROPIC_BASE_URL=http://127.0.0.1:<port>로 연결한다.
+
+실행: python -m benchmarks.fake_providers [--port 8900] [--latency-ms 50] [--tokens-per-second 200]
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Tuple
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# 모델 이름으로 알 수 없을 때의 임베딩 차원
+DEFAULT_EMBEDDING_DIMENSION = 1536
+EMBEDDING_DIMENSIONS = {"text-embedding-3-large": 3072}
+
+_WORD = re.compile(r"\w+")
+_OUTPUT_WORDS = ["문서", "검색", "결과", "답변", "모델", "retrieval", "vector", "context", "token", "index"]
+
+@dataclass
+class FakeProviderConfig:
+    latency_ms: float = 50.0  # 첫 바이트까지의 지연 (모든 엔드포인트)
+    jitter_ms: float = 0.0  # 지연에 더하는 0~jitter_ms 사이의 무작위 값
+    tokens_per_second: float = 200.0  # 스트리밍 토큰 생성 속도 (0이면 지연 없이)
+    output_tokens: int = 100  # 응답 하나의 출력 토큰 수
+    error_rate: float = 0.0  # 응답 전에 오류로 답할 확률
+    error_statuses: List[int] = field(default_factory=lambda: [429, 500, 503])
+    retry_after_seconds: float = 0.1  # 429 응답의 retry-after
+    stream_error_rate: float = 0.0  # 스트림 도중 오류 이벤트를 보낼 확률
+    prompt_cache: bool = True  # 이전 요청과 같은 앞부분을 캐시 토큰으로 보고
+    prefill_ms_per_1k_tokens: float = 0.0  # 캐시되지 않은 입력 1천 토큰당 첫 토큰 전 추가 지연
+    seed: int = 0
+
+class FakeProvider:
+    """요청 수와 주입한 오류 수를 세는 가짜 제공자 (같은 seed면 같은 순서로 오류 발생)"""
+
+    def __init__(self, config: FakeProviderConfig):
+        self.config = config
+        self._random = random.Random(config.seed)
+        self.stats: Dict[str, int] = {"requests": 0, "errors": 0, "stream_errors": 0, "cached_input_tokens": 0}
+        self._cached_prefixes = set()
+
+    async def delay(self):
+        jitter = self._random.uniform(0, self.config.jitter_ms) if self.config.jitter_ms else 0.0
+        await asyncio.sleep((self.config.latency_ms + jitter) / 1000)
+
+    def injected_status(self) -> int:
+        """이번 요청에 주입할 오류 상태 코드 (없으면 0)"""
+        self.stats["requests"] += 1
+        if self.config.error_rate and self._random.random() < self.config.error_rate:
+            self.stats["errors"] += 1
+            return self._random.choice(self.config.error_statuses)
+        return 0
+
+    def stream_error_at(self) -> int:
+        """스트림 도중 오류를 보낼 토큰 위치 (없으면 -1)"""
+        if self.config.stream_error_rate and self._random.random() < self.config.stream_error_rate:
+            self.stats["stream_errors"] += 1
+            return self._random.randrange(max(1, self.config.output_tokens))
+        return -1
+
+    def cache_lookup(self, prefixes: List[List], breakpoints: List[bool] = None) -> Tuple[int, int]:
+        """앞부분 목록(짧은 것부터) 중 이전에 기록된 가장 긴 것의 토큰 수와, 새로 기록한 토큰 수
+
+        breakpoints가 참인 앞부분만 캐시에 기록한다 (없으면 전부, 마지막 앞부분은 기록 위치여야 함).
+        실제 제공자의 최소 길이(1024토큰) 제한은 두지 않는다 (벤치마크 프롬프트가 짧아 캐시가 보이지 않으므로).
+        """
+        if not self.config.prompt_cache or not prefixes:
+            return 0, 0
+        read = 0
+        for i, prefix in enumerate(prefixes):
+            key = hashlib.sha256(json.dumps(prefix, ensure_ascii=False).encode("utf-8")).digest()
+            if key in self._cached_prefixes:
+                read = estimate_tokens(prefix)
+            elif breakpoints is None or breakpoints[i]:
+                self._cached_prefixes.add(key)
+        written = max(0, estimate_tokens(prefixes[-1]) - read)
+        self.stats["cached_input_tokens"] += read
+        return read, written
+
+    async def prefill(self, uncached_tokens: int):
+        """캐시되지 않은 입력 처리 시간 (첫 토큰 전에 한 번)"""
+        if self.config.prefill_ms_per_1k_tokens > 0:
+            await asyncio.sleep(uncached_tokens / 1000 * self.config.prefill_ms_per_1k_tokens / 1000)
+
+    def error_headers(self, status: int) -> Dict[str, str]:
+        return {"retry-after": str(self.config.retry_after_seconds)} if status == 429 else {}
+
+    async def tokens(self) -> AsyncIterator[str]:
+        """설정한 속도로 출력 토큰 생성 (토큰마다 sleep하지 않고 예정 시각에 맞춤)"""
+        started = time.perf_counter()
+        rate = self.config.tokens_per_second
+        for i in range(self.config.output_tokens):
+            if rate > 0:
+                wait = started + i / rate - time.perf_counter()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            yield ("" if i == 0 else " ") + _OUTPUT_WORDS[i % len(_OUTPUT_WORDS)]
+
+def estimate_tokens(value) -> int:
+    """메시지/입력 전체의 대략적인 토큰 수 (문자 4개당 1토큰)"""
+    return max(1, len(json.dumps(value, ensure_ascii=False)) // 4)
+
+def anthropic_cache_prefixes(system, messages) -> Tuple[List[List], List[bool]]:
+    """마지막 cache_control 표시까지 메시지 경계마다의 앞부분과, 각 앞부분이 표시 위치인지 여부
+
+    실제 API처럼 표시 위치보다 앞선 경계에서도 이전 턴의 캐시를 찾는다.
+    표시가 턴마다 옮겨가도 같은 내용이면 같게 비교되도록 표시를 빼고 텍스트 블록으로 정규화한다.
+    """
+    def blocks(content) -> List[Dict]:
+        if isinstance(content, str):
+            return [{"type": "text", "text": content}]
+        return [{key: value for key, value in block.items() if key != "cache_control"} for block in content]
+
+    def marked(content) -> bool:
+        return isinstance(content, list) and any("cache_control" in block for block in content)
+
+    system = system or []
+    messages = messages or []
+    prefixes, breakpoints = [[blocks(system)]], [marked(system)]
+    for message in messages:
+        prefixes.append(prefixes[-1] + [{"role": message["role"], "content": blocks(message["content"])}])
+        breakpoints.append(marked(message.get("content")))
+    if True not in breakpoints:
+        return [], []
+    last = len(breakpoints) - 1 - breakpoints[::-1].index(True)
+    return prefixes[:last + 1], breakpoints[:last + 1]
+
+def embed_text(text: str, dimension: int) -> np.ndarray:
+    """단어 해싱 임베딩 (같은 단어를 가진 텍스트끼리 유사하도록 해서 검색 결과가 의미를 갖게 함)"""
+    vector = np.zeros(dimension, dtype=np.float32)
+    for word in _WORD.findall(text.lower()):
+        vector[zlib.crc32(word.encode("utf-8")) % dimension] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def sse(data: Dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def create_app(config: FakeProviderConfig = None) -> FastAPI:
+    provider = FakeProvider(config or FakeProviderConfig())
+    app = FastAPI(title="fake providers")
+    app.state.provider = provider
+
+    def openai_error(status: int) -> JSONResponse:
+        return JSONResponse(
+            {"error": {"message": f"injected error {status}", "type": "server_error", "code": None}},
+            status_code=status, headers=provider.error_headers(status)
+        )
+
+    def anthropic_error(status: int) -> JSONResponse:
+        kind = "rate_limit_error" if status == 429 else "api_error"
+        return JSONResponse(
+            {"type": "error", "error": {"type": kind, "message": f"injected error {status}"}},
+            status_code=status, headers=provider.error_headers(status)
+        )
+
+    @app.get("/stats")
+    async def stats():
+        return provider.stats
+
+    @app.get("/v1/models/{model}")
+    async def retrieve_model(model: str, request: Request):
+        if "anthropic-version" in request.headers:
+            return {"id": model, "type": "model", "display_name": model, "created_at": "2024-01-01T00:00:00Z"}
+        return {"id": model, "object": "model", "created": 0, "owned_by": "bench"}
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        await provider.delay()
+        status = provider.injected_status()
+        if status:
+            return openai_error(status)
+        inputs = body["input"]
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dimension = body.get("dimensions") or EMBEDDING_DIMENSIONS.get(body.get("model"), DEFAULT_EMBEDDING_DIMENSION)
+        base64_format = body.get("encoding_format") == "base64"
+        data = []
+        for index, text in enumerate(inputs):
+            vector = embed_text(text if isinstance(text, str) else " ".join(map(str, text)), dimension)
+            embedding = base64.b64encode(vector.tobytes()).decode("ascii") if base64_format else vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        tokens = sum(estimate_tokens(text) for text in inputs)
+        return {
+            "object": "list", "data": data, "model": body.get("model"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await provider.delay()
+        status = provider.injected_status()
+        if status:
+            return openai_error(status)
+        model = body.get("model")
+        messages = body.get("messages") or []
+        prompt_tokens = estimate_tokens(messages)
+        # OpenAI는 표시 없이 자동으로 앞부분을 캐시하므로 메시지 단위 앞부분을 모두 후보로 봄
+        cached_tokens, _ = provider.cache_lookup([messages[:i] for i in range(1, len(messages))])
+        cached_tokens = min(cached_tokens, prompt_tokens)
+        usage = {
+            "prompt_tokens": prompt_tokens, "completion_tokens": provider.config.output_tokens,
+            "total_tokens": prompt_tokens + provider.config.output_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens}
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        def chunk(delta: Dict, finish_reason: str = None) -> Dict:
+            return {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+
+        if not body.get("stream"):
+            await provider.prefill(prompt_tokens - cached_tokens)
+            text = "".join([token async for token in provider.tokens()])
+            return {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage
+            }
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+        error_at = provider.stream_error_at()
+
+        async def stream():
+            await provider.prefill(prompt_tokens - cached_tokens)
+            yield sse(chunk({"role": "assistant", "content": ""}))
+            position = 0
+            async for token in provider.tokens():
+                if position == error_at:
+                    yield sse({"error": {"message": "injected stream error", "type": "server_error", "code": None}})
+                    return
+                yield sse(chunk({"content": token}))
+                position += 1
+            yield sse(chunk({}, "stop"))
+            if include_usage:
+                yield sse({
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [], "usage": usage
+                })
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        await provider.delay()
+        status = provider.injected_status()
+        if status:
+            return anthropic_error(status)
+        model = body.get("model")
+        total_tokens = estimate_tokens([body.get("system"), body.get("messages")])
+        cache_read, cache_write = provider.cache_lookup(*anthropic_cache_prefixes(body.get("system"), body.get("messages")))
+        # input_tokens는 캐시 읽기/기록을 뺀 나머지
+        cache_read = min(cache_read, total_tokens)
+        cache_write = min(cache_write, total_tokens - cache_read)
+        input_tokens = max(1, total_tokens - cache_read - cache_write)
+        usage = {"input_tokens": input_tokens, "cache_creation_input_tokens": cache_write, "cache_read_input_tokens": cache_read}
+        message_id = f"msg_{uuid.uuid4().hex[:12]}"
+
+        if not body.get("stream"):
+            await provider.prefill(total_tokens - cache_read)
+            text = "".join([token async for token in provider.tokens()])
+            return {
+                "id": message_id, "type": "message", "role": "assistant", "model": model,
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn", "stop_sequence": None,
+                "usage": {**usage, "output_tokens": provider.config.output_tokens}
+            }
+
+        error_at = provider.stream_error_at()
+
+        async def stream():
+            await provider.prefill(total_tokens - cache_read)
+            yield sse({
+                "type": "message_start",
+                "message": {
+                    "id": message_id, "type": "message", "role": "assistant", "model": model, "content": [],
+                    "stop_reason": None, "stop_sequence": None,
+                    "usage": {**usage, "output_tokens": 1}
+                }
+            }, "message_start")
+            yield sse({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}, "content_block_start")
+            yield sse({"type": "ping"}, "ping")
+            position = 0
+            async for token in provider.tokens():
+                if position == error_at:
+                    yield sse({"type": "error", "error": {"type": "overloaded_error", "message": "injected stream error"}}, "error")
+                    return
+                yield sse({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": token}}, "content_block_delta")
+                position += 1
+            yield sse({"type": "content_block_stop", "index": 0}, "content_block_stop")
+            yield sse({
+                "type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": provider.config.output_tokens}
+            }, "message_delta")
+            yield sse({"type": "message_stop"}, "message_stop")
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """가짜 제공자 설정 인자 (bench_e2e와 공유)"""
+    defaults = FakeProviderConfig()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms, help="첫 바이트까지의 지연")
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--output-tokens", type=int, default=defaults.output_tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="응답 전 429/5xx 확률")
+    parser.add_argument("--stream-error-rate", type=float, default=defaults.stream_error_rate, help="스트림 도중 오류 확률")
+    parser.add_argument("--prompt-cache", action=argparse.BooleanOptionalAction, default=defaults.prompt_cache,
+                        help="이전 요청과 같은 앞부분을 캐시 토큰으로 보고")
+    parser.add_argument("--prefill-ms-per-1k-tokens", type=float, default=defaults.prefill_ms_per_1k_tokens,
+                        help="캐시되지 않은 입력 1천 토큰당 첫 토큰 전 지연")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+def config_from_args(args: argparse.Namespace) -> FakeProviderConfig:
+    return FakeProviderConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        error_rate=args.error_rate,
+        stream_error_rate=args.stream_error_rate,
+        prompt_cache=args.prompt_cache,
+        prefill_ms_per_1k_tokens=args.prefill_ms_per_1k_tokens,
+        seed=args.seed
+    )
+
+def config_to_args(config: FakeProviderConfig) -> List[str]:
+    return [
+        "--latency-ms", str(config.latency_ms),
+        "--jitter-ms", str(config.jitter_ms),
+        "--tokens-per-second", str(config.tokens_per_second),
+        "--output-tokens", str(config.output_tokens),
+        "--error-rate", str(config.error_rate),
+        "--stream-error-rate", str(config.stream_error_rate),
+        "--prompt-cache" if config.prompt_cache else "--no-prompt-cache",
+        "--prefill-ms-per-1k-tokens", str(config.prefill_ms_per_1k_tokens),
+        "--seed", str(config.seed),
+    ]
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI/Anthropic 가짜 API 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import math
+from typing import Dict, List
+from src.core.config import model_settings
+from src.rag.tokens import estimate_tokens
+
+# 메시지마다 붙는 역할/구분자 토큰 (대략치)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# 요약에 넣는 이전 질문 하나의 최대 길이 (문자)
+SUMMARY_QUESTION_CHARS = 80
+
+def message_tokens(message: Dict) -> int:
+    """메시지 토큰 수 - 한 번 계산하면 메시지에 저장해 다음 턴에 재사용"""
+    tokens = message.get("tokens")
+    if tokens is None:
+        tokens = estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+        message["tokens"] = tokens
+    return tokens
+
+def format_context(documents: List[Dict]) -> str:
+    return "\n\n".join(f"참고 문서:\n{doc['content']}" for doc in documents)
+
+def format_question(question: str, documents: List[Dict]) -> str:
+    """검색 문서는 매 턴 달라지므로 시스템 프롬프트가 아닌 현재 질문 앞에 붙임"""
+    if not documents:
+        return question
+    return f"{format_context(documents)}\n\n질문: {question}"
+
+class ContextBuilder:
+    """모델별 입력 토큰 예산 안에서 시스템 프롬프트, 검색 문서, 대화 기록을 조립
+
+    예산은 현재 질문과 시스템 프롬프트에 먼저 배정하고, 남은 예산의 일부를 검색 문서에
+    (검색 순위 순으로 들어가는 만큼) 배정한 뒤 나머지를 최근 대화부터 채운다.
+    들어가지 못한 오래된 턴은 버리고, 그 질문들만 짧게 모아 요약 한 줄로 남긴다.
+
+    프롬프트 캐싱을 위해 [시스템 프롬프트 + 대화 기록] 앞부분은 턴이 바뀌어도 바이트 단위로
+    동일하게 유지한다. 매 턴 달라지는 검색 문서는 마지막 사용자 메시지에 넣고, 오래된 턴은
+    drop_step 턴 단위로 한꺼번에 생략해 생략 경계가 매 턴 움직이지 않도록 한다.
+    """
+
+    def __init__(self, rag_ratio: float = None, summary_tokens: int = None, default_budget: int = None,
+                 drop_step: int = None):
+        self.rag_ratio = rag_ratio if rag_ratio is not None else model_settings.CHAT_CONTEXT_RAG_RATIO
+        self.summary_tokens = summary_tokens if summary_tokens is not None else model_settings.CHAT_CONTEXT_SUMMARY_TOKENS
+        self.default_budget = default_budget or model_settings.CHAT_INPUT_TOKEN_BUDGET
+        self.drop_step = max(1, drop_step or model_settings.CHAT_CONTEXT_DROP_STEP)
+
+    def budget_for(self, model_config: Dict) -> int:
+        return model_config.get("input_token_budget", self.default_budget)
+
+    def build(self, model_config: Dict, question: str, history: List[Dict] = None,
+              documents: List[Dict] = None) -> Dict:
+        """요청 메시지 목록과 사용한 토큰/문서/턴 수 반환"""
+        history = history or []
+        documents = documents or []
+        budget = self.budget_for(model_config)
+        template = model_config.get("system_prompt", "{context}")
+        question_message = {"role": "user", "content": question}
+
+        base_prompt = template.format(context="").strip()
+        used = message_tokens(question_message) + estimate_tokens(base_prompt) + MESSAGE_OVERHEAD_TOKENS
+        remaining = max(0, budget - used)
+
+        # 검색 문서 - 순위가 높은 문서부터 예산 안에 들어가는 만큼만 포함
+        context_budget = int(remaining * self.rag_ratio) if history else remaining
+        selected = []
+        context_tokens = 0
+        for doc in documents:
+            tokens = estimate_tokens(doc["content"]) + MESSAGE_OVERHEAD_TOKENS
+            if context_tokens + tokens > context_budget:
+                continue
+            selected.append(doc)
+            context_tokens += tokens
+        remaining -= context_tokens
+        used += context_tokens
+
+        # 대화 기록 - 최근 턴부터 거꾸로 채움 (user/assistant 쌍이 나뉘지 않도록 턴 단위)
+        turns = self._turns(history)
+        # 기록이 다 들어가지 않으면 생략된 턴 요약 자리를 먼저 확보
+        reserve = 0
+        if sum(message_tokens(message) for message in history) > remaining:
+            reserve = min(self.summary_tokens, remaining)
+            remaining -= reserve
+        start = len(turns)
+        history_tokens = 0
+        while start > 0:
+            tokens = sum(message_tokens(message) for message in turns[start - 1])
+            if history_tokens + tokens > remaining:
+                break
+            history_tokens += tokens
+            start -= 1
+        if start > 0:
+            # 생략 경계를 drop_step 배수로 맞춰 다음 몇 턴 동안 앞부분이 바뀌지 않게 함
+            # (들어가는 턴이 있으면 맞추느라 가장 최근 턴까지 버리지는 않음)
+            aligned = math.ceil(start / self.drop_step) * self.drop_step
+            aligned = max(start, min(aligned, len(turns) - 1))
+            history_tokens -= sum(message_tokens(message) for turn in turns[start:aligned] for message in turn)
+            start = aligned
+        kept = turns[start:]
+        dropped = turns[:start]
+        remaining -= history_tokens
+        used += history_tokens
+
+        system_prompt = base_prompt
+        summary = self._summarize(dropped, reserve) if dropped else ""
+        if summary:
+            system_prompt = f"{system_prompt}\n\n{summary}" if system_prompt else summary
+            used += estimate_tokens(summary)
+
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        for turn in kept:
+            messages.extend({"role": message["role"], "content": message["content"]} for message in turn)
+        messages.append({"role": "user", "content": format_question(question, selected)})
+
+        return {
+            "messages": messages,
+            "system_prompt": system_prompt,
+            "documents": selected,
+            "input_tokens": used,
+            "budget": budget,
+            "history_turns": len(kept),
+            "dropped_turns": len(dropped)
+        }
+
+    @staticmethod
+    def _turns(history: List[Dict]) -> List[List[Dict]]:
+        """user 메시지로 시작하는 턴 단위로 묶음"""
+        turns = []
+        for message in history:
+            if message["role"] == "user" or not turns:
+                turns.append([message])
+            else:
+                turns[-1].append(message)
+        return turns
+
+    @staticmethod
+    def _summarize(turns: List[List[Dict]], budget: int) -> str:
+        """잘려 나간 턴의 질문만 최근 것부터 예산 안에서 모은 요약 (모델 호출 없음)"""
+        if budget <= MESSAGE_OVERHEAD_TOKENS:
+            return ""
+        header = f"(앞선 대화 {len(turns)}턴은 생략되었습니다. 당시 사용자 질문:"
+        lines = []
+        used = estimate_tokens(header) + 1
+        for turn in reversed(turns):
+            question = next((m["content"] for m in turn if m["role"] == "user"), "")
+            line = "- " + " ".join(question.split())[:SUMMARY_QUESTION_CHARS]
+            tokens = estimate_tokens(line)
+            if used + tokens > budget:
+                break
+            lines.append(line)
+            used += tokens
+        if not lines:
+            return ""
+        lines.reverse()
+        return "\n".join([header, *lines]) + ")"
@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from src.core.config import model_settings
+
+logger = logging.getLogger(__name__)
+
+def message_size(message: Dict) -> int:
+    """메모리 상한 계산용 메시지 크기 (대략적인 바이트 수)"""
+    return sys.getsizeof(message.get("content", "")) + 64
+
+class ConversationStore(ABC):
+    """대화 기록 저장소 인터페이스
+
+    대화는 메시지 딕셔너리({"role", "content"}) 목록이며 새 턴은 append로 뒤에만 추가된다.
+    """
+
+    @abstractmethod
+    async def get(self, conversation_id: str) -> List[Dict]:
+        """대화의 메시지 목록 (없으면 빈 목록)"""
+
+    @abstractmethod
+    async def append(self, conversation_id: str, messages: List[Dict]):
+        """대화 끝에 메시지 추가"""
+
+    @abstractmethod
+    async def delete(self, conversation_id: str):
+        """대화 삭제"""
+
+    def stats(self) -> Dict:
+        return {}
+
+    async def close(self):
+        pass
+
+class MemoryConversationStore(ConversationStore):
+    """프로세스 메모리 저장소 - LRU + 유휴 시간(TTL) + 전체 메모리 상한으로 제거"""
+
+    def __init__(self, max_conversations: int = None, ttl_seconds: float = None, memory_limit_mb: float = None):
+        self.max_conversations = max_conversations or model_settings.CHAT_HISTORY_MAX_CONVERSATIONS
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else model_settings.CHAT_HISTORY_TTL_SECONDS
+        self.memory_limit = (memory_limit_mb or model_settings.CHAT_HISTORY_MEMORY_MB) * 1024 * 1024
+        # conversation_id -> 메시지 목록 (앞쪽이 가장 오래 사용하지 않은 대화)
+        self._conversations: "OrderedDict[str, List[Dict]]" = OrderedDict()
+        self._accessed: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
+        self._memory_bytes = 0
+        self.evictions = 0
+
+    def peek(self, conversation_id: str) -> Optional[List[Dict]]:
+        """메모리에 있는 대화만 반환 (없거나 만료되면 None)"""
+        messages = self._conversations.get(conversation_id)
+        if messages is None:
+            return None
+        if self.ttl_seconds and time.monotonic() - self._accessed[conversation_id] > self.ttl_seconds:
+            self._remove(conversation_id)
+            self.evictions += 1
+            return None
+        self._touch(conversation_id)
+        return messages
+
+    def put(self, conversation_id: str, messages: List[Dict]):
+        if conversation_id in self._conversations:
+            self._remove(conversation_id)
+        self._conversations[conversation_id] = messages
+        self._sizes[conversation_id] = sum(message_size(message) for message in messages)
+        self._memory_bytes += self._sizes[conversation_id]
+        self._touch(conversation_id)
+        self._evict()
+
+    def extend(self, conversation_id: str, messages: List[Dict]):
+        current = self._conversations.get(conversation_id)
+        if current is None:
+            self.put(conversation_id, list(messages))
+            return
+        current.extend(messages)
+        added = sum(message_size(message) for message in messages)
+        self._sizes[conversation_id] += added
+        self._memory_bytes += added
+        self._touch(conversation_id)
+        self._evict()
+
+    def _touch(self, conversation_id: str):
+        self._accessed[conversation_id] = time.monotonic()
+        self._conversations.move_to_end(conversation_id)
+
+    def _remove(self, conversation_id: str):
+        self._conversations.pop(conversation_id, None)
+        self._accessed.pop(conversation_id, None)
+        self._memory_bytes -= self._sizes.pop(conversation_id, 0)
+
+    def _evict(self):
+        """오래 사용하지 않은 대화부터 제거 (가장 최근 대화 하나는 남김)"""
+        now = time.monotonic()
+        while len(self._conversations) > 1:
+            oldest = next(iter(self._conversations))
+            expired = self.ttl_seconds and now - self._accessed[oldest] > self.ttl_seconds
+            if not expired and len(self._conversations) <= self.max_conversations and self._memory_bytes <= self.memory_limit:
+                break
+            self._remove(oldest)
+            self.evictions += 1
+
+    async def get(self, conversation_id: str) -> List[Dict]:
+        return list(self.peek(conversation_id) or [])
+
+    async def append(self, conversation_id: str, messages: List[Dict]):
+        self.extend(conversation_id, messages)
+
+    async def delete(self, conversation_id: str):
+        self._remove(conversation_id)
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "memory",
+            "conversations": len(self._conversations),
+            "memory_bytes": self._memory_bytes,
+            "memory_limit_bytes": self.memory_limit,
+            "evictions": self.evictions
+        }
+
+class SQLiteConversationStore(ConversationStore):
+    """SQLite 저장소 - 메시지를 행 단위로 추가만 하고, 최근 대화는 메모리 LRU에 보관
+
+    대화 기록은 처음 접근할 때 디스크에서 읽어오며, 새 턴은 해당 메시지 행만 INSERT한다.
+    보관 기간이 지난 대화는 시작 시 삭제된다.
+    """
+
+    def __init__(self, path: str = None, cache: MemoryConversationStore = None, retention_days: int = None):
+        self.path = path or model_settings.CHAT_HISTORY_PATH
+        self.cache = cache or MemoryConversationStore()
+        self.retention_days = retention_days if retention_days is not None else model_settings.CHAT_HISTORY_RETENTION_DAYS
+        self._lock = threading.RLock()
+        self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """처음 사용할 때 DB를 열고 보관 기간이 지난 대화를 정리"""
+        with self._lock:
+            if self._conn is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS messages ("
+                    "conversation_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, "
+                    "content TEXT NOT NULL, created_at TEXT, PRIMARY KEY (conversation_id, seq))"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS conversations ("
+                    "id TEXT PRIMARY KEY, message_count INTEGER NOT NULL, updated_at TEXT)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS conversations_updated ON conversations (updated_at)")
+                conn.commit()
+                self._conn = conn
+                self._purge_expired()
+        return self._conn
+
+    def _purge_expired(self):
+        if not self.retention_days:
+            return
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        with self._lock:
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT id FROM conversations WHERE updated_at < ?", (cutoff,)
+            )]
+            for conversation_id in expired:
+                self._conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+                self._conn.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+            self._conn.commit()
+        if expired:
+            logger.info("보관 기간이 지난 대화 %d개 삭제", len(expired))
+
+    def _load(self, conversation_id: str) -> List[Dict]:
+        conn = self.conn
+        with self._lock:
+            rows = conn.execute(
+                "SELECT role, content FROM messages WHERE conversation_id = ? ORDER BY seq",
+                (conversation_id,)
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def _insert(self, conversation_id: str, messages: List[Dict]):
+        now = datetime.now().isoformat()
+        conn = self.conn
+        with self._lock:
+            row = conn.execute(
+                "SELECT message_count FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+            start = row[0] if row else 0
+            conn.executemany(
+                "INSERT INTO messages (conversation_id, seq, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (conversation_id, start + i, message["role"], message["content"], now)
+                    for i, message in enumerate(messages)
+                ]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO conversations (id, message_count, updated_at) VALUES (?, ?, ?)",
+                (conversation_id, start + len(messages), now)
+            )
+            conn.commit()
+
+    def _delete(self, conversation_id: str):
+        conn = self.conn
+        with self._lock:
+            conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+            conn.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+            conn.commit()
+
+    async def get(self, conversation_id: str) -> List[Dict]:
+        messages = self.cache.peek(conversation_id)
+        if messages is None:
+            messages = await asyncio.to_thread(self._load, conversation_id)
+            self.cache.put(conversation_id, messages)
+        return list(messages)
+
+    async def append(self, conversation_id: str, messages: List[Dict]):
+        await asyncio.to_thread(self._insert, conversation_id, messages)
+        # 메모리에 올라와 있는 대화만 갱신 (없으면 다음 조회 시 디스크에서 읽음)
+        if self.cache.peek(conversation_id) is not None:
+            self.cache.extend(conversation_id, messages)
+
+    async def delete(self, conversation_id: str):
+        await self.cache.delete(conversation_id)
+        await asyncio.to_thread(self._delete, conversation_id)
+
+    def stats(self) -> Dict:
+        return {**self.cache.stats(), "backend": "sqlite", "path": self.path}
+
+    async def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+def create_conversation_store() -> ConversationStore:
+    """chat.history_backend 설정에 따라 저장소 생성"""
+    backend = model_settings.CHAT_HISTORY_BACKEND
+    if backend == "memory":
+        return MemoryConversationStore()
+    if backend == "sqlite":
+        return SQLiteConversationStore()
+    raise ValueError(f"지원하지 않는 대화 저장소입니다: {backend}")
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
+from src.rag.models import SearchFilters
 
 class Message(BaseModel):
     role: str
@@ -11,6 +12,7 @@ class ChatRequest(BaseModel):
     context_enabled: bool = False
     rag_enabled: bool = False
     conversation_id: Optional[str] = None
+    filters: Optional[SearchFilters] = None  # RAG 검색 범위를 제한하는 메타데이터 조건
 
 class ChatResponse(BaseModel):
     content: str
\ No newline at end of file
@@ -0,0 +1,83 @@
+import logging
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Anthropic 프롬프트 캐시 구간 표시 (5분 유지)
+CACHE_CONTROL = {"type": "ephemeral"}
+
+def build_anthropic_request(messages: List[Dict], cache: bool = True) -> Dict:
+    """OpenAI 형식 메시지 목록을 Anthropic 요청 인자(system, messages)로 변환
+
+    cache가 참이면 시스템 프롬프트와 마지막 질문 직전 메시지(이전 턴까지의 대화 끝)에
+    캐시 구간을 표시한다. 다음 턴에는 이 앞부분이 그대로 다시 전송되므로 캐시에서 읽힌다.
+    """
+    system = "\n\n".join(message["content"] for message in messages if message["role"] == "system")
+    body = [
+        {"role": message["role"], "content": message["content"]}
+        for message in messages if message["role"] != "system"
+    ]
+    request = {"messages": body}
+    if system:
+        block = {"type": "text", "text": system}
+        if cache:
+            block["cache_control"] = CACHE_CONTROL
+        request["system"] = [block]
+    if cache and len(body) >= 2:
+        previous = body[-2]
+        body[-2] = {
+            "role": previous["role"],
+            "content": [{"type": "text", "text": previous["content"], "cache_control": CACHE_CONTROL}]
+        }
+    return request
+
+def anthropic_usage(usage) -> Dict:
+    """Anthropic 응답 usage -> 공통 형식 (input_tokens는 캐시 읽기/쓰기를 제외한 값이므로 합산)"""
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+    cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+    uncached = getattr(usage, "input_tokens", None) or 0
+    return {
+        "input_tokens": uncached + cache_read + cache_write,
+        "cached_input_tokens": cache_read,
+        "cache_write_tokens": cache_write,
+        "output_tokens": getattr(usage, "output_tokens", None) or 0
+    }
+
+def openai_usage(usage) -> Dict:
+    """OpenAI 응답 usage -> 공통 형식 (프롬프트 캐시는 1024토큰 이상에서 자동 적용됨)"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "input_tokens": getattr(usage, "prompt_tokens", None) or 0,
+        "cached_input_tokens": (getattr(details, "cached_tokens", None) or 0) if details else 0,
+        "cache_write_tokens": 0,
+        "output_tokens": getattr(usage, "completion_tokens", None) or 0
+    }
+
+class UsageTracker:
+    """모델별 입력(캐시 적중/미적중)·출력 토큰 누적 집계"""
+
+    FIELDS = ("input_tokens", "cached_input_tokens", "cache_write_tokens", "output_tokens")
+
+    def __init__(self):
+        self._totals: Dict[str, Dict[str, int]] = {}
+
+    def record(self, model: str, usage: Dict):
+        totals = self._totals.setdefault(model, {"requests": 0, **{field: 0 for field in self.FIELDS}})
+        totals["requests"] += 1
+        for field in self.FIELDS:
+            totals[field] += usage.get(field, 0)
+        logger.debug(
+            "토큰 사용량 (%s): 입력 %d (캐시 적중 %d, 캐시 기록 %d), 출력 %d",
+            model, usage["input_tokens"], usage["cached_input_tokens"], usage["cache_write_tokens"],
+            usage["output_tokens"]
+        )
+
+    def stats(self) -> Dict:
+        return {
+            model: {
+                **totals,
+                "uncached_input_tokens": totals["input_tokens"] - totals["cached_input_tokens"],
+                "cache_hit_rate": totals["cached_input_tokens"] / totals["input_tokens"] if totals["input_tokens"] else 0.0
+            }
+            for model, totals in self._totals.items()
+        }
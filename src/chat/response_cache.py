@@ -0,0 +1,125 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from itertools import count
+from typing import Dict, Iterable, List, Optional, Set
+import numpy as np
+from src.core.config import model_settings
+
+def documents_fingerprint(documents: List[Dict]) -> str:
+    """검색된 청크 ID 집합의 지문 (같은 문서 조각으로 답한 경우에만 캐시 재사용)"""
+    ids = sorted(doc.get("id") or "" for doc in documents)
+    return hashlib.sha1("\0".join(ids).encode()).hexdigest()
+
+class ResponseCache:
+    """질문 임베딩 유사도 기반 응답 캐시
+
+    (모델, 임베딩 모델, 검색 청크 지문)이 같은 항목 중 질문 임베딩의 코사인 유사도가
+    임계값 이상인 답변을 재사용한다. 항목은 TTL과 최대 개수(LRU)로 제거되며, 답변에 사용된
+    문서가 변경/삭제되면 즉시 무효화된다.
+    """
+
+    def __init__(self, ttl_seconds: float = None, max_entries: int = None, threshold: float = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else model_settings.CHAT_RESPONSE_CACHE_TTL_SECONDS
+        self.max_entries = max_entries or model_settings.CHAT_RESPONSE_CACHE_MAX_ENTRIES
+        self.threshold = threshold if threshold is not None else model_settings.RAG_SIMILARITY_THRESHOLD
+        self._lock = threading.Lock()
+        self._ids = count()
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._buckets: Dict[tuple, Set[int]] = {}
+        self._by_source: Dict[str, Set[int]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(vector: Iterable[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, model: str, embedding_model: str, vector: Iterable[float], fingerprint: str) -> Optional[str]:
+        """임계값 이상으로 가장 유사한 질문의 답변 (없으면 None)"""
+        query = self._normalize(vector)
+        with self._lock:
+            candidates = self._live_candidates((model, embedding_model, fingerprint))
+            if candidates:
+                matrix = np.stack([self._entries[entry_id]["vector"] for entry_id in candidates])
+                scores = matrix @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry_id = candidates[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return self._entries[entry_id]["answer"]
+            self.misses += 1
+            return None
+
+    def store(self, model: str, embedding_model: str, vector: Iterable[float], fingerprint: str,
+              sources: Iterable[str], answer: str):
+        entry_id = next(self._ids)
+        key = (model, embedding_model, fingerprint)
+        sources = set(sources)
+        with self._lock:
+            self._entries[entry_id] = {
+                "key": key,
+                "vector": self._normalize(vector),
+                "sources": sources,
+                "answer": answer,
+                "created": time.monotonic()
+            }
+            self._buckets.setdefault(key, set()).add(entry_id)
+            for source in sources:
+                self._by_source.setdefault(source, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_source(self, source: str):
+        """문서가 변경/삭제되면 그 문서를 참고한 답변 제거"""
+        with self._lock:
+            entry_ids = self._by_source.pop(source, set())
+            for entry_id in entry_ids:
+                self._remove(entry_id)
+            self.invalidations += len(entry_ids)
+
+    def _live_candidates(self, key: tuple) -> List[int]:
+        """같은 키의 항목 중 만료되지 않은 것 (만료된 항목은 이때 제거, 나머지는 LRU로 제거됨)"""
+        candidates = list(self._buckets.get(key, ()))
+        if not self.ttl_seconds:
+            return candidates
+        deadline = time.monotonic() - self.ttl_seconds
+        live = []
+        for entry_id in candidates:
+            if self._entries[entry_id]["created"] < deadline:
+                self._remove(entry_id)
+            else:
+                live.append(entry_id)
+        return live
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        bucket = self._buckets.get(entry["key"])
+        if bucket is not None:
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._buckets[entry["key"]]
+        for source in entry["sources"]:
+            ids = self._by_source.get(source)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._by_source[source]
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": True,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "invalidations": self.invalidations
+        }
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from typing import Dict
 
 from fastapi.responses import StreamingResponse
@@ -7,6 +7,8 @@ from anthropic import AsyncAnthropic
 from pydantic import BaseModel
 from src.core.config import settings, model_settings
 from src.core.state import chat_service
+from src.core.gateway import gateway_stats, get_gateway
+from .sse import stream_events
 
 class APIKeyRequest(BaseModel):
     api_type: str 
@@ -15,23 +17,26 @@ class APIKeyRequest(BaseModel):
 router = APIRouter()
 
 @router.post("/chat/stream")
-async def chat_stream(request: ChatRequest):
-    """스트리밍 응답을 위한 엔드포인트"""
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """스트리밍 응답을 위한 엔드포인트 (SSE: sources, token, usage, error, done 이벤트)"""
     # 모델 유효성 검사
     if not model_settings.is_openai_model(request.model) and not model_settings.is_anthropic_model(request.model):
         raise HTTPException(status_code=400, detail=f"지원하지 않는 모델입니다: {request.model}")
 
-    async def generate():
-        async for chunk in chat_service.generate_response(request):
-            yield chunk
+    # 제공자 대기열이 가득 차 있으면 스트림을 열지 않고 바로 503
+    gateway = get_gateway("openai" if model_settings.is_openai_model(request.model) else "anthropic")
+    if gateway.saturated():
+        raise HTTPException(status_code=503, detail="요청이 많아 잠시 후 다시 시도해주세요", headers={"Retry-After": "1"})
 
     return StreamingResponse(
-        generate(),
+        stream_events(chat_service.generate_response(request), http_request.is_disconnected),
         media_type='text/event-stream',
         headers={
             'Cache-Control': 'no-cache',
             'Connection': 'keep-alive',
             'Content-Type': 'text/event-stream',
+            # 프록시가 응답을 모아 두지 않고 바로 전달하도록 함
+            'X-Accel-Buffering': 'no',
         }
     )
 
@@ -50,6 +55,22 @@ async def set_api_key(request: APIKeyRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/chat/usage")
+async def get_usage():
+    """모델별 토큰 사용량 (프롬프트 캐시 적중/미적중 입력 토큰 포함)"""
+    return {"usage": chat_service.usage.stats()}
+
+@router.get("/chat/response-cache/stats")
+async def get_response_cache_stats():
+    """응답 캐시 적중/미스 통계"""
+    cache = chat_service.response_cache
+    return cache.stats() if cache else {"enabled": False}
+
+@router.get("/chat/gateway/stats")
+async def get_gateway_stats():
+    """제공자별 동시 호출/대기/거절/재시도 통계"""
+    return {"gateways": gateway_stats()}
+
 @router.get("/chat/models")
 async def get_available_models():
     """사용 가능한 모델 목록 반환"""
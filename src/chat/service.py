@@ -1,18 +1,56 @@
-from typing import AsyncGenerator, Dict
+import asyncio
+import logging
+import time
+from contextlib import AsyncExitStack
+from typing import AsyncGenerator, Dict, List, Optional
 from anthropic import AsyncAnthropic
 from openai import AsyncOpenAI
 from src.core.config import settings, model_settings
+from src.core.gateway import get_gateway
+from src.rag.tokens import estimate_tokens
+from src.core.metrics import CACHE_LOOKUPS, CHAT_STREAM_SECONDS, CHAT_TOKENS, CHAT_TTFT_SECONDS
 from .models import ChatRequest
 from src.rag.service import RAGService
+from .conversation_store import ConversationStore, create_conversation_store
+from .context import ContextBuilder
+from .prompt_cache import UsageTracker, anthropic_usage, build_anthropic_request, openai_usage
+from .response_cache import ResponseCache, documents_fingerprint
+from .sse import error_event, make_event
+
+logger = logging.getLogger(__name__)
+
+# 캐시된 답변을 스트리밍처럼 나누어 보내는 크기 (문자)
+REPLAY_CHUNK_CHARS = 32
+
+# 마지막 요청 후 이 시간이 지나면 커넥션이 닫혔을 수 있으므로 검색과 동시에 미리 연결
+WARMUP_IDLE_SECONDS = 4.0
+
+# 워밍업 연결이 끝나기를 기다리는 최대 시간 (초과하면 스트림 요청이 직접 연결)
+WARMUP_WAIT_SECONDS = 2.0
+
+class ProviderError(Exception):
+    """모델 제공자 호출 실패 (메시지는 사용자에게 그대로 전달됨)"""
 
 class ChatService:
-    def __init__(self):
+    def __init__(self, rag_service: RAGService = None, conversation_store: ConversationStore = None):
         self._openai_api_key = None
         self._anthropic_api_key = None
+        # SDK 자체 재시도는 끄고 제공자 게이트웨이가 한도/재시도를 담당
         self._openai_client = None
         self._anthropic_client = None
-        self.conversations = {}
-        self.rag_service = RAGService(openai_api_key=self.openai_api_key)
+        # 대화 기록 (LRU/TTL로 메모리 제한, 설정에 따라 디스크에 영속화)
+        self.conversations = conversation_store or create_conversation_store()
+        self.context_builder = ContextBuilder()
+        # 모델별 토큰 사용량 (프롬프트 캐시 적중 토큰 포함)
+        self.usage = UsageTracker()
+        self.rag_service = rag_service or RAGService(openai_api_key=self.openai_api_key)
+        # 반복 질문 응답 캐시 (설정으로 켠 경우에만, 참고 문서가 바뀌면 무효화)
+        self.response_cache = None
+        if model_settings.CHAT_RESPONSE_CACHE_ENABLED:
+            self.response_cache = ResponseCache()
+            self.rag_service.add_change_listener(self.response_cache.invalidate_source)
+        # 제공자별 마지막 호출 시각 (커넥션 워밍업 필요 여부 판단)
+        self._last_provider_use: Dict[str, float] = {}
     
     @property
     def openai_api_key(self):
@@ -21,20 +59,20 @@ class ChatService:
     @openai_api_key.setter
     def openai_api_key(self, value):
         self._openai_api_key = value
-        self._openai_client = AsyncOpenAI(api_key=value) if value else None
+        self._openai_client = AsyncOpenAI(api_key=value, max_retries=0) if value else None
         if hasattr(self, 'rag_service'):
-            self.rag_service = RAGService(openai_api_key=value)
+            self.rag_service.set_openai_api_key(value)
     
     @property
     def openai_client(self) -> AsyncOpenAI:
         if not self._openai_client and self._openai_api_key:
-            self._openai_client = AsyncOpenAI(api_key=self._openai_api_key)
+            self._openai_client = AsyncOpenAI(api_key=self._openai_api_key, max_retries=0)
         return self._openai_client
     
     @property
     def anthropic_client(self) -> AsyncAnthropic:
         if not self._anthropic_client and self._anthropic_api_key:
-            self._anthropic_client = AsyncAnthropic(api_key=self._anthropic_api_key)
+            self._anthropic_client = AsyncAnthropic(api_key=self._anthropic_api_key, max_retries=0)
         return self._anthropic_client
     
     @property
@@ -44,102 +82,294 @@ class ChatService:
     @anthropic_api_key.setter
     def anthropic_api_key(self, value: str):
         self._anthropic_api_key = value
-        self._anthropic_client = AsyncAnthropic(api_key=value)
+        self._anthropic_client = AsyncAnthropic(api_key=value, max_retries=0)
 
-    async def _generate_stream_anthropic(self, messages: list, model_name: str) -> AsyncGenerator[str, None]:
+    async def close(self):
+        """앱 종료 시 클라이언트 및 RAG 서비스 정리"""
+        if self._openai_client:
+            await self._openai_client.close()
+            self._openai_client = None
+        if self._anthropic_client:
+            await self._anthropic_client.close()
+            self._anthropic_client = None
+        await self.conversations.close()
+        await self.rag_service.close()
+
+    async def _generate_stream_anthropic(self, messages: list, model_name: str) -> AsyncGenerator[Dict, None]:
         if not self.anthropic_client:
-            yield "Anthropic API 키가 설정되지 않았습니다."
-            return
+            raise ProviderError("Anthropic API 키가 설정되지 않았습니다.")
 
         try:
             model_config = model_settings.get_model_config(model_name)
             
-            async with self.anthropic_client.messages.stream(
-                model=model_name,
-                max_tokens=model_config["max_tokens"],
-                temperature=model_config["temperature"],
-                messages=messages
+            # 시스템 프롬프트는 별도 인자로 분리하고 캐시 구간 표시
+            request = build_anthropic_request(messages, cache=model_settings.CHAT_PROMPT_CACHE_ENABLED)
+            gateway = get_gateway("anthropic")
+            
+            # 스트림이 끝날 때까지 게이트웨이 자리를 유지하고, 연결(첫 응답)까지만 재시도
+            async with AsyncExitStack() as stack, gateway.session(
+                lambda: stack.enter_async_context(
+                    self.anthropic_client.messages.stream(
+                        model=model_name,
+                        max_tokens=model_config["max_tokens"],
+                        # 1.x SDK는 temperature 인자가 없으므로 요청 본문에 직접 넣음 (0.x에서도 같은 요청)
+                        extra_body={"temperature": model_config["temperature"]},
+                        **request
+                    )
+                ),
+                self._request_tokens(messages, model_config)
             ) as stream:
-                async for text in stream.text_stream:
-                    yield text
+                try:
+                    async for text in stream.text_stream:
+                        yield make_event("token", text)
+                    final_message = await stream.get_final_message()
+                    usage = anthropic_usage(final_message.usage)
+                    self.usage.record(model_name, usage)
+                    yield make_event("usage", {"model": model_name, **usage})
+                finally:
+                    # 자리를 반환하기 전에 응답 연결을 닫음
+                    await stack.aclose()
+            self._last_provider_use["anthropic"] = time.monotonic()
         except Exception as e:
-            yield f"Anthropic 오류: {str(e)}"
+            raise ProviderError(f"Anthropic 오류: {str(e)}") from e
 
-    async def _generate_stream_openai(self, messages: list, model_name: str) -> AsyncGenerator[str, None]:
+    async def _generate_stream_openai(self, messages: list, model_name: str) -> AsyncGenerator[Dict, None]:
         if not self.openai_client:
-            yield "OpenAI API 키가 설정되지 않았습니다."
-            return
+            raise ProviderError("OpenAI API 키가 설정되지 않았습니다.")
 
         try:
             model_config = model_settings.get_model_config(model_name)
+            gateway = get_gateway("openai")
             
-            stream = await self.openai_client.chat.completions.create(
-                model=model_name,
-                messages=messages,
-                max_tokens=model_config["max_tokens"],
-                temperature=model_config["temperature"],
-                stream=True
-            )
-            
-            async for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+            # 스트림이 끝날 때까지 게이트웨이 자리를 유지하고, 연결(첫 응답)까지만 재시도
+            async with gateway.session(
+                lambda: self.openai_client.chat.completions.create(
+                    model=model_name,
+                    messages=messages,
+                    max_tokens=model_config["max_tokens"],
+                    temperature=model_config["temperature"],
+                    stream=True,
+                    # 마지막 청크로 usage(캐시 적중 토큰 포함)를 받음
+                    stream_options={"include_usage": True}
+                ),
+                self._request_tokens(messages, model_config)
+            ) as stream:
+                try:
+                    async for chunk in stream:
+                        if chunk.usage:
+                            usage = openai_usage(chunk.usage)
+                            self.usage.record(model_name, usage)
+                            yield make_event("usage", {"model": model_name, **usage})
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yield make_event("token", chunk.choices[0].delta.content)
+                finally:
+                    # 중간에 끊겨도 응답 연결을 닫아 제공자가 생성을 계속하지 않게 함
+                    await stream.close()
+            self._last_provider_use["openai"] = time.monotonic()
         except Exception as e:
-            yield f"OpenAI 오류: {str(e)}"
+            raise ProviderError(f"OpenAI 오류: {str(e)}") from e
     
-    async def generate_response(self, request: ChatRequest) -> AsyncGenerator[str, None]:
+    @staticmethod
+    def _request_tokens(messages: list, model_config: Dict) -> int:
+        """분당 토큰 한도에 반영할 요청 크기 (입력 추정치 + 최대 출력 토큰)"""
+        return sum(estimate_tokens(message["content"]) for message in messages) + model_config["max_tokens"]
+
+    def _provider_for(self, model_name: str) -> Optional[str]:
+        if model_settings.is_openai_model(model_name):
+            return "openai"
+        if model_settings.is_anthropic_model(model_name):
+            return "anthropic"
+        return None
+
+    async def _warm_up(self, provider: str, model_name: str):
+        """모델 정보 조회(토큰 소모 없음)로 커넥션 풀에 연결을 미리 만들어 둠"""
+        last_use = self._last_provider_use.get(provider)
+        if last_use is not None and time.monotonic() - last_use < WARMUP_IDLE_SECONDS:
+            return
+        client = self.openai_client if provider == "openai" else self.anthropic_client
+        if client is None:
+            return
+        models = getattr(client, "models", None)
+        if models is None or not hasattr(models, "retrieve"):
+            # 모델 조회 API가 없는 SDK 버전이면 워밍업 없이 스트림 요청이 직접 연결
+            logger.debug("%s SDK에 모델 조회 API가 없어 연결 워밍업을 건너뜀", provider)
+            return
+        try:
+            await models.retrieve(model_name)
+            self._last_provider_use[provider] = time.monotonic()
+        except Exception as e:
+            logger.warning("%s 연결 워밍업 실패: %s", provider, e)
+
+    async def _load_history(self, request: ChatRequest) -> List[Dict]:
+        # 시스템 프롬프트는 매 턴 새로 만들므로 기록에는 대화만 저장됨
+        if request.context_enabled and request.conversation_id:
+            return await self.conversations.get(request.conversation_id)
+        return []
+
+    async def generate_response(self, request: ChatRequest) -> AsyncGenerator[Dict, None]:
+        """응답 이벤트 생성 (sources -> token... -> usage -> done, 실패 시 error -> done)
+
+        제공자 커넥션 워밍업, 대화 기록 조회, 질문 임베딩을 동시에 시작하고, 검색이 끝나는
+        즉시 참고 문서(sources) 이벤트를 보낸 뒤 토큰을 스트리밍한다.
+        """
+        started = time.perf_counter()
+        timings = {}
+
+        def elapsed(since: float) -> float:
+            return round((time.perf_counter() - since) * 1000, 1)
+
+        warmup = None
+        provider = None
+        # 스트림 시간 지표의 상태 레이블 (정상 종료 전에 닫히면 cancelled)
+        status = "cancelled"
         try:
-            messages = []
             model_config = model_settings.get_model_config(request.model)
-            max_tokens = model_config.get("max_tokens", 4000)
+            provider = self._provider_for(request.model)
+            if provider is None:
+                yield error_event(f"지원하지 않는 모델입니다: {request.model}")
+                yield make_event("done", {"status": "error"})
+                return
             
-            # RAG가 활성화된 경우 시스템 프롬프트에 문서 컨텍스트 추가
+            warmup = asyncio.create_task(self._warm_up(provider, request.model))
+            history_task = asyncio.create_task(self._load_history(request))
+            embed_task = None
+            if request.rag_enabled and self.rag_service.needs_query_embedding():
+                embed_task = asyncio.create_task(self.rag_service.embed_query(request.question))
+            
+            try:
+                history = await history_task
+                timings["history_ms"] = elapsed(started)
+                query_embedding = await embed_task if embed_task else None
+            finally:
+                for task in (history_task, embed_task):
+                    if task and not task.done():
+                        task.cancel()
+            
+            # 응답 캐시는 이전 대화가 없는 질문에만 사용 (대화가 있으면 답이 문맥에 따라 달라짐)
+            use_cache = self.response_cache is not None and not history
+            if use_cache and query_embedding is None and self.rag_service.has_credentials:
+                try:
+                    query_embedding = await self.rag_service.embed_query(request.question)
+                except Exception as e:
+                    logger.warning("응답 캐시용 질문 임베딩 실패: %s", e)
+            if query_embedding is not None:
+                timings["embed_ms"] = elapsed(started)
+            
+            # RAG가 활성화된 경우 검색 문서를 컨텍스트로 사용
+            relevant_docs = []
             if request.rag_enabled:
+                search_started = time.perf_counter()
                 relevant_docs = await self.rag_service.search(
                     query=request.question,
-                    top_k=min(model_settings.RAG_TOP_K, max(1, int(max_tokens/1000)))  # 토큰 제한 고려
+                    top_k=model_settings.RAG_TOP_K,
+                    query_embedding=query_embedding,
+                    filters=request.filters.model_dump() if request.filters else None
                 )
-                context = "\n\n".join([f"참고 문서:\n{doc['content']}" for doc in relevant_docs])
-                system_prompt = model_config["system_prompt"].format(context=context)
-            else:
-                system_prompt = model_config["system_prompt"].format(context="")
+                timings["search_ms"] = elapsed(search_started)
+                # 생성 시작 전에 참고 문서를 먼저 전달
+                yield make_event("sources", [
+                    {
+                        "id": doc.get("id"),
+                        "source": doc["metadata"].get("source", ""),
+                        "chunk_id": doc["metadata"].get("chunk_id"),
+                        "score": doc["score"]
+                    }
+                    for doc in relevant_docs
+                ])
             
-            # 통합된 시스템 프롬프트 추가
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
+            cache_key = None
+            if use_cache and query_embedding is not None:
+                cache_key = (
+                    request.model,
+                    self.rag_service.document_store.embedding_model.model,
+                    query_embedding,
+                    documents_fingerprint(relevant_docs)
+                )
+                cached = self.response_cache.lookup(*cache_key)
+                CACHE_LOOKUPS.inc(cache="response", result="miss" if cached is None else "hit")
+                if cached is not None:
+                    logger.info("응답 캐시 적중: %s", request.model)
+                    timings["ttft_ms"] = elapsed(started)
+                    for start in range(0, len(cached), REPLAY_CHUNK_CHARS):
+                        yield make_event("token", cached[start:start + REPLAY_CHUNK_CHARS])
+                    # 일반 응답과 같은 이벤트 순서로 끝냄 (제공자 호출이 없으므로 사용량은 0, 적중 수는 캐시 통계로 확인)
+                    yield make_event("usage", {
+                        "model": request.model, "input_tokens": 0, "cached_input_tokens": 0,
+                        "cache_write_tokens": 0, "output_tokens": 0
+                    })
+                    await self._remember_turn(request, cached)
+                    timings["total_ms"] = elapsed(started)
+                    status = "cached"
+                    yield make_event("done", {"status": "completed", "timings": timings})
+                    return
             
-            # 이전 컨텍스트 추가
-            if request.context_enabled and request.conversation_id in self.conversations:
-                messages.extend(self.conversations[request.conversation_id])
+            # 모델별 입력 토큰 예산 안에서 시스템 프롬프트/검색 문서/최근 대화 조립
+            window = self.context_builder.build(model_config, request.question, history, relevant_docs)
+            messages = window["messages"]
+            logger.debug(
+                "컨텍스트 조립: 입력 %d/%d 토큰, 문서 %d/%d개, 대화 %d턴 (생략 %d턴)",
+                window["input_tokens"], window["budget"], len(window["documents"]), len(relevant_docs),
+                window["history_turns"], window["dropped_turns"]
+            )
             
-            # 현재 질문 추가
-            messages.append({"role": "user", "content": request.question})
+            # 워밍업 연결이 아직 진행 중이면 잠시 기다려 같은 연결을 재사용
+            warmup_started = time.perf_counter()
+            await asyncio.wait([warmup], timeout=WARMUP_WAIT_SECONDS)
+            timings["warmup_wait_ms"] = elapsed(warmup_started)
             
-            # 모델에 따라 적절한 생성기 선택
-            if model_settings.is_openai_model(request.model):
+            if provider == "openai":
                 generator = self._generate_stream_openai(messages, request.model)
-            elif model_settings.is_anthropic_model(request.model):
-                generator = self._generate_stream_anthropic(messages, request.model)
             else:
-                yield f"지원하지 않는 모델입니다: {request.model}"
-                return
+                generator = self._generate_stream_anthropic(messages, request.model)
             
             response_content = ""
-            async for chunk in generator:
-                response_content += chunk
-                yield chunk
+            try:
+                async for event in generator:
+                    if event["event"] == "token":
+                        if not response_content:
+                            timings["ttft_ms"] = elapsed(started)
+                            CHAT_TTFT_SECONDS.observe(time.perf_counter() - started, provider=provider, model=request.model)
+                        response_content += event["data"]
+                    elif event["event"] == "usage":
+                        for field in ("input_tokens", "cached_input_tokens", "cache_write_tokens", "output_tokens"):
+                            CHAT_TOKENS.inc(event["data"].get(field, 0), provider=provider, model=request.model, type=field)
+                    yield event
+            except ProviderError as e:
+                status = "error"
+                yield error_event(str(e))
+                yield make_event("done", {"status": "error"})
+                return
+            finally:
+                # 응답 도중 연결이 끊겨 이 제너레이터가 닫혀도 제공자 스트림을 바로 닫음
+                await generator.aclose()
             
-            if request.context_enabled:
-                if request.conversation_id not in self.conversations:
-                    self.conversations[request.conversation_id] = []
-                    if system_prompt:
-                        self.conversations[request.conversation_id].append(
-                            {"role": "system", "content": system_prompt}
-                        )
-                self.conversations[request.conversation_id].extend([
-                    {"role": "user", "content": request.question},
-                    {"role": "assistant", "content": response_content}
-                ])
+            if cache_key is not None:
+                self.response_cache.store(
+                    *cache_key,
+                    sources={doc["metadata"].get("source", "") for doc in relevant_docs},
+                    answer=response_content
+                )
+            await self._remember_turn(request, response_content)
+            timings["total_ms"] = elapsed(started)
+            logger.info("채팅 응답 완료: %s", request.model, extra={"timings_ms": timings})
+            status = "completed"
+            yield make_event("done", {"status": "completed", "timings": timings})
                 
         except Exception as e:
-            yield f"오류가 발생했습니다: {str(e)}"
\ No newline at end of file
+            status = "error"
+            yield error_event(f"오류가 발생했습니다: {str(e)}")
+            yield make_event("done", {"status": "error"})
+        finally:
+            if provider is not None:
+                CHAT_STREAM_SECONDS.observe(time.perf_counter() - started, provider=provider, model=request.model, status=status)
+            # 워밍업은 연결만 만들면 되므로 응답이 끝났는데 남아 있으면 취소
+            if warmup is not None and not warmup.done():
+                warmup.cancel()
+
+    async def _remember_turn(self, request: ChatRequest, answer: str):
+        if request.context_enabled and request.conversation_id:
+            # 새 턴만 추가 기록
+            await self.conversations.append(request.conversation_id, [
+                {"role": "user", "content": request.question},
+                {"role": "assistant", "content": answer}
+            ])
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from src.core.config import model_settings
+
+logger = logging.getLogger(__name__)
+
+# 연결 유지용 SSE 주석 (클라이언트는 무시하고, 프록시/브라우저 유휴 타임아웃만 막음)
+HEARTBEAT = ": keepalive\n\n"
+
+# 서비스 이벤트를 미리 받아 두는 최대 개수 (클라이언트가 느리면 제공자 스트림 읽기도 늦춤)
+STREAM_QUEUE_SIZE = 256
+
+def make_event(event: str, data: Any) -> Dict:
+    return {"event": event, "data": data}
+
+def error_event(message: str) -> Dict:
+    return make_event("error", {"message": message})
+
+def format_event(event: str, data: Any) -> str:
+    """SSE 이벤트 직렬화 (data는 JSON, 여러 줄이 되지 않도록 한 줄로 인코딩)"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+class _TokenBuffer:
+    """연속된 token 이벤트를 모아 한 번에 쓰기
+
+    직전 전송 후 flush_interval이 지났으면(느린 스트림) 토큰을 바로 보내고, 빠르게 들어오면
+    flush_interval 동안 또는 flush_bytes가 찰 때까지 모아서 보낸다.
+    """
+
+    def __init__(self, flush_interval: float, flush_bytes: int):
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.parts: List[str] = []
+        self.size = 0
+        self.last_flush = float("-inf")
+
+    def add(self, text: str, now: float) -> bool:
+        """토큰 추가 후 바로 보내야 하면 True"""
+        self.parts.append(text)
+        self.size += len(text.encode("utf-8"))
+        return self.size >= self.flush_bytes or now - self.last_flush >= self.flush_interval
+
+    def deadline(self) -> float:
+        return self.last_flush + self.flush_interval
+
+    def flush(self, now: float) -> str:
+        text = "".join(self.parts)
+        self.parts = []
+        self.size = 0
+        self.last_flush = now
+        return format_event("token", text)
+
+async def stream_events(
+    events: AsyncIterator[Dict],
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    flush_interval_ms: float = None,
+    flush_bytes: int = None,
+    heartbeat_seconds: float = None
+) -> AsyncIterator[str]:
+    """서비스 이벤트를 SSE 문자열로 변환
+
+    - token 이벤트는 시간/크기 기준으로 모아서 전송 (다른 이벤트 전에는 항상 먼저 비움)
+    - 보낼 것이 없으면 heartbeat_seconds마다 keepalive 주석을 보내고, 이때 연결 종료를 확인
+    - 클라이언트 연결이 끊기거나 응답이 취소되면 서비스 제너레이터를 닫아 제공자 스트림도 닫음
+    - 스트림은 항상 done 이벤트로 끝남
+    """
+    flush_interval = (flush_interval_ms if flush_interval_ms is not None
+                      else model_settings.CHAT_STREAM_FLUSH_INTERVAL_MS) / 1000
+    flush_bytes = flush_bytes or model_settings.CHAT_STREAM_FLUSH_BYTES
+    heartbeat = heartbeat_seconds if heartbeat_seconds is not None else model_settings.CHAT_STREAM_HEARTBEAT_SECONDS
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+    end = object()
+
+    async def pump():
+        try:
+            async for event in events:
+                await queue.put(event)
+        except Exception as e:
+            await queue.put(error_event(f"오류가 발생했습니다: {str(e)}"))
+        await queue.put(end)
+
+    producer = asyncio.create_task(pump())
+    getter = None
+    buffer = _TokenBuffer(flush_interval, flush_bytes)
+    last_write = time.monotonic()
+    done_sent = False
+    try:
+        while True:
+            if getter is None:
+                getter = asyncio.ensure_future(queue.get())
+            now = time.monotonic()
+            if buffer.parts:
+                timeout = max(0.0, buffer.deadline() - now)
+            elif heartbeat:
+                timeout = max(0.0, last_write + heartbeat - now)
+            else:
+                timeout = None
+            await asyncio.wait([getter], timeout=timeout)
+            now = time.monotonic()
+
+            if not getter.done():
+                if buffer.parts:
+                    yield buffer.flush(now)
+                else:
+                    if is_disconnected is not None and await is_disconnected():
+                        logger.info("클라이언트 연결 종료로 응답 스트림 중단")
+                        break
+                    yield HEARTBEAT
+                last_write = now
+                continue
+
+            event = getter.result()
+            getter = None
+            if event is end:
+                break
+            if event["event"] == "token":
+                if buffer.add(event["data"], now):
+                    yield buffer.flush(now)
+                    last_write = now
+                continue
+            if buffer.parts:
+                yield buffer.flush(now)
+            done_sent = done_sent or event["event"] == "done"
+            yield format_event(event["event"], event["data"])
+            last_write = now
+
+        if buffer.parts:
+            yield buffer.flush(time.monotonic())
+        if not done_sent and producer.done():
+            yield format_event("done", {"status": "error"})
+    finally:
+        # 끊긴 연결의 제공자 스트림이 계속 토큰을 소모하지 않도록 생성 작업을 취소
+        for task in (getter, producer):
+            if task is not None and not task.done():
+                task.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        aclose = getattr(events, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -1,20 +1,23 @@
 from functools import lru_cache
-from typing import Dict
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 import os
+import logging
 import json
 
+logger = logging.getLogger(__name__)
+
 def load_json_config(filename: str) -> dict:
     """JSON 설정 파일 로드"""
     config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'config', filename)
-    print(f"설정 파일 경로: {config_path}")  # 디버깅용 로그
+    logger.debug("설정 파일 경로: %s", config_path)
     try:
         with open(config_path, 'r', encoding='utf-8') as f:
             config = json.load(f)
-            print(f"설정 파일 로드 성공: {filename}")  # 디버깅용 로그
+            logger.debug("설정 파일 로드 성공: %s", filename)
             return config
     except Exception as e:
-        print(f"설정 파일 로드 실패 ({filename}): {str(e)}")  # 디버깅용 로그
+        logger.warning("설정 파일 로드 실패 (%s): %s", filename, e)
         return {}
 
 # 설정 파일 로드
@@ -33,6 +36,10 @@ class ModelSettings(BaseSettings):
     """AI 모델 관련 설정"""
     _models_config = app_config_json.get('models', {})
     _rag_config = app_config_json.get('rag', {})
+    _chat_config = app_config_json.get('chat', {})
+    _gateway_config = app_config_json.get('gateway', {})
+    _metrics_config = app_config_json.get('metrics', {})
+    _logging_config = app_config_json.get('logging', {})
     
     # 모델 설정
     OPENAI_MODELS: Dict = _models_config.get('openai', {})
@@ -41,15 +48,86 @@ class ModelSettings(BaseSettings):
     # RAG 설정
     RAG_CHUNK_SIZE: int = _rag_config.get('chunk_size', 1000)
     RAG_CHUNK_OVERLAP: int = _rag_config.get('chunk_overlap', 200)
+    RAG_CHUNK_UNIT: str = _rag_config.get('chunk_unit', 'chars')
+    RAG_CHUNK_SEPARATORS: List[str] = _rag_config.get(
+        'chunk_separators',
+        ["paragraph", "line", "sentence", "korean"]
+    )
+    RAG_CHUNK_CONTENT_DEFINED: bool = _rag_config.get('chunk_content_defined', False)
     RAG_EMBEDDING_MODEL: str = _rag_config.get('embedding_model', 'text-embedding-3-small')
+    RAG_EMBEDDING_BACKEND: str = _rag_config.get('embedding_backend', 'openai')
+    RAG_EMBEDDING_DIMENSION: int = _rag_config.get('embedding_dimension', 512)
+    RAG_EMBEDDING_THREADS: int = _rag_config.get('embedding_threads', 2)
     RAG_TOP_K: int = _rag_config.get('top_k', 3)
     RAG_PERSIST_DIRECTORY: str = _rag_config.get('persist_directory', 'data/chroma')
     RAG_SIMILARITY_THRESHOLD: float = _rag_config.get('similarity_threshold', 0.7)
+    RAG_SEARCH_MODE: str = _rag_config.get('search_mode', 'hybrid')
+    RAG_SEARCH_CANDIDATES: int = _rag_config.get('search_candidates', 20)
+    RAG_RRF_K: int = _rag_config.get('rrf_k', 60)
+    RAG_RERANK_ENABLED: bool = _rag_config.get('rerank_enabled', True)
+    RAG_RERANK_FETCH_K: int = _rag_config.get('rerank_fetch_k', 20)
+    RAG_MMR_LAMBDA: float = _rag_config.get('mmr_lambda', 0.7)
+    RAG_DUPLICATE_THRESHOLD: float = _rag_config.get('duplicate_threshold', 0.95)
+    RAG_MERGE_MAX_CHUNKS: int = _rag_config.get('merge_max_chunks', 3)
+    RAG_SEARCH_BATCH_MAX_QUERIES: int = _rag_config.get('search_batch_max_queries', 1000)
+    RAG_EXACT_SEARCH_MAX_CHUNKS: int = _rag_config.get('exact_search_max_chunks', 2000)
+    RAG_EMBEDDING_BATCH_SIZE: int = _rag_config.get('embedding_batch_size', 256)
+    RAG_EMBEDDING_BATCH_MAX_TOKENS: int = _rag_config.get('embedding_batch_max_tokens', 200000)
+    RAG_EMBEDDING_CONCURRENCY: int = _rag_config.get('embedding_concurrency', 4)
+    RAG_EMBEDDING_MAX_RETRIES: int = _rag_config.get('embedding_max_retries', 3)
+    RAG_INGEST_WORKERS: int = _rag_config.get('ingest_workers', 2)
+    RAG_INGEST_BATCH_SIZE: int = _rag_config.get('ingest_batch_size', 64)
+    RAG_PARSE_WORKERS: int = _rag_config.get('parse_workers', 2)
+    RAG_PARSE_PAGES_PER_SHARD: int = _rag_config.get('parse_pages_per_shard', 20)
+    RAG_PARSE_TIMEOUT: float = _rag_config.get('parse_timeout', 300)
+    RAG_PARSE_MEMORY_LIMIT_MB: int = _rag_config.get('parse_memory_limit_mb', 2048)
+    RAG_EMBEDDING_CACHE_ENABLED: bool = _rag_config.get('embedding_cache_enabled', True)
+    RAG_EMBEDDING_CACHE_DTYPE: str = _rag_config.get('embedding_cache_dtype', 'float32')
+    RAG_EMBEDDING_CACHE_MEMORY_MB: int = _rag_config.get('embedding_cache_memory_mb', 64)
     RAG_SYSTEM_PROMPT_TEMPLATE: str = _rag_config.get(
         'system_prompt_template', 
         "다음 문서들을 참고하여 답변해주세요:\n\n{context}"
     )
     
+    # 대화 기록 설정
+    CHAT_HISTORY_BACKEND: str = _chat_config.get('history_backend', 'sqlite')
+    CHAT_HISTORY_PATH: str = _chat_config.get('history_path', 'data/chat_history.sqlite3')
+    CHAT_HISTORY_MAX_CONVERSATIONS: int = _chat_config.get('history_max_conversations', 1000)
+    CHAT_HISTORY_TTL_SECONDS: float = _chat_config.get('history_ttl_seconds', 3600)
+    CHAT_HISTORY_MEMORY_MB: int = _chat_config.get('history_memory_mb', 32)
+    CHAT_HISTORY_RETENTION_DAYS: int = _chat_config.get('history_retention_days', 30)
+    CHAT_INPUT_TOKEN_BUDGET: int = _chat_config.get('input_token_budget', 12000)
+    CHAT_CONTEXT_RAG_RATIO: float = _chat_config.get('context_rag_ratio', 0.5)
+    CHAT_CONTEXT_SUMMARY_TOKENS: int = _chat_config.get('context_summary_tokens', 300)
+    CHAT_CONTEXT_DROP_STEP: int = _chat_config.get('context_drop_step', 4)
+    CHAT_PROMPT_CACHE_ENABLED: bool = _chat_config.get('prompt_cache_enabled', True)
+    CHAT_RESPONSE_CACHE_ENABLED: bool = _chat_config.get('response_cache_enabled', False)
+    CHAT_RESPONSE_CACHE_TTL_SECONDS: float = _chat_config.get('response_cache_ttl_seconds', 3600)
+    CHAT_RESPONSE_CACHE_MAX_ENTRIES: int = _chat_config.get('response_cache_max_entries', 1000)
+    CHAT_STREAM_FLUSH_INTERVAL_MS: float = _chat_config.get('stream_flush_interval_ms', 40)
+    CHAT_STREAM_FLUSH_BYTES: int = _chat_config.get('stream_flush_bytes', 512)
+    CHAT_STREAM_HEARTBEAT_SECONDS: float = _chat_config.get('stream_heartbeat_seconds', 15)
+    
+    # 모델 제공자 호출 제한 설정 (제공자별 동시 호출 수, 분당 요청/토큰 수)
+    GATEWAY_MAX_QUEUE: int = _gateway_config.get('max_queue', 64)
+    GATEWAY_MAX_RETRIES: int = _gateway_config.get('max_retries', 3)
+    GATEWAY_RETRY_BASE_SECONDS: float = _gateway_config.get('retry_base_seconds', 0.5)
+    GATEWAY_RETRY_MAX_SECONDS: float = _gateway_config.get('retry_max_seconds', 30)
+    GATEWAY_PROVIDERS: Dict = _gateway_config.get('providers', {
+        "openai": {"max_concurrency": 16, "requests_per_minute": 500, "tokens_per_minute": 200000},
+        "anthropic": {"max_concurrency": 8, "requests_per_minute": 50, "tokens_per_minute": 80000}
+    })
+    
+    # 성능 지표 설정 (/metrics)
+    METRICS_ENABLED: bool = _metrics_config.get('enabled', True)
+    METRICS_LOOP_LAG_INTERVAL_SECONDS: float = _metrics_config.get('loop_lag_interval_seconds', 0.5)
+    
+    # 로그 설정 (levels는 모듈별 레벨)
+    LOGGING_LEVEL: str = _logging_config.get('level', "INFO")
+    LOGGING_FORMAT: str = _logging_config.get('format', "json")
+    LOGGING_QUEUE_SIZE: int = _logging_config.get('queue_size', 10000)
+    LOGGING_LEVELS: Dict[str, str] = _logging_config.get('levels', {})
+    
     @property
     def available_models(self) -> Dict[str, str]:
         """사용 가능한 모델 목록 반환"""
@@ -80,13 +158,94 @@ class ModelSettings(BaseSettings):
         return {
             "chunk_size": self.RAG_CHUNK_SIZE,
             "chunk_overlap": self.RAG_CHUNK_OVERLAP,
+            "chunk_unit": self.RAG_CHUNK_UNIT,
+            "chunk_separators": self.RAG_CHUNK_SEPARATORS,
+            "chunk_content_defined": self.RAG_CHUNK_CONTENT_DEFINED,
             "embedding_model": self.RAG_EMBEDDING_MODEL,
+            "embedding_backend": self.RAG_EMBEDDING_BACKEND,
+            "embedding_dimension": self.RAG_EMBEDDING_DIMENSION,
+            "embedding_threads": self.RAG_EMBEDDING_THREADS,
             "top_k": self.RAG_TOP_K,
             "persist_directory": self.RAG_PERSIST_DIRECTORY,
             "similarity_threshold": self.RAG_SIMILARITY_THRESHOLD,
+            "search_mode": self.RAG_SEARCH_MODE,
+            "search_candidates": self.RAG_SEARCH_CANDIDATES,
+            "rrf_k": self.RAG_RRF_K,
+            "rerank_enabled": self.RAG_RERANK_ENABLED,
+            "rerank_fetch_k": self.RAG_RERANK_FETCH_K,
+            "mmr_lambda": self.RAG_MMR_LAMBDA,
+            "duplicate_threshold": self.RAG_DUPLICATE_THRESHOLD,
+            "merge_max_chunks": self.RAG_MERGE_MAX_CHUNKS,
+            "search_batch_max_queries": self.RAG_SEARCH_BATCH_MAX_QUERIES,
+            "exact_search_max_chunks": self.RAG_EXACT_SEARCH_MAX_CHUNKS,
+            "embedding_batch_size": self.RAG_EMBEDDING_BATCH_SIZE,
+            "embedding_batch_max_tokens": self.RAG_EMBEDDING_BATCH_MAX_TOKENS,
+            "embedding_concurrency": self.RAG_EMBEDDING_CONCURRENCY,
+            "embedding_max_retries": self.RAG_EMBEDDING_MAX_RETRIES,
+            "ingest_workers": self.RAG_INGEST_WORKERS,
+            "ingest_batch_size": self.RAG_INGEST_BATCH_SIZE,
+            "parse_workers": self.RAG_PARSE_WORKERS,
+            "parse_pages_per_shard": self.RAG_PARSE_PAGES_PER_SHARD,
+            "parse_timeout": self.RAG_PARSE_TIMEOUT,
+            "parse_memory_limit_mb": self.RAG_PARSE_MEMORY_LIMIT_MB,
+            "embedding_cache_enabled": self.RAG_EMBEDDING_CACHE_ENABLED,
+            "embedding_cache_dtype": self.RAG_EMBEDDING_CACHE_DTYPE,
+            "embedding_cache_memory_mb": self.RAG_EMBEDDING_CACHE_MEMORY_MB,
             "system_prompt_template": self.RAG_SYSTEM_PROMPT_TEMPLATE
         }
 
+    @property
+    def chat_config(self) -> Dict:
+        """대화 설정 반환"""
+        return {
+            "history_backend": self.CHAT_HISTORY_BACKEND,
+            "history_path": self.CHAT_HISTORY_PATH,
+            "history_max_conversations": self.CHAT_HISTORY_MAX_CONVERSATIONS,
+            "history_ttl_seconds": self.CHAT_HISTORY_TTL_SECONDS,
+            "history_memory_mb": self.CHAT_HISTORY_MEMORY_MB,
+            "history_retention_days": self.CHAT_HISTORY_RETENTION_DAYS,
+            "input_token_budget": self.CHAT_INPUT_TOKEN_BUDGET,
+            "context_rag_ratio": self.CHAT_CONTEXT_RAG_RATIO,
+            "context_summary_tokens": self.CHAT_CONTEXT_SUMMARY_TOKENS,
+            "context_drop_step": self.CHAT_CONTEXT_DROP_STEP,
+            "prompt_cache_enabled": self.CHAT_PROMPT_CACHE_ENABLED,
+            "response_cache_enabled": self.CHAT_RESPONSE_CACHE_ENABLED,
+            "response_cache_ttl_seconds": self.CHAT_RESPONSE_CACHE_TTL_SECONDS,
+            "response_cache_max_entries": self.CHAT_RESPONSE_CACHE_MAX_ENTRIES,
+            "stream_flush_interval_ms": self.CHAT_STREAM_FLUSH_INTERVAL_MS,
+            "stream_flush_bytes": self.CHAT_STREAM_FLUSH_BYTES,
+            "stream_heartbeat_seconds": self.CHAT_STREAM_HEARTBEAT_SECONDS
+        }
+
+    @property
+    def gateway_config(self) -> Dict:
+        """모델 제공자 호출 제한 설정 반환"""
+        return {
+            "max_queue": self.GATEWAY_MAX_QUEUE,
+            "max_retries": self.GATEWAY_MAX_RETRIES,
+            "retry_base_seconds": self.GATEWAY_RETRY_BASE_SECONDS,
+            "retry_max_seconds": self.GATEWAY_RETRY_MAX_SECONDS,
+            "providers": self.GATEWAY_PROVIDERS
+        }
+
+    @property
+    def metrics_config(self) -> Dict:
+        """성능 지표 설정 반환"""
+        return {
+            "enabled": self.METRICS_ENABLED,
+            "loop_lag_interval_seconds": self.METRICS_LOOP_LAG_INTERVAL_SECONDS
+        }
+
+    @property
+    def logging_config(self) -> Dict:
+        """로그 설정 반환"""
+        return {
+            "level": self.LOGGING_LEVEL,
+            "format": self.LOGGING_FORMAT,
+            "queue_size": self.LOGGING_QUEUE_SIZE,
+            "levels": self.LOGGING_LEVELS
+        }
+
 @lru_cache()
 def get_settings() -> Settings:
     return Settings()
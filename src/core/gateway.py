@@ -0,0 +1,278 @@
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+import anthropic
+import openai
+from src.core.config import model_settings
+from src.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 재시도하는 HTTP 상태 (요청 한도 초과, 제공자 일시 장애)
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+CONNECTION_ERRORS = (openai.APIConnectionError, anthropic.APIConnectionError)
+
+class GatewayOverloaded(Exception):
+    """대기열이 가득 차 요청을 바로 거절 (HTTP 503으로 응답)"""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} 요청이 많아 잠시 후 다시 시도해주세요")
+        self.provider = provider
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """분당 한도를 초당 비율로 채우는 토큰 버킷 (한도가 0이면 제한 없음)"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute or 0)
+        self.rate = self.capacity / 60
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """amount만큼 꺼낼 수 있을 때까지 남은 시간 (한도보다 큰 요청은 가득 찼을 때 통과)"""
+        if not self.capacity:
+            return 0.0
+        self._refill(time.monotonic())
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        if self.capacity:
+            self.tokens -= min(amount, self.capacity)
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """응답 헤더의 retry-after-ms / retry-after (초 또는 HTTP 날짜)"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, CONNECTION_ERRORS):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS
+
+class ProviderGateway:
+    """모델 제공자 하나에 대한 공용 호출 관문 (채팅과 임베딩이 함께 사용)
+
+    - 분당 요청/토큰 한도를 토큰 버킷으로 지키고, 동시 호출 수를 세마포어로 제한
+    - 자리를 기다리는 요청이 max_queue를 넘으면 대기하지 않고 GatewayOverloaded로 바로 거절
+      (reject=False인 백그라운드 호출은 거절하지 않고 기다리며, 대기열 길이에도 세지 않음)
+    - 429/5xx/연결 오류는 지터를 섞은 지수 백오프로 재시도하며, Retry-After가 있으면 그 시간만큼
+      이 제공자의 모든 요청을 멈춤 (다른 요청이 같은 한도에 계속 부딪히지 않도록)
+    - 백오프 동안에는 자리를 내놓고, 재시도마다 요청/토큰 버킷에서 다시 꺼냄
+    """
+
+    def __init__(self, name: str, max_concurrency: int = 8, requests_per_minute: float = 0,
+                 tokens_per_minute: float = 0, max_queue: int = None, max_retries: int = None,
+                 retry_base_seconds: float = None, retry_max_seconds: float = None):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max_queue if max_queue is not None else model_settings.GATEWAY_MAX_QUEUE
+        self.max_retries = max_retries if max_retries is not None else model_settings.GATEWAY_MAX_RETRIES
+        self.retry_base = retry_base_seconds if retry_base_seconds is not None else model_settings.GATEWAY_RETRY_BASE_SECONDS
+        self.retry_max = retry_max_seconds if retry_max_seconds is not None else model_settings.GATEWAY_RETRY_MAX_SECONDS
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        # 버킷에서 꺼내는 순서를 도착 순서대로 유지
+        self._admission = asyncio.Lock()
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._paused_until = 0.0
+        self.waiting = 0
+        self.waiting_background = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.retries = 0
+        self.throttled = 0
+
+    def saturated(self) -> bool:
+        return self.waiting >= self.max_queue
+
+    def _reject_if_full(self):
+        if self.saturated():
+            self.rejected += 1
+            retry_after = max(1.0, self._paused_until - time.monotonic(), self._requests.wait_time(1))
+            raise GatewayOverloaded(self.name, retry_after)
+
+    async def _admit(self, tokens: int):
+        async with self._admission:
+            while True:
+                wait = max(
+                    self._paused_until - time.monotonic(),
+                    self._requests.wait_time(1),
+                    self._tokens.wait_time(tokens)
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self._requests.take(1)
+            self._tokens.take(tokens)
+
+    async def _acquire(self, tokens: int, reject: bool, check_queue: bool = True):
+        if reject:
+            if check_queue:
+                self._reject_if_full()
+            self.waiting += 1
+        else:
+            self.waiting_background += 1
+        try:
+            await self._admit(tokens)
+            await self._semaphore.acquire()
+        finally:
+            if reject:
+                self.waiting -= 1
+            else:
+                self.waiting_background -= 1
+        self.in_flight += 1
+
+    def _release(self):
+        self.in_flight -= 1
+        self.completed += 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0, reject: bool = True):
+        """한도 안에서 호출 자리 하나를 확보 (재시도 없음)
+
+        reject가 거짓이면 대기열이 가득 차도 거절하지 않고 자리가 날 때까지 기다린다
+        (문서 수집처럼 늦어져도 되는 작업이 채팅 요청 폭주로 실패하지 않도록).
+        """
+        await self._acquire(tokens, reject)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _retry_delay(self, error: BaseException, attempt: int, max_retries: int) -> Optional[float]:
+        """재시도 전 대기 시간 (재시도하지 않을 오류면 None)"""
+        if not isinstance(error, Exception) or attempt >= max_retries or not is_retryable(error):
+            return None
+        # 지수 백오프의 전 구간 지터 (동시에 실패한 요청들이 한꺼번에 재시도하지 않도록)
+        delay = random.uniform(0, min(self.retry_max, self.retry_base * (2 ** attempt)))
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.retry_max))
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        if getattr(error, "status_code", None) == 429:
+            self.throttled += 1
+        self.retries += 1
+        logger.warning("%s 호출 재시도 (%d/%d, %.1f초 후): %s", self.name, attempt + 1, max_retries, delay, error)
+        return delay
+
+    @asynccontextmanager
+    async def session(self, call: Callable[[], Awaitable[T]], tokens: int = 0, max_retries: int = None,
+                      reject: bool = True) -> AsyncIterator[T]:
+        """자리를 확보해 call을 호출하고, 결과를 쓰는 동안(스트리밍 응답이 끝날 때까지) 자리를 유지
+
+        재시도 가능한 오류면 자리를 내놓고 백오프한 뒤, 다시 요청/토큰 버킷을 거쳐 자리를 확보한다.
+        백오프 중인 요청이 다른 호출의 자리를 막지 않고, 재시도도 분당 한도 안에서만 나간다.
+        이미 받아들인 요청이므로 재시도할 때는 대기열이 가득 차도 거절하지 않는다.
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            await self._acquire(tokens, reject, check_queue=attempt == 0)
+            try:
+                result = await call()
+            except BaseException as e:
+                self._release()
+                delay = self._retry_delay(e, attempt, max_retries)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            try:
+                yield result
+            finally:
+                self._release()
+            return
+
+    async def call(self, call: Callable[[], Awaitable[T]], tokens: int = 0, max_retries: int = None,
+                   reject: bool = True) -> T:
+        """자리를 확보한 뒤 재시도를 포함해 호출 (응답을 받으면 자리 반환)"""
+        async with self.session(call, tokens, max_retries, reject=reject) as result:
+            return result
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "waiting_background": self.waiting_background,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "retries": self.retries,
+            "throttled": self.throttled
+        }
+
+_gateways: Dict[str, ProviderGateway] = {}
+
+def get_gateway(provider: str) -> ProviderGateway:
+    """제공자별 공용 게이트웨이 (gateway.providers 설정으로 생성)"""
+    gateway = _gateways.get(provider)
+    if gateway is None:
+        limits = model_settings.GATEWAY_PROVIDERS.get(provider, {})
+        gateway = ProviderGateway(
+            provider,
+            max_concurrency=limits.get("max_concurrency", 8),
+            requests_per_minute=limits.get("requests_per_minute", 0),
+            tokens_per_minute=limits.get("tokens_per_minute", 0)
+        )
+        _gateways[provider] = gateway
+    return gateway
+
+def gateway_stats() -> Dict:
+    return {name: gateway.stats() for name, gateway in _gateways.items()}
+
+# 게이트웨이 통계 -> 지표 (이름, 종류, 설명)
+_GATEWAY_METRICS = {
+    "in_flight": ("bento_gateway_in_flight", "gauge", "진행 중인 제공자 호출 수"),
+    "waiting": ("bento_gateway_waiting", "gauge", "호출 자리를 기다리는 요청 수"),
+    "waiting_background": ("bento_gateway_waiting_background", "gauge", "거절 없이 자리를 기다리는 백그라운드 요청 수"),
+    "completed": ("bento_gateway_completed_total", "counter", "완료된 제공자 호출 수"),
+    "rejected": ("bento_gateway_rejected_total", "counter", "대기열이 가득 차 거절한 요청 수"),
+    "retries": ("bento_gateway_retries_total", "counter", "재시도 횟수"),
+    "throttled": ("bento_gateway_throttled_total", "counter", "429 응답 수")
+}
+
+def _collect_gateway_metrics():
+    stats = gateway_stats()
+    if not stats:
+        return
+    for field, (name, kind, help) in _GATEWAY_METRICS.items():
+        yield name, kind, help, [({"provider": provider}, values[field]) for provider, values in stats.items()]
+
+registry.add_collector(_collect_gateway_metrics)
@@ -0,0 +1,158 @@
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import sys
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+from src.core.config import model_settings
+
+# 현재 요청(또는 수집 작업)의 ID - 로그 레코드마다 붙음
+request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = "x-request-id"
+
+# LogRecord 기본 속성 (이 외의 속성은 extra로 넘긴 필드로 보고 JSON에 포함)
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+def _extra_fields(record: logging.LogRecord) -> Dict:
+    """logger 호출 시 extra로 넘긴 필드"""
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+class JsonFormatter(logging.Formatter):
+    """한 줄 JSON 로그 (시각, 레벨, 로거, 메시지, 요청 ID, extra 필드, 예외)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    """사람이 읽기 위한 한 줄 형식 (개발용, extra 필드는 key=value로 뒤에 붙임)"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not getattr(record, "request_id", None):
+            record.request_id = "-"
+        text = super().format(record)
+        extra = _extra_fields(record)
+        if extra:
+            text += " " + " ".join(f"{key}={value}" for key, value in extra.items())
+        return text
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """로그를 큐에 넣기만 하는 핸들러 (출력은 별도 스레드의 QueueListener가 담당)
+
+    큐가 가득 차면 기다리지 않고 버리므로 stdout 파이프가 막혀도 요청 처리가 멈추지 않는다.
+    메시지 인자 치환과 요청 ID 기록만 여기서 하고, JSON 직렬화와 쓰기는 리스너 스레드에서 한다.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 인자가 나중에 바뀌어도 기록 시점의 값이 남도록 메시지만 미리 확정
+        record.msg = record.getMessage()
+        record.args = None
+        record.request_id = request_id.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[_NonBlockingQueueHandler] = None
+
+def setup_logging(level: str = None, levels: Dict[str, str] = None, format: str = None, queue_size: int = None):
+    """루트 로거를 큐 기반 핸들러로 설정 (여러 번 호출해도 한 번만 적용)
+
+    levels는 {"로거 이름": "레벨"}로 모듈별 레벨을 지정한다. 레벨 미만의 로그는 LogRecord를
+    만들기 전에 걸러지므로 debug 로그는 꺼져 있을 때 비용이 거의 없다.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+    config = model_settings.logging_config
+    level = level or config["level"]
+    levels = levels if levels is not None else config["levels"]
+    format = format or config["format"]
+    queue_size = queue_size or config["queue_size"]
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if format == "json" else TextFormatter())
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = _NonBlockingQueueHandler(log_queue)
+    _listener = QueueListener(log_queue, stream, respect_handler_level=False)
+
+    root = logging.getLogger()
+    root.setLevel(level.upper())
+    root.addHandler(_queue_handler)
+    for name, name_level in levels.items():
+        logging.getLogger(name).setLevel(name_level.upper())
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """큐에 남은 로그를 모두 쓰고 리스너 스레드 종료"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    logging.getLogger().removeHandler(_queue_handler)
+    if _queue_handler.dropped:
+        sys.stderr.write(f"로그 큐가 가득 차 {_queue_handler.dropped}개의 로그를 버렸습니다\n")
+    _listener = None
+    _queue_handler = None
+
+class RequestIdMiddleware:
+    """요청마다 ID를 정해 로그 컨텍스트와 응답 헤더(X-Request-ID)에 기록하는 ASGI 미들웨어
+
+    클라이언트가 X-Request-ID를 보내면 그 값을 그대로 쓴다. 스트리밍 응답과 연결 종료
+    감지에 영향을 주지 않도록 BaseHTTPMiddleware 대신 send만 감싼다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        value = None
+        for name, header in scope.get("headers", []):
+            if name == REQUEST_ID_HEADER.encode():
+                value = header.decode("latin-1")[:64]
+                break
+        value = value or new_request_id()
+        token = request_id.set(value)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (REQUEST_ID_HEADER.encode(), value.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id.reset(token)
@@ -0,0 +1,302 @@
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from src.core.config import model_settings
+
+logger = logging.getLogger(__name__)
+
+# 지연 시간 히스토그램 구간 (초)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 이벤트 루프 지연 구간 (초, 짧은 지연을 더 촘촘하게)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+# (레이블 딕셔너리, 값) 목록
+Samples = List[Tuple[Dict[str, str], float]]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _NoopTimer:
+    """비활성화 상태의 타이머 (아무것도 하지 않음)"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP_TIMER = _NoopTimer()
+
+class _Timer:
+    def __init__(self, histogram: "Histogram", labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+class Metric(ABC):
+    """레이블 값 조합별로 값을 두는 지표의 공통 부분
+
+    enabled가 거짓이면 기록 메서드가 첫 줄에서 바로 반환하므로 계측 지점을 그대로 두어도
+    비용이 거의 없다. 스레드(Chroma 호출 등)에서도 기록하므로 값 갱신은 잠금 안에서 한다.
+    """
+
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help: str, labelnames: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        # 기록 경로에서는 값을 그대로 키로 쓰고 문자열 변환은 출력할 때만 함
+        return tuple(map(labels.get, self.labelnames)) if labels else (None,) * len(self.labelnames)
+
+    def _labels(self, key: Tuple) -> Dict[str, str]:
+        return {name: "" if value is None else value for name, value in zip(self.labelnames, key)}
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """Prometheus 텍스트 형식의 값 줄 목록 (HELP/TYPE 줄 제외)"""
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}" for key, value in items]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(Metric):
+    """누적 구간 히스토그램 (Prometheus histogram 형식의 _bucket/_sum/_count)"""
+
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # 레이블 조합별 [구간별 개수..., +Inf 개수, 합계]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(self.buckets) + 2)
+            values[index] += 1
+            values[-1] += value
+
+    def time(self, **labels):
+        """with 블록의 실행 시간을 기록하는 타이머"""
+        if not self.registry.enabled:
+            return _NOOP_TIMER
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        values = self._values.get(self._key(labels))
+        return int(sum(values[:-1])) if values else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(values)) for key, values in self._values.items()]
+        lines = []
+        for key, values in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), values[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(values[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {_format_value(cumulative)}")
+        return lines
+
+class MetricsRegistry:
+    """지표 등록과 Prometheus 텍스트 형식 출력
+
+    collector는 조회 시점에 (이름, 종류, 설명, 샘플) 목록을 돌려주는 함수로, 게이트웨이
+    대기열처럼 이미 다른 곳에서 관리하는 값을 복사하지 않고 내보낼 때 쓴다.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Samples]]]] = []
+
+    def _register(self, metric: Metric) -> Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self, name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(self, name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, help, labelnames, buckets=buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Samples]]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            samples = metric.render()
+            if samples:
+                lines.extend([f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.kind}", *samples])
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                logger.warning("지표 수집 중 오류: %s", e)
+                continue
+            for name, kind, help, samples in families:
+                lines.extend([f"# HELP {name} {help}", f"# TYPE {name} {kind}"])
+                lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+def timed_iter(iterable: Iterable, histogram: Histogram, **labels) -> Iterator:
+    """반복자를 그대로 넘기면서 다음 항목을 만드는 데 걸린 시간만 합산해 끝날 때 한 번 기록
+
+    청크 분할처럼 소비하는 쪽이 중간에 await하는 지연 생성기의 순수 생성 시간을 잴 때 쓴다.
+    """
+    if not histogram.registry.enabled:
+        return iter(iterable)
+    return _timed_iter(iter(iterable), histogram, labels)
+
+def _timed_iter(iterator: Iterator, histogram: Histogram, labels: Dict) -> Iterator:
+    elapsed = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - started
+            yield item
+    finally:
+        histogram.observe(elapsed, **labels)
+
+class LoopLagMonitor:
+    """이벤트 루프 지연 측정 - interval마다 깨어나 예정보다 늦게 깨어난 시간을 기록
+
+    동기 호출이 루프를 막으면 이 값이 커지므로 블로킹 회귀를 찾는 데 쓴다.
+    """
+
+    def __init__(self, interval: float = None):
+        self.interval = interval or model_settings.METRICS_LOOP_LAG_INTERVAL_SECONDS
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if registry.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            LOOP_LAG_SECONDS.observe(lag)
+            LOOP_LAG_LAST.set(lag)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+# 전역 레지스트리와 공용 지표 (metrics.enabled가 거짓이면 모두 기록하지 않음)
+registry = MetricsRegistry(enabled=model_settings.METRICS_ENABLED)
+
+EMBEDDING_SECONDS = registry.histogram(
+    "bento_embedding_seconds", "임베딩 백엔드 호출 시간 (캐시 미스분)", ("model",))
+EMBEDDING_TEXTS = registry.counter(
+    "bento_embedding_texts_total", "임베딩 백엔드로 보낸 텍스트 수", ("model",))
+EMBEDDING_TOKENS = registry.counter(
+    "bento_embedding_tokens_total", "제공자가 응답 usage로 보고한 임베딩 입력 토큰 수", ("model",))
+CACHE_LOOKUPS = registry.counter(
+    "bento_cache_lookups_total", "캐시 조회 결과 수", ("cache", "result"))
+CHROMA_SECONDS = registry.histogram(
+    "bento_chroma_seconds", "Chroma 호출 시간", ("operation",))
+PARSE_SECONDS = registry.histogram(
+    "bento_parse_seconds", "문서 파싱 시간 (PDF는 페이지 구간별)", ("file_type",))
+PARSE_PAGES = registry.counter(
+    "bento_parse_pages_total", "파싱한 페이지(텍스트 구간) 수", ("file_type",))
+CHUNK_SECONDS = registry.histogram(
+    "bento_chunk_seconds", "페이지별 청크 분할 시간")
+CHUNKS = registry.counter(
+    "bento_chunks_total", "생성한 청크 수")
+SEARCH_SECONDS = registry.histogram(
+    "bento_search_seconds", "검색 요청 처리 시간 (임베딩/재정렬 포함)", ("mode",))
+RERANK_SECONDS = registry.histogram(
+    "bento_rerank_seconds", "검색 결과 재정렬 시간 (요청 단위)")
+SEARCH_QUERIES = registry.counter(
+    "bento_search_queries_total", "검색한 질의 수", ("mode",))
+CHAT_TTFT_SECONDS = registry.histogram(
+    "bento_chat_ttft_seconds", "요청부터 첫 토큰까지 걸린 시간", ("provider", "model"))
+CHAT_STREAM_SECONDS = registry.histogram(
+    "bento_chat_stream_seconds", "응답 스트림 전체 시간", ("provider", "model", "status"))
+CHAT_TOKENS = registry.counter(
+    "bento_chat_tokens_total", "채팅 모델 토큰 사용량", ("provider", "model", "type"))
+LOOP_LAG_SECONDS = registry.histogram(
+    "bento_event_loop_lag_seconds", "이벤트 루프가 예정보다 늦게 깨어난 시간", buckets=LAG_BUCKETS)
+LOOP_LAG_LAST = registry.gauge(
+    "bento_event_loop_lag_last_seconds", "가장 최근 측정한 이벤트 루프 지연")
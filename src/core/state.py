@@ -1,3 +1,8 @@
-from src.chat.service import ChatService
-
-chat_service = ChatService() 
\ No newline at end of file
+from src.chat.service import ChatService
+from src.rag.service import RAGService
+from src.rag.ingest import IngestionManager
+
+# 채팅과 문서 엔드포인트가 공유하는 단일 RAG 서비스 (Chroma 핸들 1개)
+rag_service = RAGService()
+chat_service = ChatService(rag_service=rag_service)
+ingestion_manager = IngestionManager(rag_service)
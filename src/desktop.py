@@ -1,6 +1,8 @@
+import logging
 import webview
 import uvicorn
 import threading
+import multiprocessing
 import sys
 import os
 import time
@@ -17,6 +19,8 @@ os.environ['STATIC_PATH'] = static_path
 
 from src.main import app
 
+logger = logging.getLogger(__name__)
+
 def start_server():
     config = uvicorn.Config(
         app=app,
@@ -32,33 +36,35 @@ def start_server():
     server.run()
 
 def wait_for_server():
-    print("서버 시작 대기 중...")
+    logger.info("서버 시작 대기 중")
     max_attempts = 50
     attempts = 0
     while attempts < max_attempts:
         try:
             response = requests.get('http://127.0.0.1:8000')
-            print("서버 시작됨!")
+            logger.info("서버 시작됨")
             return True
         except ConnectionError:
             attempts += 1
             time.sleep(0.1)
-    print("서버 시작 실패!")
+    logger.error("서버 시작 실패")
     return False
 
 if __name__ == '__main__':
-    print("애플리케이션 시작...")
+    # 문서 파싱 프로세스 풀이 PyInstaller 실행 파일에서도 동작하도록 필요
+    multiprocessing.freeze_support()
+    logger.info("애플리케이션 시작")
     
     if sys.platform == 'win32':
         os.environ['PYTHONUNBUFFERED'] = '1'
         os.environ['PYTHONASYNCIODEBUG'] = '1'
 
-    print("서버 스레드 시작...")
+    logger.info("서버 스레드 시작")
     server_thread = threading.Thread(target=start_server, daemon=True)
     server_thread.start()
 
     if wait_for_server():
-        print("웹뷰 생성 중...")
+        logger.info("웹뷰 생성 중")
         window = webview.create_window(
             title='Bento Chat Assistant',
             url='http://127.0.0.1:8000',
@@ -70,8 +76,8 @@ if __name__ == '__main__':
             x=None,
             y=None,
         )
-        print("웹뷰 시작...")
+        logger.info("웹뷰 시작")
         webview.start(debug=False)
     else:
-        print("서버 시작 실패로 프로그램을 종료합니다.")
+        logger.error("서버 시작 실패로 프로그램을 종료합니다")
         sys.exit(1)
\ No newline at end of file
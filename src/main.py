@@ -1,13 +1,39 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from src.chat.router import router as chat_router
 from src.rag.router import router as rag_router
+from src.core.log import RequestIdMiddleware, setup_logging
+from src.core.metrics import LoopLagMonitor, registry
+from src.core.state import chat_service, rag_service, ingestion_manager
 
-app = FastAPI()
+# print 대신 큐 기반 JSON 로그 사용 (logging 설정 참고)
+setup_logging()
+
+loop_lag_monitor = LoopLagMonitor()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await rag_service.start()
+    await ingestion_manager.start()
+    loop_lag_monitor.start()
+    yield
+    await loop_lag_monitor.close()
+    await ingestion_manager.close()
+    await chat_service.close()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(RequestIdMiddleware)
 
 app.include_router(chat_router, prefix="/api/v1")
 app.include_router(rag_router, prefix="/api/v1")
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus 텍스트 형식의 성능 지표 (metrics.enabled가 거짓이면 수집된 값 없음)"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 static_path = os.getenv('STATIC_PATH', 'static')
-app.mount("/", StaticFiles(directory=static_path, html=True), name="static")
\ No newline at end of file
+app.mount("/", StaticFiles(directory=static_path, html=True), name="static")
@@ -0,0 +1,365 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from .filters import normalize_filters, split_tags
+
+logger = logging.getLogger(__name__)
+
+# 문서 단위로 관리하는 메타데이터 (모든 청크에 동일하게 저장됨)
+DOCUMENT_FIELDS = ("category", "description", "tags")
+
+CATALOG_COLUMNS = [
+    "source", "document_id", "timestamp", "status", "category", "description", "tags",
+    "file_hash", "chunk_count", "char_count", "updated_at"
+]
+
+# 목록 정렬에 사용할 수 있는 컬럼
+SORT_COLUMNS = ("timestamp", "updated_at", "source", "chunk_count", "char_count")
+
+# 요약 모드에서 반환하는 컬럼
+SUMMARY_COLUMNS = ("document_id", "source", "timestamp", "status", "chunk_count", "char_count")
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, ensure_ascii=False).encode()).decode()
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("잘못된 커서입니다")
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError("잘못된 커서입니다")
+    return values
+
+def document_id_for(source: str) -> str:
+    """원본 파일명 기반의 고정 문서 ID (재수집으로 청크 ID가 바뀌어도 유지됨)"""
+    return hashlib.md5(f"document\0{source}".encode()).hexdigest()
+
+class DocumentCatalog:
+    """원본 문서 -> 청크 ID/개수/메타데이터 색인 (SQLite)
+
+    목록 조회, 삭제, 메타데이터 수정이 컬렉션 전체를 훑지 않고 문서 하나의 청크 ID만
+    다루도록 한다. 컬렉션과 어긋난 경우(이전 버전 데이터, 비정상 종료) 시작 시 다시 만든다.
+    태그는 document_tags 표에 한 행씩 두어, 검색 필터에 맞는 청크 수와 ID를 색인으로 바로 구한다.
+    """
+
+    def __init__(self, persist_directory: str, collection_name: str):
+        os.makedirs(persist_directory, exist_ok=True)
+        self.path = os.path.join(persist_directory, f"{collection_name}.catalog.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "source TEXT PRIMARY KEY, document_id TEXT UNIQUE, timestamp TEXT, status TEXT, "
+            "category TEXT, description TEXT, tags TEXT, file_hash TEXT, "
+            "chunk_count INTEGER, char_count INTEGER, updated_at TEXT)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "id TEXT PRIMARY KEY, source TEXT NOT NULL, position INTEGER, size INTEGER)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_source ON chunks (source, position)")
+        has_tag_table = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'document_tags'"
+        ).fetchone()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS document_tags ("
+            "tag TEXT NOT NULL, source TEXT NOT NULL, PRIMARY KEY (tag, source))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS document_tags_source ON document_tags (source)")
+        for column in ("timestamp", "updated_at", "chunk_count", "char_count", "category"):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS documents_{column} ON documents ({column}, source)")
+        # 이전 버전 카탈로그는 tags 문자열만 있으므로 태그 표를 채우고, 청크의 태그 키도 다시 쓰도록 표시
+        self.tags_migrated = False
+        if not has_tag_table:
+            rows = self._conn.execute("SELECT source, tags FROM documents WHERE tags != ''").fetchall()
+            for source, tags in rows:
+                self._write_tags(source, tags)
+            self.tags_migrated = bool(rows)
+        self._conn.commit()
+
+    def _write_tags(self, source: str, tags):
+        self._conn.execute("DELETE FROM document_tags WHERE source = ?", (source,))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO document_tags (tag, source) VALUES (?, ?)",
+            [(tag, source) for tag in split_tags(tags)]
+        )
+
+    def chunk_total(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def rebuild(self, collection, page_size: int = 1000):
+        """컬렉션 전체를 페이지 단위로 한 번 읽어 색인 재생성"""
+        sources: Dict[str, Dict[str, Dict]] = {}
+        offset = 0
+        while True:
+            results = collection.get(include=["metadatas", "documents"], limit=page_size, offset=offset)
+            if not results["ids"]:
+                break
+            for chunk_id, metadata, content in zip(results["ids"], results["metadatas"], results["documents"]):
+                # 이전 버전 청크에는 크기 정보가 없으므로 본문 길이로 채움
+                metadata = {**metadata, "size": metadata.get("size", len(content or ""))}
+                sources.setdefault(metadata.get("source", ""), {})[chunk_id] = metadata
+            offset += len(results["ids"])
+
+        with self._lock:
+            self._conn.execute("DELETE FROM documents")
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("DELETE FROM document_tags")
+            self._conn.commit()
+        for source, chunks in sources.items():
+            self.sync_source(source, chunks)
+        logger.info("문서 카탈로그 재생성 완료: 문서 %d개, 청크 %d개", len(sources), offset)
+
+    def sync_source(self, source: str, chunks: Dict[str, Dict]):
+        """문서 하나의 색인을 청크 메타데이터 기준으로 다시 기록 (청크가 없으면 제거)"""
+        if not chunks:
+            self.delete_source(source)
+            return
+        ordered = sorted(chunks.items(), key=lambda item: item[1].get("chunk_id", 0))
+        first = ordered[0][1]
+        # 일부 청크만 완료된 경우 문서 전체는 처리 중으로 표시
+        statuses = {metadata.get("status", "completed") for _, metadata in ordered}
+        status = "completed" if statuses == {"completed"} else "processing"
+        self.put_document(
+            source,
+            [(chunk_id, metadata.get("chunk_id", i), metadata.get("size", 0))
+             for i, (chunk_id, metadata) in enumerate(ordered)],
+            timestamp=first.get("timestamp", ""),
+            status=status,
+            file_hash=first.get("file_hash", ""),
+            **{key: first.get(key, "") for key in DOCUMENT_FIELDS}
+        )
+
+    def put_document(self, source: str, chunks: List[Tuple[str, int, int]], **fields):
+        """문서 행과 청크 목록(ID, 순서, 크기)을 교체"""
+        now = datetime.now().isoformat()
+        row = {
+            "source": source,
+            "document_id": document_id_for(source),
+            "timestamp": fields.get("timestamp", now),
+            "status": fields.get("status", "completed"),
+            "file_hash": fields.get("file_hash", ""),
+            "chunk_count": len(chunks),
+            "char_count": sum(size for _, _, size in chunks),
+            "updated_at": now,
+            **{key: fields.get(key, "") for key in DOCUMENT_FIELDS}
+        }
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, source, position, size) VALUES (?, ?, ?, ?)",
+                [(chunk_id, source, position, size) for chunk_id, position, size in chunks]
+            )
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO documents ({', '.join(CATALOG_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(CATALOG_COLUMNS))})",
+                [row[column] for column in CATALOG_COLUMNS]
+            )
+            self._write_tags(source, row["tags"])
+            self._conn.commit()
+
+    def add_chunks(self, source: str, chunks: Iterable[Tuple[str, int, int]], **fields):
+        """수집 중 저장된 청크를 색인에 추가 (문서 행이 없으면 processing 상태로 생성)"""
+        chunks = list(chunks)
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, source, position, size) VALUES (?, ?, ?, ?)",
+                [(chunk_id, source, position, size) for chunk_id, position, size in chunks]
+            )
+            exists = self._conn.execute("SELECT 1 FROM documents WHERE source = ?", (source,)).fetchone()
+            if exists:
+                self._conn.execute("UPDATE documents SET status = 'processing', updated_at = ? WHERE source = ?", (now, source))
+            else:
+                row = {
+                    "source": source,
+                    "document_id": document_id_for(source),
+                    "timestamp": fields.get("timestamp", now),
+                    "status": "processing",
+                    "file_hash": "",
+                    "chunk_count": 0,
+                    "char_count": 0,
+                    "updated_at": now,
+                    **{key: fields.get(key, "") for key in DOCUMENT_FIELDS}
+                }
+                self._conn.execute(
+                    f"INSERT INTO documents ({', '.join(CATALOG_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(CATALOG_COLUMNS))})",
+                    [row[column] for column in CATALOG_COLUMNS]
+                )
+                self._write_tags(source, row["tags"])
+            self._conn.execute(
+                "UPDATE documents SET chunk_count = (SELECT COUNT(*) FROM chunks WHERE source = ?), "
+                "char_count = (SELECT COALESCE(SUM(size), 0) FROM chunks WHERE source = ?) WHERE source = ?",
+                (source, source, source)
+            )
+            self._conn.commit()
+
+    def resolve(self, document_id: str) -> Optional[str]:
+        """문서 ID 또는 청크 ID로 원본 파일명 조회"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source FROM documents WHERE document_id = ?", (document_id,)
+            ).fetchone()
+            if row is None:
+                row = self._conn.execute("SELECT source FROM chunks WHERE id = ?", (document_id,)).fetchone()
+        return row[0] if row else None
+
+    def get_document(self, source: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(CATALOG_COLUMNS)} FROM documents WHERE source = ?", (source,)
+            ).fetchone()
+        return dict(zip(CATALOG_COLUMNS, row)) if row else None
+
+    def list_documents(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(CATALOG_COLUMNS)} FROM documents ORDER BY timestamp DESC, source"
+            ).fetchall()
+        return [dict(zip(CATALOG_COLUMNS, row)) for row in rows]
+
+    def query_documents(self, limit: int = 20, cursor: str = None, sort: str = "timestamp",
+                        descending: bool = True, category: str = None, tag: str = None,
+                        since: str = None, until: str = None) -> Tuple[List[Dict], Optional[str]]:
+        """필터/정렬된 문서 한 페이지와 다음 페이지 커서
+
+        커서는 마지막 행의 (정렬 값, source)이므로 앞 페이지를 건너뛰지 않고 색인에서
+        바로 이어 읽는다 (문서 수와 무관하게 페이지 크기만큼만 조회).
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"지원하지 않는 정렬 기준입니다: {sort}")
+        conditions = []
+        params: list = []
+        if category is not None:
+            conditions.append("category = ?")
+            params.append(category)
+        if tag:
+            conditions.append("source IN (SELECT source FROM document_tags WHERE tag = ?)")
+            params.append(tag)
+        if since:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            conditions.append("timestamp < ?")
+            params.append(until)
+        if cursor:
+            conditions.append(f"({sort}, source) {'<' if descending else '>'} (?, ?)")
+            params.extend(decode_cursor(cursor))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        direction = "DESC" if descending else "ASC"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(CATALOG_COLUMNS)} FROM documents {where} "
+                f"ORDER BY {sort} {direction}, source {direction} LIMIT ?",
+                [*params, limit + 1]
+            ).fetchall()
+        documents = [dict(zip(CATALOG_COLUMNS, row)) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = documents[-1]
+            next_cursor = encode_cursor([last[sort], last["source"]])
+        return documents, next_cursor
+
+    @staticmethod
+    def _filter_conditions(filters: Dict) -> Tuple[str, list]:
+        """검색 필터를 documents 표의 WHERE 절로 (태그는 모두 가진 문서만)"""
+        conditions = []
+        params: list = []
+        for key in ("category", "source"):
+            if key in filters:
+                conditions.append(f"{key} = ?")
+                params.append(filters[key])
+        for tag in filters.get("tags", []):
+            conditions.append("source IN (SELECT source FROM document_tags WHERE tag = ?)")
+            params.append(tag)
+        return " AND ".join(conditions) or "1", params
+
+    def filter_chunk_count(self, filters: Optional[Dict]) -> int:
+        """검색 필터에 맞는 청크 수 (문서별 청크 수의 합이므로 청크 표를 훑지 않음)"""
+        condition, params = self._filter_conditions(normalize_filters(filters))
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT COALESCE(SUM(chunk_count), 0) FROM documents WHERE {condition}", params
+            ).fetchone()
+        return row[0]
+
+    def filter_chunk_ids(self, filters: Optional[Dict]) -> List[str]:
+        """검색 필터에 맞는 모든 청크 ID"""
+        condition, params = self._filter_conditions(normalize_filters(filters))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id FROM chunks WHERE source IN (SELECT source FROM documents WHERE {condition})",
+                params
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def filter_facets(self) -> Dict[str, Dict[str, int]]:
+        """카테고리/태그별 문서 수와 청크 수 (검색 필터 선택용)"""
+        with self._lock:
+            categories = self._conn.execute(
+                "SELECT category, COUNT(*), COALESCE(SUM(chunk_count), 0) FROM documents "
+                "WHERE category != '' GROUP BY category ORDER BY category"
+            ).fetchall()
+            tags = self._conn.execute(
+                "SELECT t.tag, COUNT(*), COALESCE(SUM(d.chunk_count), 0) FROM document_tags t "
+                "JOIN documents d ON d.source = t.source GROUP BY t.tag ORDER BY t.tag"
+            ).fetchall()
+        return {
+            "categories": {name: {"documents": documents, "chunks": chunks} for name, documents, chunks in categories},
+            "tags": {name: {"documents": documents, "chunks": chunks} for name, documents, chunks in tags}
+        }
+
+    def tagged_sources(self) -> Dict[str, List[str]]:
+        """태그가 있는 문서별 태그 목록"""
+        with self._lock:
+            rows = self._conn.execute("SELECT source, tag FROM document_tags ORDER BY source, tag").fetchall()
+        sources: Dict[str, List[str]] = {}
+        for source, tag in rows:
+            sources.setdefault(source, []).append(tag)
+        return sources
+
+    def chunk_ids(self, source: str, offset: int = 0, limit: int = None) -> List[str]:
+        """문서의 청크 ID (순서대로, offset/limit으로 일부만 조회 가능)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM chunks WHERE source = ? ORDER BY position LIMIT ? OFFSET ?",
+                (source, -1 if limit is None else limit, offset)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def update_document(self, source: str, fields: Dict):
+        """문서 단위 메타데이터 갱신"""
+        fields = {key: value for key, value in fields.items() if key in DOCUMENT_FIELDS}
+        if not fields:
+            return
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE documents SET {assignments}, updated_at = ? WHERE source = ?",
+                [*fields.values(), datetime.now().isoformat(), source]
+            )
+            if "tags" in fields:
+                self._write_tags(source, fields["tags"])
+            self._conn.commit()
+
+    def delete_source(self, source: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+            self._conn.execute("DELETE FROM documents WHERE source = ?", (source,))
+            self._conn.execute("DELETE FROM document_tags WHERE source = ?", (source,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,115 @@
+import re
+import zlib
+from typing import Iterator, List, Sequence, Tuple
+from .tokens import estimate_tokens
+
+# 분할 경계 후보 - 경계는 매치가 끝나는 위치
+SEPARATORS = {
+    "paragraph": r"\n[ \t]*\n\s*",
+    "line": r"\n",
+    "sentence": r"[.!?。](?=\s)\s*",
+    # 한국어 종결어미 + 마침표 (뒤에 공백이 없어도 문장 경계로 취급)
+    "korean": r"(?<=[다요죠까음함임])[.!?](?=\S)",
+}
+
+DEFAULT_SEPARATORS = ("paragraph", "line", "sentence", "korean")
+
+class TextChunker:
+    """단일 패스 청크 분할기
+
+    텍스트를 구분자 경계에서 문장 단위로 한 번만 나눈 뒤, 크기 예산(문자 또는 토큰)에
+    맞게 순서대로 채워 청크를 생성한다. 각 단위는 최대 한 번의 오버랩 구간에만 다시
+    포함되므로 입력 길이에 선형 시간이며, 청크는 제너레이터로 하나씩 반환된다.
+
+    content_defined가 켜져 있으면 청크가 절반 이상 찼을 때 단위 내용의 해시로 경계를
+    정하므로, 문서 일부를 수정해도 수정 지점 이후의 청크 경계가 금방 원래대로 맞춰진다.
+    대신 청크가 평균적으로 chunk_size의 절반 남짓으로 작아져 청크/임베딩 수가 늘어난다.
+    """
+
+    def __init__(self, chunk_size: int, overlap: int = 0, unit: str = "chars",
+                 separators: Sequence[str] = DEFAULT_SEPARATORS, content_defined: bool = False,
+                 boundary_divisor: int = 4):
+        if unit not in ("chars", "tokens"):
+            raise ValueError(f"지원하지 않는 청크 단위입니다: {unit}")
+        self.chunk_size = max(1, chunk_size)
+        # 오버랩이 청크 크기 이상이면 진행이 보장되지 않으므로 제한
+        self.overlap = max(0, min(overlap, self.chunk_size // 2))
+        self.unit = unit
+        self.content_defined = content_defined
+        self.boundary_divisor = max(1, boundary_divisor)
+        unknown = [name for name in separators if name not in SEPARATORS]
+        if unknown:
+            raise ValueError(f"지원하지 않는 구분자입니다: {', '.join(unknown)}")
+        self._boundary = re.compile("|".join(f"(?:{SEPARATORS[name]})" for name in separators)) if separators else None
+
+    def _size(self, text: str) -> int:
+        return len(text) if self.unit == "chars" else estimate_tokens(text)
+
+    def _units(self, text: str) -> Iterator[Tuple[str, int]]:
+        """경계 단위로 자른 조각과 크기 (예산보다 큰 조각은 강제로 나눔)"""
+        start = 0
+        boundaries = self._boundary.finditer(text) if self._boundary else ()
+        for match in boundaries:
+            end = match.end()
+            if end > start:
+                yield from self._split_oversized(text[start:end])
+                start = end
+        if start < len(text):
+            yield from self._split_oversized(text[start:])
+
+    def _split_oversized(self, piece: str) -> Iterator[Tuple[str, int]]:
+        size = self._size(piece)
+        if size <= self.chunk_size:
+            yield piece, size
+            return
+        # 토큰 단위일 때는 문자당 최대 4바이트 기준으로 안전한 길이 계산
+        length = self.chunk_size if self.unit == "chars" else max(1, self.chunk_size * 3 // 4)
+        # 조각 하나가 청크 하나를 채워 이월이 불가능하므로 조각끼리 오버랩만큼 겹치게 자름
+        overlap = self.overlap * length // self.chunk_size
+        stride = max(1, length - overlap)
+        for i in range(0, max(1, len(piece) - overlap), stride):
+            part = piece[i:i + length]
+            yield part, self._size(part)
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        current: List[Tuple[str, int]] = []
+        current_size = 0
+        # 현재 청크 앞부분 중 이전 청크에서 이월된 단위 수
+        carried = 0
+        for piece, size in self._units(text):
+            if len(current) > carried and current_size + size > self.chunk_size:
+                chunk = "".join(p for p, _ in current).strip()
+                if chunk:
+                    yield chunk
+                current, current_size = self._carry_over(current, size)
+                carried = len(current)
+            current.append((piece, size))
+            current_size += size
+            if self.content_defined and current_size * 2 >= self.chunk_size and self._is_anchor(piece):
+                chunk = "".join(p for p, _ in current).strip()
+                if chunk:
+                    yield chunk
+                current, current_size = self._carry_over(current, 0)
+                carried = len(current)
+        if len(current) > carried:
+            chunk = "".join(p for p, _ in current).strip()
+            if chunk:
+                yield chunk
+
+    def _is_anchor(self, piece: str) -> bool:
+        """내용 기반 경계 여부 (위치와 무관하게 같은 조각이면 같은 결과)"""
+        return zlib.crc32(piece.encode("utf-8")) % self.boundary_divisor == 0
+
+    def _carry_over(self, units: List[Tuple[str, int]], next_size: int) -> Tuple[List[Tuple[str, int]], int]:
+        """이전 청크 끝부분에서 오버랩 예산 안의 단위만 다음 청크로 이월"""
+        carried = []
+        total = 0
+        for piece, size in reversed(units):
+            if total + size > self.overlap:
+                break
+            carried.append((piece, size))
+            total += size
+        if total + next_size > self.chunk_size:
+            return [], 0
+        carried.reverse()
+        return carried, total
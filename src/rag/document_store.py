@@ -1,109 +1,437 @@
+import asyncio
+import logging
 import chromadb
 from chromadb.config import Settings
 import os
+import numpy as np
 from .embeddings import EmbeddingModel
-from typing import List, Dict
+from .embedding_cache import EmbeddingCache
+from .catalog import DocumentCatalog
+from .filters import build_where, tag_metadata
+from .lexical import LexicalIndex, reciprocal_rank_fusion
+from .rerank import normalize_rows
+from src.core.config import model_settings
+from src.core.metrics import CHROMA_SECONDS
+from typing import List, Dict, Optional
 from .models import SearchResult
+import re
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLLECTION = "documents"
+
+# vector: 임베딩 유사도만, lexical: BM25만 (임베딩 호출 없음), hybrid: 두 순위를 RRF로 결합
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+
+# 메타데이터 조건이 있을 때 어휘 후보를 더 많이 뽑는 배수 (조건에 맞지 않는 후보가 빠지므로)
+LEXICAL_FILTER_OVERFETCH = 4
+
+def collection_name_for(embedding_model: str) -> str:
+    """임베딩 모델별 컬렉션 이름 (차원이 다른 벡터가 섞이지 않도록 분리)"""
+    if embedding_model == "text-embedding-3-small":
+        return DEFAULT_COLLECTION
+    suffix = re.sub(r"[^a-zA-Z0-9_-]", "-", embedding_model)
+    return f"{DEFAULT_COLLECTION}_{suffix}"[:63].rstrip("-_")
 
 class DocumentStore:
     def __init__(self, persist_directory: str = "data/chroma", openai_api_key: str = None):
-        print(f"DocumentStore 초기화: {persist_directory}")
-        os.makedirs(persist_directory, exist_ok=True)
-        self.client = chromadb.PersistentClient(path=persist_directory)
+        self.persist_directory = persist_directory
+        self._client = None
         self._embedding_model = None
+        self._retired_embedding_models = []
         self._openai_api_key = openai_api_key
         self._collection = None
+        self._embedding_cache = None
+        self._catalog = None
+        # 청크 본문 BM25 색인 (시작 시 컬렉션에서 만들고 이후 추가/삭제를 증분 반영)
+        self.lexical_index = LexicalIndex()
+        self._lexical_build = None
+
+    @property
+    def embedding_cache(self):
+        if self._embedding_cache is None and model_settings.RAG_EMBEDDING_CACHE_ENABLED:
+            self._embedding_cache = EmbeddingCache(
+                self.persist_directory,
+                dtype=model_settings.RAG_EMBEDDING_CACHE_DTYPE,
+                memory_limit_mb=model_settings.RAG_EMBEDDING_CACHE_MEMORY_MB
+            )
+        return self._embedding_cache
+
+    @property
+    def client(self):
+        if self._client is None:
+            logger.debug("DocumentStore 초기화: %s", self.persist_directory)
+            os.makedirs(self.persist_directory, exist_ok=True)
+            self._client = chromadb.PersistentClient(path=self.persist_directory)
+        return self._client
     
     @property
     def embedding_model(self):
         if self._embedding_model is None:
-            print(f"임베딩 모델 초기화 (API 키 존재: {bool(self._openai_api_key)})")
-            self._embedding_model = EmbeddingModel(api_key=self._openai_api_key)
+            logger.debug("임베딩 모델 초기화 (API 키 존재: %s)", bool(self._openai_api_key))
+            self._embedding_model = EmbeddingModel(
+                api_key=self._openai_api_key,
+                cache=self.embedding_cache
+            )
         return self._embedding_model
 
+    @property
+    def requires_api_key(self) -> bool:
+        """현재 임베딩 백엔드가 OpenAI API 키를 필요로 하는지 여부"""
+        return self.embedding_model.requires_api_key
+
+    @property
+    def has_credentials(self) -> bool:
+        return bool(self._openai_api_key) or not self.requires_api_key
+
+    def set_openai_api_key(self, api_key: str):
+        """API 키 교체 - Chroma 핸들은 유지하고 임베딩 클라이언트만 교체"""
+        if api_key == self._openai_api_key:
+            return
+        if self._embedding_model is not None and not self._embedding_model.requires_api_key:
+            # 로컬 백엔드는 키와 무관하므로 그대로 유지
+            self._openai_api_key = api_key
+            return
+        new_model = EmbeddingModel(api_key=api_key, cache=self.embedding_cache) if api_key else None
+        # 진행 중인 요청이 이전 클라이언트를 계속 쓸 수 있도록 종료 시점까지 보관
+        if self._embedding_model is not None:
+            self._retired_embedding_models.append(self._embedding_model)
+        self._embedding_model = new_model
+        self._openai_api_key = api_key
+
+    @property
+    def catalog(self) -> DocumentCatalog:
+        if self._catalog is None:
+            self._catalog = DocumentCatalog(self.persist_directory, self.collection.name)
+        return self._catalog
+
+    def open(self):
+        """Chroma 컬렉션과 문서 카탈로그를 미리 열어둠 (앱 시작 시 호출)
+
+        카탈로그의 청크 수가 컬렉션과 다르면 (이전 버전 데이터 등) 한 번 다시 만든다.
+        태그 키가 없는 이전 버전 청크에는 카탈로그의 태그로 키를 채운다.
+        """
+        collection = self.collection
+        migrate_tags = self.catalog.tags_migrated
+        if self.catalog.chunk_total() != collection.count():
+            self.catalog.rebuild(collection)
+            migrate_tags = True
+        if migrate_tags:
+            self.backfill_tag_metadata()
+        return collection
+
+    def backfill_tag_metadata(self):
+        """카탈로그에 기록된 태그를 청크 메타데이터의 태그 키(tag:<이름>)로 기록"""
+        sources = self.catalog.tagged_sources()
+        for source, tags in sources.items():
+            ids = self.catalog.chunk_ids(source)
+            if ids:
+                self.update_metadata(ids, [tag_metadata(tags)] * len(ids))
+        if sources:
+            logger.info("태그 메타데이터 갱신 완료: 문서 %d개", len(sources))
+
+    async def close(self):
+        """임베딩 클라이언트 정리 (앱 종료 시 호출)"""
+        if self._lexical_build is not None:
+            await asyncio.gather(self._lexical_build, return_exceptions=True)
+            self._lexical_build = None
+        models = self._retired_embedding_models
+        if self._embedding_model is not None:
+            models = models + [self._embedding_model]
+        for model in models:
+            await model.close()
+        self._retired_embedding_models = []
+        self._embedding_model = None
+        if self._embedding_cache is not None:
+            self._embedding_cache.close()
+            self._embedding_cache = None
+        if self._catalog is not None:
+            self._catalog.close()
+            self._catalog = None
+
     @property
     def collection(self):
         if self._collection is None:
-            print("Chroma 컬렉션 초기화")
+            logger.debug("Chroma 컬렉션 초기화")
             self._collection = self.client.get_or_create_collection(
-                name="documents",
+                name=collection_name_for(self.embedding_model.model),
                 metadata={"hnsw:space": "cosine"}
             )
         return self._collection
 
-    async def add_documents(self, documents: List[Dict], ids: List[str]):
-        print(f"문서 추가 시작: {len(documents)}개")
-        if not self._openai_api_key:
+    async def add_documents(self, documents: List[Dict], ids: List[str], progress=None):
+        logger.debug("문서 추가 시작: %d개", len(documents))
+        if not self.has_credentials:
             raise ValueError("OpenAI API 키가 설정되지 않았습니다")
         
         texts = [doc["content"] for doc in documents]
         metadatas = [doc["metadata"] for doc in documents]
         
         try:
-            # 임베딩 생성
-            print("임베딩 생성 시작")
-            embeddings = await self.embedding_model.encode(texts)
-            print("임베딩 생성 완료")
+            # 임베딩 생성 (채팅 요청이 몰려 게이트웨이 대기열이 차도 수집 작업은 실패하지 않고 대기)
+            embeddings = await self.embedding_model.encode(texts, background=True)
+            if progress:
+                progress.advance(chunks_embedded=len(texts))
             
-            # 문서 추가
-            print("Chroma에 문서 추가 시작")
-            self.collection.add(
-                documents=texts,
-                embeddings=embeddings,
-                metadatas=metadatas,
-                ids=ids
-            )
-            print("Chroma에 문서 추가 완료")
+            # 문서 추가 (재시도/재개 시 중복되지 않도록 upsert)
+            # HNSW 삽입과 SQLite 기록이 이벤트 루프를 막지 않도록 스레드에서 실행
+            with CHROMA_SECONDS.time(operation="upsert"):
+                await asyncio.to_thread(
+                    self.collection.upsert,
+                    documents=texts,
+                    embeddings=embeddings,
+                    metadatas=metadatas,
+                    ids=ids
+                )
+            await asyncio.to_thread(self.lexical_index.add, ids, texts)
+            logger.debug("Chroma에 문서 추가 완료: %d개", len(texts))
+            if progress:
+                progress.advance(chunks_stored=len(texts))
         except Exception as e:
-            print(f"문서 추가 중 오류 발생: {str(e)}")
+            logger.error("문서 추가 중 오류 발생: %s", e)
             raise
     
-    async def search(self, query: str, top_k: int = 3) -> List[SearchResult]:
-        query_embedding = await self.embedding_model.encode([query])
+    def get_source_chunks(self, source: str) -> Dict[str, Dict]:
+        """원본 파일에 속한 청크 ID와 메타데이터 (본문/임베딩 제외)"""
+        with CHROMA_SECONDS.time(operation="get"):
+            results = self.collection.get(where={"source": source}, include=["metadatas"])
+        return dict(zip(results["ids"], results["metadatas"]))
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict]):
+        """청크 메타데이터 일괄 갱신 (지정하지 않은 키는 유지됨)"""
+        with CHROMA_SECONDS.time(operation="update"):
+            self.collection.update(ids=ids, metadatas=metadatas)
+
+    def delete_ids(self, ids: List[str]):
+        with CHROMA_SECONDS.time(operation="delete"):
+            self.collection.delete(ids=ids)
+        self.lexical_index.remove(ids)
+
+    def delete_where(self, where: Dict):
+        """조건에 맞는 청크 삭제 (BM25 색인에서도 빼기 위해 ID를 먼저 조회)"""
+        ids = self.collection.get(where=where, include=[])["ids"]
+        if ids:
+            self.delete_ids(ids)
+
+    async def embed_query(self, query: str) -> List[float]:
+        return (await self.embedding_model.encode([query]))[0]
+
+    async def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """여러 질의를 한 번의 임베딩 요청으로 (배치 한도를 넘으면 백엔드가 나눠서) 계산"""
+        return await self.embedding_model.encode(list(queries))
+
+    def build_lexical_index(self) -> asyncio.Task:
+        """BM25 색인을 백그라운드에서 만들기 시작 (메모리에만 있으므로 시작할 때마다 컬렉션 본문으로 만듦)"""
+        # 실패한 경우 다음 호출에서 다시 시도
+        if self._lexical_build is None or (self._lexical_build.done() and not self.lexical_index.ready):
+            self._lexical_build = asyncio.create_task(
+                asyncio.to_thread(self.lexical_index.rebuild, self.collection)
+            )
+        return self._lexical_build
+
+    async def _ensure_lexical_index(self) -> LexicalIndex:
+        if not self.lexical_index.ready:
+            await asyncio.shield(self.build_lexical_index())
+        return self.lexical_index
+
+    async def _vector_query_many(self, queries: List[str], n_results: int, query_embeddings: List[List[float]] = None,
+                                 include_embeddings: bool = False, where: Dict = None) -> List[List[Dict]]:
+        """여러 질의 임베딩을 한 번의 collection.query로 조회"""
+        if query_embeddings is None:
+            query_embeddings = await self.embed_queries(queries)
+        
+        include = ["documents", "metadatas", "distances"]
+        if include_embeddings:
+            include.append("embeddings")
+        # Chroma 조회는 동기 호출이므로 이벤트 루프를 막지 않도록 스레드에서 실행
+        with CHROMA_SECONDS.time(operation="query"):
+            results = await asyncio.to_thread(
+                self.collection.query,
+                query_embeddings=list(query_embeddings),
+                n_results=n_results,
+                where=where or None,
+                include=include
+            )
         
-        results = self.collection.query(
-            query_embeddings=query_embedding,
-            n_results=top_k
+        per_query = []
+        for i in range(len(query_embeddings)):
+            hits = [
+                {
+                    "id": doc_id,
+                    "content": doc,
+                    "metadata": metadata,
+                    "score": float(score),
+                    "similarity": 1.0 - float(score)
+                }
+                for doc_id, doc, metadata, score in zip(
+                    results["ids"][i],
+                    results["documents"][i],
+                    results["metadatas"][i],
+                    results["distances"][i]
+                )
+            ]
+            if include_embeddings:
+                for hit, embedding in zip(hits, results["embeddings"][i]):
+                    hit["embedding"] = embedding
+            per_query.append(hits)
+        return per_query
+
+    def _exact_scan_ids(self, filters: Optional[Dict]) -> Optional[List[str]]:
+        """필터에 맞는 청크가 exact_search_max_chunks개 이하이면 그 ID 목록 (아니면 None)"""
+        if self.catalog.filter_chunk_count(filters) > model_settings.RAG_EXACT_SEARCH_MAX_CHUNKS:
+            return None
+        return self.catalog.filter_chunk_ids(filters)
+
+    async def _exact_query_many(self, queries: List[str], n_results: int, ids: List[str],
+                                query_embeddings: List[List[float]] = None,
+                                include_embeddings: bool = False) -> List[List[Dict]]:
+        """주어진 청크만 임베딩을 읽어 코사인 유사도로 정확히 순위를 매김
+
+        필터가 매우 좁으면 HNSW 탐색 중 조건에 맞는 노드가 드물어 결과가 모자라거나 느려지므로,
+        맞는 청크 수가 적을 때는 색인 대신 그 벡터들만 한 번의 행렬 곱으로 비교한다.
+        """
+        if query_embeddings is None:
+            query_embeddings = await self.embed_queries(queries)
+        chunks = await asyncio.to_thread(self.get_chunks, ids, True)
+        if not chunks:
+            return [[] for _ in query_embeddings]
+        
+        vectors = normalize_rows(np.asarray([chunk["embedding"] for chunk in chunks], dtype=np.float32))
+        similarity = normalize_rows(np.asarray(query_embeddings, dtype=np.float32)) @ vectors.T
+        n_results = min(n_results, len(chunks))
+        per_query = []
+        for row in similarity:
+            top = np.argpartition(-row, n_results - 1)[:n_results] if n_results < len(row) else np.arange(len(row))
+            top = top[np.argsort(-row[top], kind="stable")]
+            hits = []
+            for i in top:
+                hit = {
+                    "id": chunks[i]["id"],
+                    "content": chunks[i]["content"],
+                    "metadata": chunks[i]["metadata"],
+                    "score": 1.0 - float(row[i]),
+                    "similarity": float(row[i])
+                }
+                if include_embeddings:
+                    hit["embedding"] = chunks[i]["embedding"]
+                hits.append(hit)
+            per_query.append(hits)
+        return per_query
+
+    async def search(self, query: str, top_k: int = 3, query_embedding: List[float] = None,
+                     mode: Optional[str] = None, include_embeddings: bool = False,
+                     filters: Optional[Dict] = None) -> List[SearchResult]:
+        """검색 모드별 상위 top_k개 청크
+
+        - vector: score는 코사인 거리 (작을수록 유사), 유사도가 similarity_threshold 미만인 청크는 제외
+        - lexical: score는 BM25 점수이며 임베딩/네트워크 호출 없이 메모리 색인만 사용
+        - hybrid: 벡터/BM25 후보를 각각 search_candidates개씩 뽑아 RRF 점수로 결합.
+          유사도가 similarity_threshold 미만인 벡터 후보는 검색어가 본문에 없으면 제외한다.
+        include_embeddings가 참이면 결과마다 저장된 청크 임베딩("embedding")을 포함한다.
+        filters({"category", "source", "tags"})는 Chroma where 조건으로 적용하며, 맞는 청크가
+        exact_search_max_chunks개 이하이면 HNSW 대신 해당 벡터만 정확히 비교한다.
+        """
+        results = await self.search_many(
+            [query], top_k,
+            query_embeddings=[query_embedding] if query_embedding is not None else None,
+            mode=mode, include_embeddings=include_embeddings, filters=filters
         )
+        return results[0]
+
+    async def search_many(self, queries: List[str], top_k: int = 3, query_embeddings: List[List[float]] = None,
+                          mode: Optional[str] = None, include_embeddings: bool = False,
+                          filters: Optional[Dict] = None) -> List[List[Dict]]:
+        """여러 질의를 한 번에 검색 (임베딩 요청 1회, Chroma 조회 1회, 본문 조회 최대 1회)"""
+        mode = mode or model_settings.RAG_SEARCH_MODE
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"지원하지 않는 검색 모드입니다: {mode}")
+        if not queries:
+            return []
+        where = build_where(filters)
+        # 카탈로그의 필터별 청크 수로 선택도가 높은지 판단 (좁으면 해당 청크만 정확히 비교)
+        scan_ids = await asyncio.to_thread(self._exact_scan_ids, filters) if where else None
         
-        return [
-            {
-                "content": doc,
-                "metadata": metadata,
-                "score": float(score)
-            }
-            for doc, metadata, score in zip(
-                results["documents"][0],
-                results["metadatas"][0],
-                results["distances"][0]
-            )
-        ] 
+        async def vector_search(n_results: int) -> List[List[Dict]]:
+            if scan_ids is not None:
+                return await self._exact_query_many(queries, n_results, scan_ids, query_embeddings, include_embeddings)
+            return await self._vector_query_many(queries, n_results, query_embeddings, include_embeddings, where)
+        
+        if mode == "vector":
+            threshold = model_settings.RAG_SIMILARITY_THRESHOLD
+            return [[hit for hit in hits if hit["similarity"] >= threshold] for hits in await vector_search(top_k)]
+        
+        candidates = top_k if mode == "lexical" else max(top_k, model_settings.RAG_SEARCH_CANDIDATES)
+        lexical_ready = mode == "lexical" or self.lexical_index.ready
+        if lexical_ready:
+            index = await self._ensure_lexical_index()
+            if scan_ids is not None:
+                allowed = set(scan_ids)
+                lexical_lists = [index.search(query, candidates, allowed) for query in queries]
+            else:
+                # 어휘 색인에는 메타데이터가 없으므로 조건이 있으면 더 많이 뽑아 본문 조회 시 거름
+                fetch = candidates * LEXICAL_FILTER_OVERFETCH if where else candidates
+                lexical_lists = [index.search(query, fetch) for query in queries]
+        else:
+            # 시작 직후 색인을 만드는 동안에는 임계값을 넘는 벡터 후보만으로 응답
+            self.build_lexical_index()
+            lexical_lists = [[] for _ in queries]
+        
+        vector_lists = [[] for _ in queries]
+        if mode == "hybrid":
+            vector_lists = await vector_search(candidates)
+        
+        # 벡터 결과에 없는 어휘 후보만 모아서 본문을 한 번에 조회 (조건에 맞지 않는 청크는 빠짐)
+        found = {hit["id"]: hit for hits in vector_lists for hit in hits}
+        missing = list(dict.fromkeys(
+            chunk_id for lexical in lexical_lists for chunk_id, _ in lexical if chunk_id not in found
+        ))
+        for chunk in await asyncio.to_thread(self.get_chunks, missing, include_embeddings, where):
+            found[chunk["id"]] = chunk
+        
+        per_query = []
+        for vector, lexical in zip(vector_lists, lexical_lists):
+            lexical = [(chunk_id, score) for chunk_id, score in lexical if chunk_id in found][:candidates]
+            lexical_scores = dict(lexical)
+            if mode == "lexical":
+                ranked = lexical[:top_k]
+            else:
+                vector = [
+                    hit for hit in vector
+                    if hit["similarity"] >= model_settings.RAG_SIMILARITY_THRESHOLD or hit["id"] in lexical_scores
+                ]
+                ranked = reciprocal_rank_fusion(
+                    [[hit["id"] for hit in vector], [chunk_id for chunk_id, _ in lexical]],
+                    k=model_settings.RAG_RRF_K
+                )[:top_k]
+            results = []
+            for chunk_id, score in ranked:
+                hit = found[chunk_id]
+                result = {
+                    "id": chunk_id,
+                    "content": hit["content"],
+                    "metadata": hit["metadata"],
+                    "score": score,
+                    "similarity": hit.get("similarity") if mode == "hybrid" else None,
+                    "lexical_score": lexical_scores.get(chunk_id)
+                }
+                if include_embeddings:
+                    result["embedding"] = hit.get("embedding")
+                results.append(result)
+            per_query.append(results)
+        return per_query
 
-    async def get_documents(self):
-        """저장된 모든 문서 메타데이터 조회"""
-        try:
-            if not self._collection:
-                print("컬렉션이 초기화되지 않았습니다")
-                self._collection = self.client.get_or_create_collection(
-                    name="documents",
-                    metadata={"hnsw:space": "cosine"}
-                )
-            
-            results = self._collection.get()
-            print(f"조회된 문서 수: {len(results['ids']) if results.get('ids') else 0}")
-            
-            if not results or not results.get('ids'):
-                print("저장된 문서가 없습니다")
-                return []
-            
-            documents = []
-            for i in range(len(results['ids'])):
-                documents.append({
-                    'id': results['ids'][i],
-                    'metadata': results['metadatas'][i],
-                    'content': results['documents'][i]
-                })
-            return documents
-        except Exception as e:
-            print(f"문서 조회 중 오류 발생: {str(e)}")
-            return []  # 에러 발생시 빈 리스트 반환 
\ No newline at end of file
+    def get_chunks(self, ids: List[str], include_embeddings: bool = False, where: Dict = None) -> List[Dict]:
+        """ID 목록에 해당하는 청크 본문과 메타데이터 (요청한 순서대로, where 조건에 맞는 것만)"""
+        if not ids:
+            return []
+        include = ["documents", "metadatas", "embeddings"] if include_embeddings else ["documents", "metadatas"]
+        with CHROMA_SECONDS.time(operation="get"):
+            results = self.collection.get(ids=ids, where=where or None, include=include)
+        found = {
+            chunk_id: {"id": chunk_id, "content": content, "metadata": metadata}
+            for chunk_id, content, metadata in zip(results["ids"], results["documents"], results["metadatas"])
+        }
+        if include_embeddings:
+            for chunk_id, embedding in zip(results["ids"], results["embeddings"]):
+                found[chunk_id]["embedding"] = embedding
+        return [found[chunk_id] for chunk_id in ids if chunk_id in found]
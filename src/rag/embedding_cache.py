@@ -0,0 +1,125 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List
+import numpy as np
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """캐시 키용 텍스트 정규화 (유니코드 NFC + 공백 정리)"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+def cache_key(model: str, text: str) -> str:
+    """(임베딩 모델, 정규화된 텍스트) 기반 콘텐츠 주소"""
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model}:{digest}"
+
+class EmbeddingCache:
+    """디스크(SQLite) 기반 임베딩 캐시 + 메모리 LRU
+
+    벡터는 JSON 리스트가 아니라 float32/float16 바이트 배열로 저장한다.
+    """
+
+    def __init__(self, persist_directory: str, dtype: str = "float32", memory_limit_mb: int = 64):
+        os.makedirs(persist_directory, exist_ok=True)
+        self.path = os.path.join(persist_directory, "embedding_cache.sqlite3")
+        self.dtype = np.dtype(dtype)
+        self.memory_limit = memory_limit_mb * 1024 * 1024
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, dtype TEXT NOT NULL, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, vector: np.ndarray):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = vector
+        self._memory_bytes += vector.nbytes
+        while self._memory_bytes > self.memory_limit and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """캐시에 있는 키만 반환 (메모리 -> 디스크 순서로 조회)"""
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                    self.hits += 1
+                else:
+                    missing.append(key)
+
+            # SQLite 변수 개수 제한을 피하기 위해 나누어 조회
+            disk_found = 0
+            for start in range(0, len(missing), 500):
+                part = missing[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, dtype, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})",
+                    part
+                ).fetchall()
+                for key, dtype, blob in rows:
+                    vector = np.frombuffer(blob, dtype=dtype)
+                    self._remember(key, vector)
+                    found[key] = vector
+                    disk_found += 1
+            self.disk_hits += disk_found
+            self.misses += len(missing) - disk_found
+
+        return {key: vector.astype(np.float32).tolist() for key, vector in found.items()}
+
+    def put_many(self, items: Dict[str, List[float]]):
+        """임베딩 저장 (디스크 + 메모리)"""
+        if not items:
+            return
+        rows = []
+        with self._lock:
+            for key, values in items.items():
+                vector = np.asarray(values, dtype=self.dtype)
+                self._remember(key, vector)
+                rows.append((key, self.dtype.name, vector.tobytes()))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dtype, vector) VALUES (?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        """캐시 적중/미스 통계"""
+        with self._lock:
+            total = self.hits + self.disk_hits + self.misses
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / total if total else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": entries,
+                "dtype": self.dtype.name,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+            self._memory.clear()
+            self._memory_bytes = 0
@@ -1,28 +1,228 @@
+from abc import ABC, abstractmethod
 from openai import AsyncOpenAI
 from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from src.core.config import model_settings
+from src.core.gateway import get_gateway
+from src.core.metrics import CACHE_LOOKUPS, EMBEDDING_SECONDS, EMBEDDING_TEXTS, EMBEDDING_TOKENS
+from .embedding_cache import EmbeddingCache, cache_key
+from .tokens import estimate_tokens
+import asyncio
+import logging
+import re
+import zlib
+import numpy as np
 
-class EmbeddingModel:
-    def __init__(self, api_key: str = None):
+logger = logging.getLogger(__name__)
+
+def make_batches(texts: List[str], max_items: int, max_tokens: int) -> List[List[int]]:
+    """입력 순서를 유지하며 항목 수/토큰 수 한도 내로 인덱스 배치 생성"""
+    batches = []
+    current = []
+    current_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+class EmbeddingBackend(ABC):
+    """임베딩 백엔드 인터페이스"""
+    model: str = ""
+    requires_api_key: bool = False
+    # 네트워크 호출이 필요한 백엔드만 디스크 캐시를 사용
+    cacheable: bool = False
+
+    @abstractmethod
+    async def embed(self, texts: List[str], background: bool = False) -> List[List[float]]:
+        """텍스트 목록을 같은 순서의 벡터 목록으로 변환"""
+
+    async def close(self):
+        pass
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    requires_api_key = True
+    cacheable = True
+
+    def __init__(self, api_key: str = None, model: str = None):
         if not api_key:
             self.client = None
         else:
-            self.client = AsyncOpenAI(api_key=api_key)
-        self.model = "text-embedding-3-small"
-    
-    async def encode(self, texts: List[str]) -> List[List[float]]:
+            # 프로세스 전역에서 하나의 클라이언트(커넥션 풀)를 재사용 (재시도는 게이트웨이가 담당)
+            self.client = AsyncOpenAI(api_key=api_key, max_retries=0)
+        self.model = model or model_settings.RAG_EMBEDDING_MODEL
+        self.batch_size = model_settings.RAG_EMBEDDING_BATCH_SIZE
+        self.batch_max_tokens = model_settings.RAG_EMBEDDING_BATCH_MAX_TOKENS
+        self.max_retries = model_settings.RAG_EMBEDDING_MAX_RETRIES
+        # 업로드 하나가 제공자 동시 호출 자리를 모두 차지하지 않도록 임베딩 호출 수를 따로 제한
+        self._semaphore = asyncio.Semaphore(max(1, model_settings.RAG_EMBEDDING_CONCURRENCY))
+        self.gateway = get_gateway("openai")
+
+    async def embed(self, texts: List[str], background: bool = False) -> List[List[float]]:
         if not self.client:
             raise ValueError("OpenAI API 키가 설정되지 않았습니다")
-        if not isinstance(texts, list):
-            texts = [texts]
-        
         try:
-            print(f"임베딩 생성 시작: {len(texts)} 개의 텍스트")
-            response = await self.client.embeddings.create(
-                model=self.model,
-                input=texts
-            )
-            print("임베딩 생성 완료")
-            return [embedding.embedding for embedding in response.data]
+            batches = make_batches(texts, self.batch_size, self.batch_max_tokens)
+            logger.debug("임베딩 생성 시작: 텍스트 %d개, 배치 %d개", len(texts), len(batches))
+            tasks = [
+                asyncio.create_task(self._encode_batch([texts[i] for i in batch], background))
+                for batch in batches
+            ]
+            try:
+                results = await asyncio.gather(*tasks)
+            except BaseException:
+                # 한 배치가 실패하면 결과를 쓸 수 없으므로 남은 배치를 취소해 할당량을 쓰지 않게 함
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+            # 배치 결과를 입력 순서대로 재조립
+            embeddings = [None] * len(texts)
+            for batch, vectors in zip(batches, results):
+                for i, vector in zip(batch, vectors):
+                    embeddings[i] = vector
+            logger.debug("임베딩 생성 완료")
+            return embeddings
         except Exception as e:
-            print(f"임베딩 생성 중 오류 발생: {str(e)}")
-            raise 
\ No newline at end of file
+            logger.error("임베딩 생성 중 오류 발생: %s", e)
+            raise
+
+    async def _encode_batch(self, texts: List[str], background: bool = False) -> List[List[float]]:
+        """단일 배치 요청 - 제공자 게이트웨이의 한도 안에서 호출하고 실패한 배치만 재시도
+
+        background(문서 수집)이면 게이트웨이 대기열이 가득 차도 거절되지 않고 자리를 기다린다.
+        """
+        async with self._semaphore:
+            response = await self.gateway.call(
+                lambda: self.client.embeddings.create(model=self.model, input=texts),
+                tokens=sum(estimate_tokens(text) for text in texts),
+                max_retries=self.max_retries,
+                reject=not background
+            )
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            EMBEDDING_TOKENS.inc(usage.prompt_tokens, model=self.model)
+        data = sorted(response.data, key=lambda item: item.index)
+        return [item.embedding for item in data]
+
+    async def close(self):
+        """HTTP 커넥션 풀 정리"""
+        if self.client:
+            await self.client.close()
+            self.client = None
+
+_WORD = re.compile(r"\w+")
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """NumPy 기반 로컬 특징 해싱 임베딩 (네트워크 불필요)
+
+    단어와 단어 내부 문자 n-gram(한국어 어절 대응)을 안정적인 해시(crc32)로
+    고정 차원에 사상한 뒤 L2 정규화한다. 추론은 스레드 풀에서 배치로 실행한다.
+    """
+
+    def __init__(self, dimension: int = None, ngram_range: tuple = (2, 3), workers: int = None):
+        self.dimension = dimension or model_settings.RAG_EMBEDDING_DIMENSION
+        self.ngram_range = ngram_range
+        self.model = f"hashing-{self.dimension}"
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or model_settings.RAG_EMBEDDING_THREADS,
+            thread_name_prefix="embedding"
+        )
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        low, high = self.ngram_range
+        for word in _WORD.findall(text.lower()):
+            features.append(word)
+            padded = f"<{word}>"
+            for n in range(low, high + 1):
+                features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def _embed_sync(self, texts: List[str]) -> List[List[float]]:
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.fromiter(
+                (zlib.crc32(feature.encode('utf-8')) for feature in self._features(text)),
+                dtype=np.uint32
+            )
+            if not hashes.size:
+                continue
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+            matrix[row] = np.bincount(hashes % self.dimension, weights=signs, minlength=self.dimension)
+        # 빈도 완화 후 L2 정규화 (코사인 거리용)
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (matrix / norms).tolist()
+
+    async def embed(self, texts: List[str], background: bool = False) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._embed_sync, texts)
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+
+def create_embedding_backend(api_key: str = None) -> EmbeddingBackend:
+    """rag.embedding_backend 설정에 따라 백엔드 생성"""
+    backend = model_settings.RAG_EMBEDDING_BACKEND
+    if backend == "openai":
+        return OpenAIEmbeddingBackend(api_key=api_key)
+    if backend == "hashing":
+        return HashingEmbeddingBackend()
+    raise ValueError(f"지원하지 않는 임베딩 백엔드입니다: {backend}")
+
+class EmbeddingModel:
+    def __init__(self, api_key: str = None, cache: EmbeddingCache = None, backend: EmbeddingBackend = None):
+        self.backend = backend or create_embedding_backend(api_key)
+        self.model = self.backend.model
+        self.cache = cache if self.backend.cacheable else None
+
+    @property
+    def requires_api_key(self) -> bool:
+        return self.backend.requires_api_key
+
+    async def encode(self, texts: List[str], background: bool = False) -> List[List[float]]:
+        """텍스트 임베딩 (background는 문서 수집처럼 거절 대신 대기해야 하는 호출)"""
+        if not isinstance(texts, list):
+            texts = [texts]
+        if not texts:
+            return []
+
+        if self.cache is None:
+            return await self._embed(texts, background)
+
+        # 캐시에 없는 텍스트만 (중복 제거 후) 백엔드로 요청
+        keys = [cache_key(self.model, text) for text in texts]
+        cached = await asyncio.to_thread(self.cache.get_many, list(dict.fromkeys(keys)))
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in pending:
+                pending[key] = text
+
+        CACHE_LOOKUPS.inc(len(cached), cache="embedding", result="hit")
+        CACHE_LOOKUPS.inc(len(pending), cache="embedding", result="miss")
+        if pending:
+            vectors = await self._embed(list(pending.values()), background)
+            fresh = dict(zip(pending.keys(), vectors))
+            await asyncio.to_thread(self.cache.put_many, fresh)
+            cached.update(fresh)
+        else:
+            logger.debug("임베딩 캐시 적중: 텍스트 %d개", len(texts))
+
+        return [cached[key] for key in keys]
+
+    async def _embed(self, texts: List[str], background: bool = False) -> List[List[float]]:
+        EMBEDDING_TEXTS.inc(len(texts), model=self.model)
+        with EMBEDDING_SECONDS.time(model=self.model):
+            return await self.backend.embed(texts, background=background)
+
+    async def close(self):
+        await self.backend.close()
@@ -0,0 +1,47 @@
+from typing import Dict, Iterable, List, Optional
+
+# 청크 메타데이터에 태그마다 두는 불리언 키의 접두사 ("tag:보고서": True)
+# Chroma where는 문자열 부분 일치를 지원하지 않으므로 쉼표로 이은 tags 문자열 대신 이 키로 거른다.
+TAG_PREFIX = "tag:"
+
+def tag_key(tag: str) -> str:
+    return f"{TAG_PREFIX}{tag}"
+
+def split_tags(tags) -> List[str]:
+    """쉼표로 이은 태그 문자열 또는 목록을 중복/빈 값 없는 목록으로"""
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return list(dict.fromkeys(tag.strip() for tag in tags if tag and tag.strip()))
+
+def tag_metadata(tags: Iterable[str], previous: Iterable[str] = ()) -> Dict[str, Optional[bool]]:
+    """청크 메타데이터에 넣을 태그 키 (이전에 있던 태그는 None으로 지정해 삭제)"""
+    tags = split_tags(list(tags))
+    fields: Dict[str, Optional[bool]] = {tag_key(tag): None for tag in split_tags(list(previous)) if tag not in tags}
+    fields.update({tag_key(tag): True for tag in tags})
+    return fields
+
+def normalize_filters(filters: Optional[Dict] = None) -> Dict:
+    """값이 있는 조건만 남긴 검색 필터 ({"category", "source", "tags"})"""
+    if not filters:
+        return {}
+    normalized = {key: filters[key] for key in ("category", "source") if filters.get(key)}
+    tags = split_tags(filters.get("tags"))
+    if tags:
+        normalized["tags"] = tags
+    return normalized
+
+def build_where(filters: Optional[Dict] = None) -> Optional[Dict]:
+    """검색 필터를 Chroma where 조건으로 변환 (조건이 없으면 None)
+
+    모든 조건은 AND로 결합하며, tags는 나열한 태그를 모두 가진 문서만 고른다.
+    """
+    filters = normalize_filters(filters)
+    conditions = [{key: filters[key]} for key in ("category", "source") if key in filters]
+    conditions.extend({tag_key(tag): True} for tag in filters.get("tags", []))
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
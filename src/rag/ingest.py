@@ -0,0 +1,317 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from src.core.config import model_settings
+from src.core.log import request_id
+
+logger = logging.getLogger(__name__)
+
+JOB_FIELDS = [
+    "id", "filename", "file_type", "path", "status",
+    "pages_parsed", "pages_total", "chunks_total", "chunks_embedded", "chunks_stored", "chunks_reused",
+    "file_hash", "error", "created_at", "updated_at"
+]
+
+# 업로드 파일을 디스크로 옮길 때 한 번에 읽는 크기
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+# 재시작 시 다시 처리해야 하는 상태
+RESUMABLE_STATUSES = ("queued", "processing")
+
+# 진행 상황(페이지/청크 수)을 저장소에 기록하는 최소 간격 - 상태 변경은 바로 기록
+PROGRESS_SAVE_INTERVAL_SECONDS = 1.0
+
+class IngestCancelled(Exception):
+    """사용자가 수집 작업을 취소함"""
+
+class IngestJob:
+    """문서 수집 작업 - 상태 변경은 바로, 진행 상황은 일정 간격으로 저장소에 기록됨
+
+    조회는 메모리의 작업 객체를 먼저 보므로 진행 상황은 기록 간격과 무관하게 최신 값이 보인다.
+    """
+
+    def __init__(self, manager: "IngestionManager", **fields):
+        self._manager = manager
+        self._saved_at = 0.0
+        self.cancel_requested = False
+        for field in JOB_FIELDS:
+            setattr(self, field, fields.get(field))
+        for counter in ("pages_parsed", "pages_total", "chunks_total", "chunks_embedded", "chunks_stored", "chunks_reused"):
+            setattr(self, counter, getattr(self, counter) or 0)
+
+    def update(self, **fields):
+        """진행 상황 갱신 (저장은 PROGRESS_SAVE_INTERVAL_SECONDS 간격으로 스레드에서)"""
+        for key, value in fields.items():
+            setattr(self, key, value)
+        self.updated_at = datetime.now().isoformat()
+        self._manager._save_progress(self)
+
+    async def set_status(self, status: str, **fields):
+        """상태 변경 - 바로 저장소에 기록"""
+        for key, value in fields.items():
+            setattr(self, key, value)
+        self.status = status
+        self.updated_at = datetime.now().isoformat()
+        await self._manager._persist(self)
+
+    def advance(self, **deltas):
+        self.update(**{key: getattr(self, key) + value for key, value in deltas.items()})
+
+    def check_cancelled(self):
+        if self.cancel_requested:
+            raise IngestCancelled()
+
+    def to_dict(self) -> Dict:
+        data = {field: getattr(self, field) for field in JOB_FIELDS if field != "path"}
+        data["job_id"] = data.pop("id")
+        return data
+
+class IngestionManager:
+    """백그라운드 문서 수집 작업 큐
+
+    업로드된 파일은 디스크에 보관하고 작업 상태는 SQLite에 저장하므로,
+    프로세스가 재시작되면 중단된 작업을 이미 저장된 청크를 재사용하며 이어서 처리한다.
+    """
+
+    def __init__(self, rag_service, persist_directory: str = None, workers: int = None):
+        self.rag_service = rag_service
+        self.persist_directory = persist_directory or model_settings.RAG_PERSIST_DIRECTORY
+        self.upload_directory = os.path.abspath(os.path.join(self.persist_directory, "uploads"))
+        self.workers = max(1, workers or model_settings.RAG_INGEST_WORKERS)
+        self._conn = None
+        self._lock = threading.Lock()
+        self._queue: Optional[asyncio.Queue] = None
+        self._jobs: Dict[str, IngestJob] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        # 작업별로 진행 중인 진행 상황 기록 (작업마다 하나씩만)
+        self._saving: Dict[str, asyncio.Task] = {}
+        self._worker_tasks: List[asyncio.Task] = []
+
+    def _open(self):
+        if self._conn is not None:
+            return
+        os.makedirs(self.upload_directory, exist_ok=True)
+        self._conn = sqlite3.connect(
+            os.path.join(self.persist_directory, "ingest_jobs.sqlite3"),
+            check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, filename TEXT, file_type TEXT, path TEXT, status TEXT, "
+            "pages_parsed INTEGER, pages_total INTEGER, chunks_total INTEGER, "
+            "chunks_embedded INTEGER, chunks_stored INTEGER, chunks_reused INTEGER, "
+            "file_hash TEXT, error TEXT, created_at TEXT, updated_at TEXT)"
+        )
+        # 이전 버전에서 생성된 테이블에 새 컬럼 추가
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for field in JOB_FIELDS:
+            if field not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {field}")
+        self._conn.commit()
+
+    def _save(self, row: List):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO jobs ({', '.join(JOB_FIELDS)}) "
+                f"VALUES ({', '.join('?' * len(JOB_FIELDS))})",
+                row
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def _row(job: IngestJob) -> List:
+        return [getattr(job, field) for field in JOB_FIELDS]
+
+    def _save_progress(self, job: IngestJob):
+        """진행 상황 기록 예약 - 이벤트 루프에서 SQLite 커밋을 하지 않고, 간격 안의 갱신은 건너뜀"""
+        now = time.monotonic()
+        if job.id in self._saving or now - job._saved_at < PROGRESS_SAVE_INTERVAL_SECONDS:
+            return
+        job._saved_at = now
+        task = asyncio.create_task(asyncio.to_thread(self._save, self._row(job)))
+        self._saving[job.id] = task
+        task.add_done_callback(lambda done: self._progress_saved(job.id, done))
+
+    def _progress_saved(self, job_id: str, task: asyncio.Task):
+        self._saving.pop(job_id, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("수집 진행 상황 기록 실패: %s", task.exception(), extra={"job_id": job_id})
+
+    async def _persist(self, job: IngestJob):
+        """작업 전체 기록 - 앞서 예약된 진행 상황 기록이 나중에 덮어쓰지 않도록 끝나길 기다림"""
+        pending = self._saving.get(job.id)
+        if pending is not None:
+            await asyncio.wait([pending])
+        job._saved_at = time.monotonic()
+        await asyncio.to_thread(self._save, self._row(job))
+
+    def _load(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return IngestJob(self, **dict(zip(JOB_FIELDS, row))) if row else None
+
+    async def start(self):
+        """워커 시작 및 중단된 작업 재개"""
+        self._open()
+        self._queue = asyncio.Queue()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                RESUMABLE_STATUSES
+            ).fetchall()
+        for row in rows:
+            job = IngestJob(self, **dict(zip(JOB_FIELDS, row)))
+            logger.info("수집 작업 재개: %s", job.filename, extra={"job_id": job.id})
+            self._jobs[job.id] = job
+            self._queue.put_nowait(job.id)
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self):
+        """워커 중지 - 진행 중인 작업은 processing 상태로 남아 다음 시작 시 재개됨"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        # 스레드에서 진행 중인 기록이 끝난 뒤 연결을 닫음
+        if self._saving:
+            await asyncio.wait(list(self._saving.values()))
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+    async def submit(self, file, filename: str, file_type: str) -> IngestJob:
+        """업로드 파일을 디스크에 조각 단위로 기록하고 작업을 큐에 등록
+
+        file은 bytes 또는 비동기 read(size)를 제공하는 객체(UploadFile 등)이며,
+        파일 전체를 메모리에 올리지 않는다.
+        """
+        self._open()
+        job_id = uuid.uuid4().hex
+        path = os.path.join(self.upload_directory, job_id)
+        size, file_hash = await self._spool(file, path)
+        logger.info("업로드 파일 저장 완료: %s (%d bytes)", filename, size)
+        now = datetime.now().isoformat()
+        job = IngestJob(
+            self, id=job_id, filename=filename, file_type=file_type, path=path,
+            status="queued", file_hash=file_hash, created_at=now, updated_at=now
+        )
+        await self._persist(job)
+        self._jobs[job_id] = job
+        self._queue.put_nowait(job_id)
+        return job
+
+    @staticmethod
+    async def _spool(file, path: str) -> Tuple[int, str]:
+        """디스크에 기록하면서 파일 크기와 SHA-256 해시 계산"""
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, "wb") as f:
+            if isinstance(file, bytes):
+                await asyncio.to_thread(f.write, file)
+                digest.update(file)
+                return len(file), digest.hexdigest()
+            while True:
+                block = await file.read(SPOOL_CHUNK_BYTES)
+                if not block:
+                    return size, digest.hexdigest()
+                await asyncio.to_thread(f.write, block)
+                digest.update(block)
+                size += len(block)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        job = self._jobs.get(job_id) or self._load(job_id)
+        return job.to_dict() if job else None
+
+    def list(self, limit: int = 50) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(JOB_FIELDS)} FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [
+            (self._jobs.get(row[0]) or IngestJob(self, **dict(zip(JOB_FIELDS, row)))).to_dict()
+            for row in rows
+        ]
+
+    async def cancel(self, job_id: str) -> bool:
+        """작업 취소 - 대기 중이면 즉시, 처리 중이면 다음 페이지/배치 전에 중단
+
+        처리 중인 작업은 태스크를 취소하지 않고 플래그만 세운다. 스레드에서 실행 중인
+        저장 작업(카탈로그, BM25 색인)은 태스크를 취소해도 멈추지 않으므로, 작업이 스스로
+        멈춘 뒤에 정리해야 삭제한 청크를 가리키는 기록이 남지 않는다.
+        """
+        job = self._jobs.get(job_id)
+        if not job or job.status not in RESUMABLE_STATUSES:
+            return False
+        job.cancel_requested = True
+        if job_id not in self._running:
+            await self._finish_cancelled(job)
+        return True
+
+    async def _finish_cancelled(self, job: IngestJob):
+        # 일부 저장된 청크 제거
+        await asyncio.to_thread(self.rag_service.document_store.delete_where, {"job_id": job.id})
+        await asyncio.to_thread(self.rag_service.resync_source, job.filename)
+        self._remove_file(job)
+        await job.set_status("cancelled")
+        self._jobs.pop(job.id, None)
+
+    def _remove_file(self, job: IngestJob):
+        if job.path and os.path.exists(job.path):
+            os.remove(job.path)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if not job or job.status not in RESUMABLE_STATUSES or job.cancel_requested:
+                continue
+            task = asyncio.create_task(self._run(job))
+            self._running[job_id] = task
+            try:
+                await task
+            except asyncio.CancelledError:
+                # 앱 종료로 워커가 취소된 경우 작업도 중단 (상태는 processing 유지)
+                task.cancel()
+                raise
+            finally:
+                self._running.pop(job_id, None)
+
+    async def _run(self, job: IngestJob):
+        # 작업마다 별도 태스크이므로 이 작업의 로그에만 작업 ID가 요청 ID로 붙음
+        request_id.set(job.id)
+        try:
+            # 재개 시 이전 실행에서 저장된 청크는 재사용 청크로 다시 집계됨
+            await job.set_status("processing", error=None, chunks_embedded=0, chunks_stored=0, chunks_reused=0)
+            await self.rag_service.add_document(
+                filename=job.filename,
+                file_type=job.file_type,
+                job=job,
+                file_path=job.path,
+                file_hash=job.file_hash
+            )
+            await job.set_status("completed")
+            self._remove_file(job)
+            self._jobs.pop(job.id, None)
+            logger.info("수집 작업 완료: %s", job.filename, extra={"job_id": job.id})
+        except IngestCancelled:
+            logger.info("수집 작업 취소됨: %s", job.filename, extra={"job_id": job.id})
+            await self._finish_cancelled(job)
+        except Exception as e:
+            logger.error("수집 작업 실패: %s: %s", job.filename, e, extra={"job_id": job.id})
+            await asyncio.to_thread(self.rag_service.document_store.delete_where, {"job_id": job.id})
+            await asyncio.to_thread(self.rag_service.resync_source, job.filename)
+            await job.set_status("error", error=str(e))
+            self._remove_file(job)
+            self._jobs.pop(job.id, None)
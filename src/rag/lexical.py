@@ -0,0 +1,242 @@
+import logging
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+from functools import lru_cache
+from typing import Collection, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# BM25 파라미터 (일반적인 기본값)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 삭제된 문서가 이 비율을 넘으면 색인을 압축해 포스팅 목록에서 제거
+COMPACT_RATIO = 0.3
+
+# 단어 끝에서 떼어내는 조사/어미 (긴 것부터 비교)
+KOREAN_SUFFIXES = sorted([
+    "은", "는", "이", "가", "을", "를", "에", "의", "도", "만", "와", "과", "로", "으로",
+    "에서", "에게", "한테", "까지", "부터", "처럼", "보다", "이나", "이라", "라고", "이라고",
+    "으로서", "로서", "으로써", "로써", "에서는", "에는", "에도", "에서도", "으로는", "로는",
+    "입니다", "합니다", "이다", "하다", "하는", "하고", "했다", "된다", "되는"
+], key=len, reverse=True)
+_SUFFIX_SET = frozenset(KOREAN_SUFFIXES)
+
+_TOKEN = re.compile(r"[가-힣]+|[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_CODE_SEPARATOR = re.compile(r"[-_./]")
+
+def _strip_suffix(word: str) -> str:
+    """조사/어미 제거 (남는 어간이 두 글자 이상일 때만)"""
+    for suffix in KOREAN_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            return word[:-len(suffix)]
+    return word
+
+@lru_cache(maxsize=200_000)
+def _word_tokens(word: str) -> Tuple[str, ...]:
+    if "가" <= word[0] <= "힣":
+        # 코드 뒤에 붙은 조사(AB-1234를) 등 조사만 남은 어절은 버림
+        if word in _SUFFIX_SET:
+            return ()
+        stem = _strip_suffix(word)
+        if len(stem) > 2:
+            return (stem, *(stem[i:i + 2] for i in range(len(stem) - 1)))
+        return (stem,)
+    if _CODE_SEPARATOR.search(word):
+        return (word, *(part for part in _CODE_SEPARATOR.split(word) if part))
+    return (word,)
+
+def tokenize(text: str) -> List[str]:
+    """한국어를 고려한 검색어 토큰화
+
+    - 한글 어절: 조사/어미를 뗀 어간과, 세 글자 이상이면 글자 바이그램도 추가 (복합 명사 부분 일치)
+    - 영문/숫자: 소문자로 맞추고, 제품 코드(AB-1234 등)는 전체와 구성 요소를 모두 추가
+    같은 어절은 반복해서 나오므로 어절 단위 결과를 캐시한다.
+    """
+    tokens = []
+    for word in _TOKEN.findall(text.lower()):
+        tokens.extend(_word_tokens(word))
+    return tokens
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """여러 순위 목록을 RRF 점수(1 / (k + 순위)의 합)로 합침"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+
+class LexicalIndex:
+    """청크 본문에 대한 메모리 BM25 역색인
+
+    문서(청크)는 정수 번호로 관리하고, 단어별 포스팅 목록은 번호와 빈도를 담은 array로
+    저장한다. 추가/삭제는 증분으로 반영하며, 삭제된 번호는 표시만 해 두었다가 일정 비율을
+    넘으면 한 번에 압축한다. 점수 계산은 질의 단어의 포스팅 목록에 대해서만 NumPy로 수행한다.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._ids: List[str] = []
+        self._ordinals: Dict[str, int] = {}
+        self._alive = array("B")
+        self._lengths = array("I")
+        self._doc_terms: List[array] = []
+        self._term_ids: Dict[str, int] = {}
+        self._postings: List[array] = []
+        self._freqs: List[array] = []
+        self._df = array("I")
+        self._total_length = 0
+        self._deleted = 0
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def _term_id(self, term: str) -> int:
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = len(self._postings)
+            self._term_ids[term] = term_id
+            self._postings.append(array("I"))
+            self._freqs.append(array("H"))
+            self._df.append(0)
+        return term_id
+
+    def add(self, ids: Iterable[str], texts: Iterable[str]):
+        """청크 추가 (같은 ID가 이미 있으면 새 본문으로 교체)"""
+        with self._lock:
+            for chunk_id, text in zip(ids, texts):
+                if chunk_id in self._ordinals:
+                    self._remove(chunk_id)
+                ordinal = len(self._ids)
+                counts = Counter(tokenize(text))
+                terms = array("I")
+                for term, count in counts.items():
+                    term_id = self._term_id(term)
+                    self._postings[term_id].append(ordinal)
+                    self._freqs[term_id].append(min(count, 0xFFFF))
+                    self._df[term_id] += 1
+                    terms.append(term_id)
+                length = sum(counts.values())
+                self._ids.append(chunk_id)
+                self._ordinals[chunk_id] = ordinal
+                self._alive.append(1)
+                self._lengths.append(length)
+                self._doc_terms.append(terms)
+                self._total_length += length
+
+    def remove(self, ids: Iterable[str]):
+        with self._lock:
+            for chunk_id in ids:
+                self._remove(chunk_id)
+            if self._deleted > max(1000, len(self._ids) * COMPACT_RATIO):
+                self._compact()
+
+    def _remove(self, chunk_id: str):
+        ordinal = self._ordinals.pop(chunk_id, None)
+        if ordinal is None:
+            return
+        self._alive[ordinal] = 0
+        self._total_length -= self._lengths[ordinal]
+        for term_id in self._doc_terms[ordinal]:
+            self._df[term_id] -= 1
+        self._doc_terms[ordinal] = array("I")
+        self._deleted += 1
+
+    def _compact(self):
+        """삭제 표시된 문서를 포스팅 목록에서 제거하고 번호를 다시 매김"""
+        remap = array("i", [-1]) * len(self._ids)
+        ids, lengths, doc_terms = [], array("I"), []
+        for ordinal, chunk_id in enumerate(self._ids):
+            if self._alive[ordinal]:
+                remap[ordinal] = len(ids)
+                ids.append(chunk_id)
+                lengths.append(self._lengths[ordinal])
+                doc_terms.append(self._doc_terms[ordinal])
+        for term_id, (postings, freqs) in enumerate(zip(self._postings, self._freqs)):
+            new_postings, new_freqs = array("I"), array("H")
+            for ordinal, freq in zip(postings, freqs):
+                if remap[ordinal] >= 0:
+                    new_postings.append(remap[ordinal])
+                    new_freqs.append(freq)
+            self._postings[term_id] = new_postings
+            self._freqs[term_id] = new_freqs
+        self._ids = ids
+        self._ordinals = {chunk_id: ordinal for ordinal, chunk_id in enumerate(ids)}
+        self._alive = array("B", [1]) * len(ids)
+        self._lengths = lengths
+        self._doc_terms = doc_terms
+        self._deleted = 0
+
+    def rebuild(self, collection, page_size: int = 1000):
+        """컬렉션의 모든 청크 본문으로 색인을 다시 만듦
+
+        페이지 단위로만 잠그므로 만드는 동안 들어온 추가/삭제도 순서대로 반영된다
+        (같은 ID의 추가는 교체이므로 중복되지 않음).
+        """
+        with self._lock:
+            self._reset()
+        offset = 0
+        while True:
+            with self._lock:
+                page = collection.get(include=["documents"], limit=page_size, offset=offset)
+                if not page["ids"]:
+                    break
+                self.add(page["ids"], [content or "" for content in page["documents"]])
+            offset += len(page["ids"])
+        self.ready = True
+        logger.info("어휘 색인 생성 완료: 청크 %d개, 단어 %d개", len(self), len(self._term_ids))
+
+    def search(self, query: str, top_k: int, allowed: Optional[Collection[str]] = None) -> List[Tuple[str, float]]:
+        """BM25 점수 상위 top_k개의 (청크 ID, 점수) (allowed가 있으면 그 청크 중에서만)"""
+        terms = set(tokenize(query))
+        with self._lock:
+            count = len(self._ordinals)
+            if not terms or not count:
+                return []
+            average_length = self._total_length / count
+            lengths = np.frombuffer(self._lengths, dtype=np.uint32)
+            scores = np.zeros(len(self._ids), dtype=np.float32)
+            matched = False
+            for term in terms:
+                term_id = self._term_ids.get(term)
+                if term_id is None or not self._df[term_id]:
+                    continue
+                matched = True
+                df = self._df[term_id]
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                docs = np.frombuffer(self._postings[term_id], dtype=np.uint32)
+                tf = np.frombuffer(self._freqs[term_id], dtype=np.uint16).astype(np.float32)
+                norm = self.k1 * (1 - self.b + self.b * lengths[docs] / average_length)
+                # 한 문서는 단어별 포스팅 목록에 한 번만 나오므로 인덱스 중복 없이 더할 수 있음
+                scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm)
+            if not matched:
+                return []
+            if self._deleted:
+                scores *= np.frombuffer(self._alive, dtype=np.uint8)
+            if allowed is not None:
+                mask = np.zeros(len(self._ids), dtype=bool)
+                mask[[self._ordinals[chunk_id] for chunk_id in allowed if chunk_id in self._ordinals]] = True
+                scores[~mask] = 0
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [(self._ids[ordinal], float(scores[ordinal])) for ordinal in candidates]
+
+    def stats(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "chunks": len(self),
+            "terms": len(self._term_ids),
+            "deleted_pending": self._deleted
+        }
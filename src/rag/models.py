@@ -6,14 +6,30 @@ class Document(BaseModel):
     content: str
     metadata: dict = {}
 
+class SearchFilters(BaseModel):
+    category: Optional[str] = None
+    source: Optional[str] = None
+    tags: Optional[List[str]] = None  # 나열한 태그를 모두 가진 문서만
+
 class SearchRequest(BaseModel):
     query: str
     top_k: Optional[int] = 3
+    mode: Optional[str] = None  # vector, lexical, hybrid (기본값은 rag.search_mode)
+    filters: Optional[SearchFilters] = None
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    top_k: Optional[int] = 3
+    mode: Optional[str] = None
+    filters: Optional[SearchFilters] = None
 
 class SearchResult(BaseModel):
+    id: Optional[str] = None
     content: str
     metadata: dict
-    score: float 
+    score: float
+    similarity: Optional[float] = None
+    lexical_score: Optional[float] = None
 
 class DocumentMetadata(BaseModel):
     source: str
@@ -0,0 +1,212 @@
+import asyncio
+import codecs
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import AsyncIterator, List, Optional, Union
+import pypdf
+from src.core.config import model_settings
+from src.core.metrics import PARSE_PAGES, PARSE_SECONDS
+from .document_processor import DocumentProcessor
+
+PDF_TYPE = "application/pdf"
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+TXT_TYPE = "text/plain"
+
+# 파일 경로(str) 또는 파일 내용(bytes)
+Source = Union[str, bytes]
+
+# 텍스트 파일을 나누어 읽는 단위 (줄 경계에서 자름)
+TEXT_SEGMENT_BYTES = 1024 * 1024
+
+def _limit_memory(memory_limit_mb: int):
+    """워커 프로세스 메모리 상한 설정 (resource 모듈이 없는 Windows에서는 무시)"""
+    try:
+        import resource
+    except ImportError:
+        return
+    if memory_limit_mb > 0:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def _read(source: Source) -> bytes:
+    if isinstance(source, bytes):
+        return source
+    with open(source, "rb") as f:
+        return f.read()
+
+def _open_pdf(source: Source) -> pypdf.PdfReader:
+    return pypdf.PdfReader(source if isinstance(source, str) else BytesIO(source))
+
+def pdf_page_count(source: Source) -> int:
+    return len(_open_pdf(source).pages)
+
+def extract_pdf_pages(source: Source, start: int, end: int) -> List[str]:
+    """PDF의 [start, end) 페이지 텍스트 추출 (워커 프로세스에서 실행)"""
+    pdf = _open_pdf(source)
+    return [pdf.pages[i].extract_text() for i in range(start, end)]
+
+def extract_document(source: Source, file_type: str) -> List[str]:
+    """PDF 외 문서 텍스트 추출 (워커 프로세스에서 실행)"""
+    content = _read(source)
+    if file_type == DOCX_TYPE:
+        return DocumentProcessor.process_docx(content)
+    if file_type == TXT_TYPE:
+        return DocumentProcessor.process_txt(content)
+    raise ValueError("지원하지 않는 파일 형식입니다")
+
+class ParserPool:
+    """CPU 바운드 문서 파싱을 별도 프로세스 풀에서 실행
+
+    큰 PDF는 페이지 구간 단위로 나누어 여러 코어에서 병렬 추출한다.
+    문서별 시간 제한을 넘기면 풀을 재생성하고, 워커마다 메모리 상한을 둔다.
+    """
+
+    def __init__(self, workers: int = None, pages_per_shard: int = None,
+                 timeout: float = None, memory_limit_mb: int = None):
+        self.workers = workers if workers is not None else model_settings.RAG_PARSE_WORKERS
+        self.pages_per_shard = max(1, pages_per_shard or model_settings.RAG_PARSE_PAGES_PER_SHARD)
+        self.timeout = timeout or model_settings.RAG_PARSE_TIMEOUT
+        self.memory_limit_mb = memory_limit_mb if memory_limit_mb is not None else model_settings.RAG_PARSE_MEMORY_LIMIT_MB
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> Optional[ProcessPoolExecutor]:
+        # workers가 0이면 프로세스 풀 없이 기본 스레드 풀에서 실행
+        if self._executor is None and self.workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_limit_memory,
+                initargs=(self.memory_limit_mb,)
+            )
+        return self._executor
+
+    async def _run(self, func, *args):
+        """풀에서 실행 - 다른 문서 때문에 풀이 재생성된 경우 한 번 재시도"""
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            executor = self.executor
+            try:
+                return await loop.run_in_executor(executor, func, *args)
+            except BrokenProcessPool:
+                self._reset(executor)
+                if attempt:
+                    raise MemoryError("문서 파싱 중 워커 프로세스가 비정상 종료되었습니다 (메모리 제한 초과 가능)")
+
+    async def page_count(self, source: Source, file_type: str) -> Optional[int]:
+        """전체 페이지 수 (텍스트 파일처럼 미리 알 수 없으면 None)"""
+        if file_type == PDF_TYPE:
+            return await self._run(pdf_page_count, source)
+        if file_type == TXT_TYPE and isinstance(source, str):
+            return None
+        return 1
+
+    async def iter_pages(self, source: Source, file_type: str, page_count: int = None) -> AsyncIterator[str]:
+        """페이지 텍스트를 순서대로 하나씩 반환 (이벤트 루프를 막지 않음)
+
+        PDF는 페이지 구간을 워커 수의 두 배까지만 미리 요청하므로 메모리 사용량이
+        문서 크기와 무관하다. 파싱 결과를 기다린 시간의 합이 문서별 시간 제한을
+        넘으면 풀을 재생성하고 TimeoutError를 발생시킨다.
+        """
+        if file_type == TXT_TYPE and isinstance(source, str):
+            async for segment in self._iter_text_file(source):
+                PARSE_PAGES.inc(file_type=file_type)
+                yield segment
+            return
+        if file_type != PDF_TYPE:
+            texts = await self._wait(self._timed(self._run(extract_document, source, file_type), file_type), self.timeout)
+            PARSE_PAGES.inc(len(texts), file_type=file_type)
+            for text in texts:
+                yield text
+            return
+
+        if page_count is None:
+            page_count = await self._run(pdf_page_count, source)
+        shards = iter([
+            (start, min(start + self.pages_per_shard, page_count))
+            for start in range(0, page_count, self.pages_per_shard)
+        ])
+        pending = deque()
+
+        def submit_next():
+            shard = next(shards, None)
+            if shard:
+                pending.append(asyncio.ensure_future(self._timed(self._run(extract_pdf_pages, source, *shard), file_type)))
+
+        for _ in range(max(1, self.workers) * 2):
+            submit_next()
+
+        loop = asyncio.get_running_loop()
+        remaining = self.timeout
+        try:
+            while pending:
+                started = loop.time()
+                pages = await self._wait(pending.popleft(), remaining)
+                remaining -= loop.time() - started
+                submit_next()
+                PARSE_PAGES.inc(len(pages), file_type=file_type)
+                for text in pages:
+                    yield text
+        finally:
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    async def _timed(awaitable, file_type: str):
+        """워커에 넘긴 시점부터 결과를 받을 때까지의 파싱 시간 기록 (풀 대기 시간 포함)"""
+        with PARSE_SECONDS.time(file_type=file_type):
+            return await awaitable
+
+    async def _wait(self, awaitable, timeout: float):
+        try:
+            return await asyncio.wait_for(awaitable, max(timeout, 0))
+        except asyncio.TimeoutError:
+            self._reset(self._executor, terminate=True)
+            raise TimeoutError(f"문서 파싱 시간 제한({self.timeout}초)을 초과했습니다")
+
+    async def _iter_text_file(self, path: str) -> AsyncIterator[str]:
+        """텍스트 파일을 일정 크기씩 읽어 줄 경계에서 잘라 반환"""
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        remainder = ""
+        with open(path, "rb") as f:
+            while True:
+                block = await asyncio.to_thread(f.read, TEXT_SEGMENT_BYTES)
+                text = remainder + decoder.decode(block, final=not block)
+                if not block:
+                    if text:
+                        yield text
+                    return
+                cut = text.rfind("\n") + 1
+                if not cut and len(text) >= TEXT_SEGMENT_BYTES:
+                    # 줄바꿈 없이 긴 텍스트는 크기 기준으로 자름
+                    cut = len(text)
+                if cut:
+                    segment, remainder = text[:cut], text[cut:]
+                    yield segment
+                else:
+                    remainder = text
+
+    def _reset(self, executor: Optional[ProcessPoolExecutor], terminate: bool = False):
+        """풀을 닫고 다음 요청에서 새 풀을 생성 (이미 교체된 풀은 건드리지 않음)
+
+        terminate가 참이면(시간 제한 초과) 실행 중인 워커 프로세스도 종료한다. shutdown(wait=False)은
+        대기 중인 작업만 취소하고 실행 중인 워커는 작업이 끝날 때까지 두므로, 멈춘 파싱이 CPU와 메모리를
+        계속 차지한다. 워커를 종료하는 공개 API가 없어 내부 속성 _processes를 읽으며, 구현이 바뀌어
+        속성이 없으면 종료 없이 닫기만 한다.
+        """
+        if executor is None or executor is not self._executor:
+            return
+        self._executor = None
+        # shutdown이 _processes를 비우므로 먼저 목록을 잡아 둠
+        processes = list((getattr(executor, "_processes", None) or {}).values()) if terminate else []
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
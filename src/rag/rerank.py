@@ -0,0 +1,142 @@
+from typing import Dict, List, Sequence
+import numpy as np
+
+# 이보다 짧게 겹치면 우연의 일치로 보고 줄바꿈으로 이어 붙임
+MIN_OVERLAP_CHARS = 8
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def relevance_scores(hits: List[Dict], mode: str) -> np.ndarray:
+    """검색 점수를 클수록 관련 있는 값으로 변환 (vector는 코사인 유사도, 나머지는 최댓값 기준 0~1)"""
+    if mode == "vector":
+        return np.array([hit["similarity"] for hit in hits], dtype=np.float32)
+    scores = np.array([hit["score"] for hit in hits], dtype=np.float32)
+    top = scores.max() if len(scores) else 0.0
+    return scores / top if top > 0 else scores
+
+def join_overlapping(first: str, second: str, max_overlap: int = None) -> str:
+    """앞 청크의 끝과 뒤 청크의 앞이 겹치면 겹친 부분을 한 번만 넣어 이어 붙임"""
+    limit = min(len(first), len(second), max_overlap or len(second))
+    for size in range(limit, MIN_OVERLAP_CHARS - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return f"{first}\n{second}"
+
+def mmr(similarity: np.ndarray, relevance: np.ndarray, k: int, lambda_mult: float) -> List[int]:
+    """최대 한계 관련성(MMR) 선택
+
+    매 단계 lambda_mult * 관련도 - (1 - lambda_mult) * (이미 고른 후보와의 최대 유사도)가
+    가장 큰 후보를 고른다. 최대 유사도 벡터를 선택할 때마다 갱신하므로 O(k * n) 연산이다.
+    """
+    count = len(relevance)
+    k = min(k, count)
+    if k <= 0:
+        return []
+    chosen = np.zeros(count, dtype=bool)
+    max_similarity = np.full(count, -np.inf, dtype=np.float32)
+    selected = []
+    for step in range(k):
+        if step == 0:
+            scores = relevance.astype(np.float32, copy=True)
+        else:
+            scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[chosen] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        chosen[best] = True
+        max_similarity = np.maximum(max_similarity, similarity[best])
+    return selected
+
+def rerank(hits: List[Dict], relevance: Sequence[float], top_k: int, lambda_mult: float = 0.7,
+           duplicate_threshold: float = 0.95, merge_max_chunks: int = 3, max_overlap: int = None) -> List[Dict]:
+    """과다 조회한 후보에서 중복 제거 -> 인접 청크 병합 -> MMR로 top_k개 선택
+
+    hits는 "embedding"을 포함한 검색 결과이며, 반환 결과에서는 임베딩을 뺀다.
+    병합된 결과의 id/메타데이터는 첫 청크, 점수는 가장 관련도가 높은 청크 것을 쓰고
+    병합된 청크 ID는 metadata["merged_ids"]에 둔다.
+    """
+    if not hits:
+        return []
+    if any(hit.get("embedding") is None for hit in hits):
+        return [_strip(hit) for hit in hits[:top_k]]
+    relevance = np.asarray(relevance, dtype=np.float32)
+    vectors = normalize_rows(np.asarray([hit["embedding"] for hit in hits], dtype=np.float32))
+    similarity = vectors @ vectors.T
+
+    # 1. 관련도 순으로 보면서 이미 남긴 후보와 거의 같은 후보는 제거 (남긴 후보와의 최대 유사도를 누적)
+    kept: List[int] = []
+    max_similarity = np.full(len(hits), -np.inf, dtype=np.float32)
+    for i in np.argsort(-relevance, kind="stable"):
+        if max_similarity[i] < duplicate_threshold:
+            kept.append(int(i))
+            max_similarity = np.maximum(max_similarity, similarity[i])
+
+    # 2. 같은 문서의 연속된 청크를 하나로 병합 (그룹 벡터는 평균, 관련도는 최댓값)
+    groups = _neighbor_groups([hits[i] for i in kept], merge_max_chunks)
+    groups = [[kept[i] for i in group] for group in groups]
+    membership = np.zeros((len(groups), len(hits)), dtype=np.float32)
+    for index, group in enumerate(groups):
+        membership[index, group] = 1.0 / len(group)
+    group_vectors = normalize_rows(membership @ vectors)
+    group_relevance = np.where(membership > 0, relevance, -np.inf).max(axis=1)
+
+    # 3. 관련도와 다양성의 균형으로 최종 선택
+    selected = mmr(group_vectors @ group_vectors.T, group_relevance, top_k, lambda_mult)
+    results = []
+    for index in selected:
+        group = groups[index]
+        best = group[int(np.argmax(relevance[group]))]
+        results.append(_merge([hits[i] for i in group], hits[best], max_overlap))
+    return results
+
+def _neighbor_groups(hits: List[Dict], max_size: int) -> List[List[int]]:
+    """(source, chunk_id)가 연속된 후보끼리 묶은 인덱스 목록 (그룹 안은 chunk_id 순)"""
+    positions = {}
+    for i, hit in enumerate(hits):
+        metadata = hit.get("metadata") or {}
+        if metadata.get("chunk_id") is not None:
+            positions[(metadata.get("source"), metadata["chunk_id"])] = i
+    groups = []
+    grouped = set()
+    # 관련도 순서를 유지하도록 앞쪽 후보부터 그 주변 청크를 모음
+    for i, hit in enumerate(hits):
+        if i in grouped:
+            continue
+        metadata = hit.get("metadata") or {}
+        chunk_id = metadata.get("chunk_id")
+        group = [i]
+        if chunk_id is not None and max_size > 1:
+            source = metadata.get("source")
+            low = high = chunk_id
+            while len(group) < max_size:
+                before = positions.get((source, low - 1))
+                after = positions.get((source, high + 1))
+                if before is not None and before not in grouped:
+                    group.insert(0, before)
+                    low -= 1
+                elif after is not None and after not in grouped:
+                    group.append(after)
+                    high += 1
+                else:
+                    break
+        grouped.update(group)
+        groups.append(group)
+    return groups
+
+def _merge(hits: List[Dict], best: Dict, max_overlap: int = None) -> Dict:
+    if len(hits) == 1:
+        return _strip(hits[0])
+    content = hits[0]["content"]
+    for hit in hits[1:]:
+        content = join_overlapping(content, hit["content"], max_overlap)
+    merged = _strip(best)
+    merged["id"] = hits[0]["id"]
+    merged["content"] = content
+    merged["metadata"] = {**hits[0]["metadata"], "merged_ids": [hit["id"] for hit in hits]}
+    return merged
+
+def _strip(hit: Dict) -> Dict:
+    return {key: value for key, value in hit.items() if key != "embedding"}
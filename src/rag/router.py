@@ -1,17 +1,21 @@
-from fastapi import APIRouter, HTTPException, File, UploadFile, Depends
+import logging
+from fastapi import APIRouter, HTTPException, File, UploadFile, Depends, Query
 from .service import RAGService
-from .models import SearchRequest, SearchResult, UpdateDocumentRequest
-from typing import List
-from src.core.state import chat_service
+from .models import BatchSearchRequest, SearchRequest, SearchResult, UpdateDocumentRequest
+from typing import List, Optional
+from src.core.state import rag_service, ingestion_manager
+from src.core.gateway import GatewayOverloaded
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
 def get_rag_service(require_api_key: bool = True):
     """RAG 서비스 의존성 주입을 위한 함수"""
     def _get_service():
-        if require_api_key and not chat_service.openai_api_key:
+        if require_api_key and not rag_service.has_credentials:
             raise HTTPException(status_code=400, detail="OpenAI API 키가 설정되지 않았습니다")
-        return RAGService(openai_api_key=chat_service.openai_api_key)
+        return rag_service
     return _get_service
 
 @router.post("/upload")
@@ -20,63 +24,197 @@ async def upload_document(
     rag_service: RAGService = Depends(get_rag_service(require_api_key=True))
 ):
     try:
-        if not rag_service.document_store._openai_api_key:
+        if not rag_service.has_credentials:
             raise HTTPException(status_code=400, detail="OpenAI API 키가 설정되지 않았습니다")
             
-        print(f"파일 업로드 시도: {file.filename}, 타입: {file.content_type}")
+        logger.info("파일 업로드 시도: %s, 타입: %s", file.filename, file.content_type)
         
         if not file.content_type in ["application/pdf", "application/vnd.openxmlformats-officedocument.wordprocessingml.document", "text/plain"]:
             raise HTTPException(status_code=400, detail="지원하지 않는 파일 형식입니다")
         
-        content = await file.read()
-        print(f"파일 크기: {len(content)} bytes")
-        
         try:
-            await rag_service.add_document(
-                file_content=content,
+            # 파일 전체를 메모리에 올리지 않고 디스크로 조각 단위 저장
+            job = await ingestion_manager.submit(
+                file=file,
                 filename=file.filename,
                 file_type=file.content_type
             )
-            print(f"파일 처리 완료: {file.filename}")
-            return {"message": "문서가 성공적으로 업로드되었습니다"}
+            logger.info("문서 수집 작업 등록: %s", file.filename, extra={"job_id": job.id})
+            return {
+                "message": "문서 업로드가 접수되었습니다",
+                "job_id": job.id,
+                "status": job.status
+            }
         except Exception as e:
-            print(f"문서 처리 중 오류: {str(e)}")
+            logger.error("문서 처리 중 오류: %s", e)
             raise HTTPException(status_code=500, detail=f"문서 처리 중 오류: {str(e)}")
             
     except Exception as e:
-        print(f"업로드 오류: {str(e)}")
+        logger.error("업로드 오류: %s", e)
         if isinstance(e, HTTPException):
             raise e
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/jobs")
+async def list_ingest_jobs(limit: int = 50):
+    """문서 수집 작업 목록 조회"""
+    jobs = ingestion_manager.list(limit=limit)
+    return {"jobs": jobs, "count": len(jobs)}
+
+@router.get("/jobs/{job_id}")
+async def get_ingest_job(job_id: str):
+    """문서 수집 작업 진행 상황 조회"""
+    job = ingestion_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다")
+    return job
+
+@router.delete("/jobs/{job_id}")
+async def cancel_ingest_job(job_id: str):
+    """문서 수집 작업 취소"""
+    if not await ingestion_manager.cancel(job_id):
+        raise HTTPException(status_code=404, detail="취소할 수 있는 작업이 없습니다")
+    return {"message": "작업 취소가 요청되었습니다"}
+
 @router.post("/search", response_model=List[SearchResult])
 async def search_documents(
     request: SearchRequest,
-    rag_service: RAGService = Depends(get_rag_service(require_api_key=True))
+    rag_service: RAGService = Depends(get_rag_service(require_api_key=False))
 ):
-    """문서 검색 엔드포인트"""
+    """문서 검색 엔드포인트 (lexical 모드는 API 키 없이 사용 가능)"""
+    if rag_service.needs_query_embedding(request.mode) and not rag_service.has_credentials:
+        raise HTTPException(status_code=400, detail="OpenAI API 키가 설정되지 않았습니다")
     try:
-        results = await rag_service.search(query=request.query, top_k=request.top_k)
+        results = await rag_service.search(
+            query=request.query,
+            top_k=request.top_k,
+            mode=request.mode,
+            filters=request.filters.model_dump() if request.filters else None
+        )
         return results
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except GatewayOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/search/batch")
+async def search_documents_batch(
+    request: BatchSearchRequest,
+    rag_service: RAGService = Depends(get_rag_service(require_api_key=False))
+):
+    """여러 질의 일괄 검색 (임베딩 요청과 벡터 조회를 한 번씩만 수행)"""
+    max_queries = rag_service.config["search_batch_max_queries"]
+    if len(request.queries) > max_queries:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {max_queries}개의 질의만 검색할 수 있습니다")
+    if rag_service.needs_query_embedding(request.mode) and not rag_service.has_credentials:
+        raise HTTPException(status_code=400, detail="OpenAI API 키가 설정되지 않았습니다")
+    try:
+        results = await rag_service.search_many(
+            request.queries,
+            top_k=request.top_k,
+            mode=request.mode,
+            filters=request.filters.model_dump() if request.filters else None
+        )
+        return {
+            "results": [
+                {"query": query, "results": hits}
+                for query, hits in zip(request.queries, results)
+            ],
+            "count": len(results)
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except GatewayOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/list")
 async def list_documents(
+    limit: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = None,
+    sort: str = "timestamp",
+    order: str = "desc",
+    category: Optional[str] = None,
+    tag: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    summary: bool = False,
     rag_service: RAGService = Depends(get_rag_service(require_api_key=False))
 ):
-    """저장된 문서 목록 조회"""
+    """저장된 문서 목록 조회 (커서 기반 페이지네이션, 청크 본문 제외)"""
     try:
-        documents = await rag_service.list_documents()
-        print(f"문서 목록 조회 결과: {len(documents)}개")
-        return {"documents": documents, "count": len(documents)}
+        result = await rag_service.list_documents(
+            limit=limit, cursor=cursor, sort=sort, order=order,
+            category=category, tag=tag, since=since, until=until, summary=summary
+        )
+        logger.debug("문서 목록 조회 결과: %d개", result["count"])
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"문서 목록 조회 중 오류: {str(e)}")
+        logger.error("문서 목록 조회 중 오류: %s", e)
         raise HTTPException(
             status_code=500, 
             detail=f"문서 목록 조회 중 오류가 발생했습니다: {str(e)}"
         )
 
+@router.get("/filters")
+async def filter_facets(
+    rag_service: RAGService = Depends(get_rag_service(require_api_key=False))
+):
+    """검색 필터로 쓸 수 있는 카테고리/태그별 문서 수와 청크 수"""
+    try:
+        return await rag_service.filter_facets()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"필터 목록 조회 중 오류가 발생했습니다: {str(e)}"
+        )
+
+@router.get("/lexical-index/stats")
+async def lexical_index_stats(
+    rag_service: RAGService = Depends(get_rag_service(require_api_key=False))
+):
+    """BM25 어휘 색인 통계 조회"""
+    return rag_service.lexical_index_stats()
+
+@router.get("/embedding-cache/stats")
+async def embedding_cache_stats(
+    rag_service: RAGService = Depends(get_rag_service(require_api_key=False))
+):
+    """임베딩 캐시 통계 조회"""
+    try:
+        return rag_service.embedding_cache_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{document_id}")
+async def get_document(
+    document_id: str,
+    rag_service: RAGService = Depends(get_rag_service(require_api_key=False))
+):
+    """문서 메타데이터 조회"""
+    document = await rag_service.get_document(document_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="문서를 찾을 수 없습니다")
+    return document
+
+@router.get("/{document_id}/chunks")
+async def get_document_chunks(
+    document_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    rag_service: RAGService = Depends(get_rag_service(require_api_key=False))
+):
+    """문서의 청크 본문 조회 (offset/limit 페이지네이션)"""
+    chunks = await rag_service.get_document_chunks(document_id, offset=offset, limit=limit)
+    if chunks is None:
+        raise HTTPException(status_code=404, detail="문서를 찾을 수 없습니다")
+    return chunks
+
 @router.delete("/{document_id}")
 async def delete_document(
     document_id: str,
@@ -1,250 +1,427 @@
 from .document_store import DocumentStore
 from .document_processor import DocumentProcessor
+from .parser_pool import ParserPool
+from .catalog import CATALOG_COLUMNS, DOCUMENT_FIELDS, SUMMARY_COLUMNS
+from .rerank import relevance_scores, rerank
+from .filters import split_tags, tag_metadata
+from .ingest import IngestCancelled
 from src.core.config import model_settings
+from src.core.metrics import CHUNK_SECONDS, CHUNKS, RERANK_SECONDS, SEARCH_QUERIES, SEARCH_SECONDS, timed_iter
+import asyncio
+import logging
 import hashlib
 from datetime import datetime
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
+
+logger = logging.getLogger(__name__)
 
 class RAGService:
     def __init__(self, openai_api_key: str = None):
-        print(f"RAGService 초기화 (API 키 존재: {bool(openai_api_key)})")
+        logger.debug("RAGService 초기화 (API 키 존재: %s)", bool(openai_api_key))
         self.document_store = DocumentStore(
             persist_directory=model_settings.RAG_PERSIST_DIRECTORY,
             openai_api_key=openai_api_key
         )
         self.processor = DocumentProcessor()
+        self.parser_pool = ParserPool()
         self.config = model_settings.rag_config
+        # 문서가 추가/수정/삭제될 때 호출할 콜백 (원본 파일명을 인자로 받음)
+        self._change_listeners: List[Callable[[str], None]] = []
+
+    @property
+    def has_credentials(self) -> bool:
+        """임베딩 백엔드 사용 가능 여부 (로컬 백엔드는 API 키 불필요)"""
+        return self.document_store.has_credentials
+
+    def set_openai_api_key(self, api_key: str):
+        """공유 인스턴스의 API 키 교체"""
+        self.document_store.set_openai_api_key(api_key)
+
+    async def start(self):
+        """앱 시작 시 Chroma 클라이언트/컬렉션을 미리 열고 BM25 색인 생성을 시작"""
+        await asyncio.to_thread(self.document_store.open)
+        self.document_store.build_lexical_index()
+
+    async def close(self):
+        """앱 종료 시 리소스 정리"""
+        self.parser_pool.close()
+        await self.document_store.close()
+
+    def add_change_listener(self, listener: Callable[[str], None]):
+        """문서 변경 알림 등록 (응답 캐시 무효화 등)"""
+        self._change_listeners.append(listener)
+
+    def _notify_changed(self, source: str):
+        for listener in self._change_listeners:
+            try:
+                listener(source)
+            except Exception as e:
+                logger.warning("문서 변경 알림 처리 중 오류: %s", e)
+
+    def embedding_cache_stats(self) -> Dict:
+        """임베딩 캐시 적중/미스 통계"""
+        cache = self.document_store.embedding_cache
+        return cache.stats() if cache else {"enabled": False}
     
-    async def add_document(self, file_content: bytes, filename: str, file_type: str):
+    async def add_document(self, file_content: bytes = None, filename: str = None, file_type: str = None,
+                           job=None, file_path: str = None, file_hash: str = None):
+        """문서 처리 및 저장
+
+        페이지를 하나씩 파싱하면서 바로 청크로 나누고, 일정 개수가 모일 때마다 임베딩 후
+        저장하므로 메모리 사용량이 파일 크기와 무관하고 앞부분부터 검색 가능해진다.
+        청크 ID는 (파일명, 청크 내용)의 해시이므로 같은 파일명을 다시 올리면 바뀐 청크만
+        임베딩하고 사라진 청크만 삭제한다. 파일 해시까지 같으면 아무 작업도 하지 않는다.
+        job(IngestJob)이 주어지면 진행 상황을 기록한다. 중단된 작업은 이미 저장된 청크가
+        그대로 재사용되므로 이어서 처리된다. file_path가 주어지면 파싱 워커가 파일을 직접 읽는다.
+        """
         try:
-            print(f"1. 파일 처리 시작: {filename}")
-            # 파일 처리
-            if file_type == "application/pdf":
-                texts = self.processor.process_pdf(file_content)
-            elif file_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-                texts = self.processor.process_docx(file_content)
-            elif file_type == "text/plain":
-                texts = self.processor.process_txt(file_content)
-            else:
-                raise ValueError("지원하지 않는 파일 형식입니다")
-            
-            print(f"2. 텍스트 추출 완료: {len(texts)} 개의 텍스트")
+            logger.info("파일 처리 시작: %s", filename)
+            source = file_path or file_content
+            if file_hash is None and file_content is not None:
+                file_hash = hashlib.sha256(file_content).hexdigest()
+            timestamp = job.created_at if job else datetime.now().isoformat()
             
-            # 청크 분할
-            chunks = []
-            for text in texts:
-                chunks.extend(self.processor.chunk_text(text))
+            # 같은 파일명으로 저장된 기존 청크
+            existing = await asyncio.to_thread(self.document_store.get_source_chunks, filename)
+            if file_hash and existing and all(
+                metadata.get("file_hash") == file_hash and metadata.get("status") == "completed"
+                for metadata in existing.values()
+            ):
+                logger.info("변경 사항 없음: %s (청크 %d개 재사용)", filename, len(existing))
+                if self.document_store.catalog.get_document(filename) is None:
+                    await asyncio.to_thread(self.document_store.catalog.sync_source, filename, existing)
+                if job:
+                    job.update(chunks_total=len(existing), chunks_reused=len(existing))
+                return
             
-            print(f"3. 청크 분할 완료: {len(chunks)} 개의 청크")
+            # 사용자가 지정한 문서 메타데이터는 새 청크에도 유지
+            document_fields = {key: "" for key in DOCUMENT_FIELDS}
+            if existing:
+                first = min(existing.values(), key=lambda metadata: metadata.get("chunk_id", 0))
+                document_fields = {key: first.get(key, "") for key in document_fields}
+            # 태그는 필터로 걸러지도록 태그별 키로도 저장
+            tag_fields = tag_metadata(split_tags(document_fields["tags"]))
             
-            # 현재 타임스탬프를 문서 ID에 포함
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-            base_doc_id = f"{filename}_{timestamp}"
+            page_count = await self.parser_pool.page_count(source, file_type)
+            if job:
+                job.update(pages_total=page_count or 0, pages_parsed=0, chunks_reused=0)
             
-            # 문서 저장
-            documents = []
+            batch_size = self.config["ingest_batch_size"]
             ids = []
-            for i, chunk in enumerate(chunks):
-                # 타임스탬프가 포함된 고유한 ID 생성
-                doc_id = hashlib.md5(f"{base_doc_id}_{i}".encode()).hexdigest()
-                documents.append({
-                    "content": chunk,
-                    "metadata": {
+            sizes = []
+            seen = set()
+            reused = 0
+            batch_documents = []
+            batch_ids = []
+            pages = 0
+            
+            # 페이지 단위 파싱 -> 청크 분할 -> 새 청크만 배치 단위 임베딩/저장
+            async for text in self.parser_pool.iter_pages(source, file_type, page_count):
+                if job:
+                    job.check_cancelled()
+                for chunk in timed_iter(self.processor.iter_chunks(text), CHUNK_SECONDS):
+                    CHUNKS.inc()
+                    doc_id = hashlib.md5(f"{filename}\0{chunk}".encode()).hexdigest()
+                    if doc_id in seen:
+                        continue
+                    seen.add(doc_id)
+                    ids.append(doc_id)
+                    sizes.append(len(chunk))
+                    if doc_id in existing:
+                        reused += 1
+                        continue
+                    metadata = {
                         "source": filename,
-                        "chunk_id": i,
-                        "timestamp": datetime.now().isoformat(),
-                        "status": "completed",
-                        "category": "",
-                        "description": "",
-                        "tags": ""
+                        "chunk_id": len(ids) - 1,
+                        "timestamp": timestamp,
+                        "status": "processing",
+                        "size": len(chunk),
+                        **document_fields,
+                        **tag_fields
                     }
-                })
-                ids.append(doc_id)
+                    if job:
+                        metadata["job_id"] = job.id
+                    batch_documents.append({"content": chunk, "metadata": metadata})
+                    batch_ids.append(doc_id)
+                    if len(batch_documents) >= batch_size:
+                        await self._store_batch(filename, batch_documents, batch_ids, job)
+                        batch_documents, batch_ids = [], []
+                pages += 1
+                if job:
+                    job.update(pages_parsed=pages, chunks_total=len(ids), chunks_reused=reused)
             
-            print(f"4. 문서 저장 시작: {len(documents)} 개의 문서")
-            await self.document_store.add_documents(documents, ids)
-            print("5. 문서 저장 완료")
+            if batch_documents:
+                await self._store_batch(filename, batch_documents, batch_ids, job)
+            if job:
+                job.check_cancelled()
+            logger.info("페이지 %d개, 청크 %d개 처리 완료 (재사용 %d개)", pages, len(ids), reused)
             
+            # 순서/상태 갱신 후 새 버전에서 사라진 청크만 삭제
+            if ids:
+                await asyncio.to_thread(
+                    self.document_store.update_metadata,
+                    ids,
+                    [
+                        {"chunk_id": i, "status": "completed", "timestamp": timestamp,
+                         "file_hash": file_hash or "", "size": sizes[i]}
+                        for i in range(len(ids))
+                    ]
+                )
+            stale = [doc_id for doc_id in existing if doc_id not in seen]
+            if stale:
+                await asyncio.to_thread(self.document_store.delete_ids, stale)
+            await asyncio.to_thread(
+                self.document_store.catalog.put_document,
+                filename,
+                [(doc_id, i, size) for i, (doc_id, size) in enumerate(zip(ids, sizes))],
+                timestamp=timestamp,
+                status="completed",
+                file_hash=file_hash or "",
+                **document_fields
+            )
+            if job:
+                job.update(pages_total=pages)
+            self._notify_changed(filename)
+            logger.info("문서 저장 완료: %s (삭제된 청크 %d개)", filename, len(stale))
+            
+        except IngestCancelled:
+            raise
         except Exception as e:
-            print(f"문서 처리 중 오류 발생: {str(e)}")
+            logger.error("문서 처리 중 오류 발생: %s", e)
             raise
+
+    async def _store_batch(self, source: str, documents: List[Dict], ids: List[str], job=None):
+        if job:
+            job.check_cancelled()
+        await self.document_store.add_documents(documents, ids, progress=job)
+        first = documents[0]["metadata"]
+        await asyncio.to_thread(
+            self.document_store.catalog.add_chunks,
+            source,
+            [(doc_id, doc["metadata"]["chunk_id"], doc["metadata"]["size"]) for doc_id, doc in zip(ids, documents)],
+            timestamp=first["timestamp"],
+            **{key: first[key] for key in DOCUMENT_FIELDS}
+        )
+
+    def resync_source(self, source: str):
+        """컬렉션에 남아 있는 청크 기준으로 문서 카탈로그 갱신 (수집 취소/실패 후 정리용)"""
+        self.document_store.catalog.sync_source(source, self.document_store.get_source_chunks(source))
+        self._notify_changed(source)
     
-    async def search(self, query: str, top_k: int = None):
+    async def embed_query(self, query: str) -> List[float]:
+        """검색 질의 임베딩 (검색 전에 미리 계산해 재사용할 때 사용)"""
+        return await self.document_store.embed_query(query)
+
+    @property
+    def search_mode(self) -> str:
+        return self.config["search_mode"]
+
+    def needs_query_embedding(self, mode: str = None) -> bool:
+        """검색 모드가 질의 임베딩을 사용하는지 여부 (lexical은 임베딩 없이 검색)"""
+        return (mode or self.search_mode) != "lexical"
+
+    async def search(self, query: str, top_k: int = None, query_embedding: List[float] = None, mode: str = None,
+                     filters: Optional[Dict] = None):
+        """검색 후 재정렬 단계 적용
+
+        rerank_enabled이면 rerank_fetch_k개를 가져와 거의 같은 청크를 제거하고, 같은 문서의
+        연속된 청크를 합친 뒤 MMR로 서로 다른 내용의 top_k개를 고른다.
+        """
+        results = await self.search_many(
+            [query], top_k, mode=mode, filters=filters,
+            query_embeddings=[query_embedding] if query_embedding is not None else None
+        )
+        return results[0]
+
+    async def search_many(self, queries: List[str], top_k: int = None, mode: str = None,
+                          filters: Optional[Dict] = None, query_embeddings: List[List[float]] = None) -> List[List[Dict]]:
+        """여러 질의를 한 번에 검색 - 임베딩 요청과 Chroma 조회를 질의 수와 무관하게 한 번씩만 수행"""
         if top_k is None:
             top_k = self.config["top_k"]
-        return await self.document_store.search(query, top_k) 
+        mode = mode or self.search_mode
+        SEARCH_QUERIES.inc(len(queries), mode=mode)
+        with SEARCH_SECONDS.time(mode=mode):
+            if query_embeddings is None and self.needs_query_embedding(mode):
+                query_embeddings = await self.document_store.embed_queries(queries)
+            if not self.config["rerank_enabled"]:
+                return await self.document_store.search_many(
+                    queries, top_k, query_embeddings=query_embeddings, mode=mode, filters=filters
+                )
+            candidate_lists = await self.document_store.search_many(
+                queries, max(top_k, self.config["rerank_fetch_k"]),
+                query_embeddings=query_embeddings, mode=mode, include_embeddings=True, filters=filters
+            )
+            with RERANK_SECONDS.time():
+                if len(candidate_lists) == 1:
+                    return [self._rerank(candidate_lists[0], top_k, mode)]
+                # 질의가 많으면 재정렬 연산이 이벤트 루프를 오래 잡지 않도록 스레드에서 수행
+                return await asyncio.to_thread(
+                    lambda: [self._rerank(candidates, top_k, mode) for candidates in candidate_lists]
+                )
+
+    def _rerank(self, candidates: List[Dict], top_k: int, mode: str) -> List[Dict]:
+        return rerank(
+            candidates,
+            relevance_scores(candidates, mode),
+            top_k,
+            lambda_mult=self.config["mmr_lambda"],
+            duplicate_threshold=self.config["duplicate_threshold"],
+            merge_max_chunks=self.config["merge_max_chunks"],
+            max_overlap=self.config["chunk_size"]
+        )
+
+    async def filter_facets(self) -> Dict:
+        """검색 필터로 쓸 수 있는 카테고리/태그와 각각의 문서/청크 수"""
+        return await asyncio.to_thread(self.document_store.catalog.filter_facets)
+
+    def lexical_index_stats(self) -> Dict:
+        return self.document_store.lexical_index.stats()
 
     async def get_documents(self) -> List[Dict]:
-        """저장된 모든 문서의 메타데이터 조회 - 원본 문서별로 그룹화"""
+        """저장된 모든 문서의 메타데이터 조회 (문서 카탈로그 기준, 청크 본문 제외)"""
         try:
-            if not self.document_store._openai_api_key:
-                print("API 키가 설정되지 않아 빈 목록을 반환합니다.")
-                return []
-            
-            if not self.document_store.collection:
-                print("문서 컬렉션이 초기화되지 않았습니다.")
-                return []
-            
-            results = self.document_store.collection.get()
-            if not results or not results.get('ids'):
-                print("저장된 문서가 없습니다.")
-                return []
-            
-            # 원본 문서별로 청크를 그룹화
-            documents_by_source = {}
-            for i, metadata in enumerate(results['metadatas']):
-                source = metadata['source']
-                if source not in documents_by_source:
-                    documents_by_source[source] = {
-                        'source': source,
-                        'timestamp': metadata['timestamp'],
-                        'status': metadata['status'],
-                        'category': metadata.get('category', ''),
-                        'description': metadata.get('description', ''),
-                        'tags': metadata.get('tags', ''),
-                        'chunks': []
-                    }
-                
-                documents_by_source[source]['chunks'].append({
-                    'id': results['ids'][i],
-                    'chunk_id': metadata['chunk_id'],
-                    'content': results['documents'][i],
-                    'metadata': metadata
-                })
-            
-            # 청크 ID로 정렬하여 반환
+            documents = await asyncio.to_thread(self.document_store.catalog.list_documents)
             return [
                 {
-                    'id': list(doc['chunks'])[0]['id'],  # 첫 번째 청크의 ID를 문서 ID로 사용
-                    'metadata': {
-                        'source': doc['source'],
-                        'timestamp': doc['timestamp'],
-                        'status': doc['status'],
-                        'category': doc['category'],
-                        'description': doc['description'],
-                        'tags': doc['tags']
-                    },
-                    'chunks': sorted(doc['chunks'], key=lambda x: x['chunk_id'])
+                    'id': doc['document_id'],
+                    'metadata': {key: doc[key] for key in ('source', 'timestamp', 'status', *DOCUMENT_FIELDS)},
+                    'chunk_count': doc['chunk_count'],
+                    'char_count': doc['char_count']
                 }
-                for doc in documents_by_source.values()
+                for doc in documents
             ]
-            
         except Exception as e:
-            print(f"문서 조회 중 오류: {str(e)}")
+            logger.error("문서 조회 중 오류: %s", e)
             return []
 
     async def delete_document(self, document_id: str) -> bool:
-        """문서 삭제 - 관련된 모든 청크 삭제"""
+        """문서 삭제 - 카탈로그에 기록된 청크 ID만 삭제
+
+        document_id는 문서 ID 또는 문서에 속한 아무 청크의 ID이다.
+        """
         try:
-            # 먼저 해당 문서의 정보를 가져옴
-            results = self.document_store.collection.get(ids=[document_id])
-            if not results['ids']:
+            catalog = self.document_store.catalog
+            source_file = await asyncio.to_thread(catalog.resolve, document_id)
+            if source_file is None:
                 return False
+            logger.info("삭제 시작: 문서 '%s'", source_file)
             
-            # 원본 파일명 확인
-            source_file = results['metadatas'][0]['source']
-            print(f"삭제 시작: 문서 '{source_file}'")
-            
-            # 같은 원본 파일을 가진 모든 청크 검색
-            all_results = self.document_store.collection.get()
-            chunk_ids_to_delete = []
-            
-            for i, metadata in enumerate(all_results['metadatas']):
-                if metadata['source'] == source_file:
-                    chunk_ids_to_delete.append(all_results['ids'][i])
-            
-            # 모든 관련 청크 삭제
+            chunk_ids_to_delete = await asyncio.to_thread(catalog.chunk_ids, source_file)
             if chunk_ids_to_delete:
-                print(f"삭제할 청크 수: {len(chunk_ids_to_delete)}")
-                self.document_store.collection.delete(ids=chunk_ids_to_delete)
-                
-                # 삭제 확인
-                remaining = self.document_store.collection.get(
-                    ids=chunk_ids_to_delete
-                )
-                if not remaining['ids']:
-                    print(f"문서 '{source_file}'의 모든 청크가 성공적으로 삭제되었습니다.")
-                else:
-                    print(f"경고: {len(remaining['ids'])}개의 청크가 삭제되지 않았습니다.")
-            
+                logger.debug("삭제할 청크 수: %d", len(chunk_ids_to_delete))
+                await asyncio.to_thread(self.document_store.delete_ids, chunk_ids_to_delete)
+            await asyncio.to_thread(catalog.delete_source, source_file)
+            self._notify_changed(source_file)
+            logger.info("문서 '%s'의 모든 청크가 삭제되었습니다", source_file)
             return True
         except Exception as e:
-            print(f"문서 삭제 중 오류: {str(e)}")
+            logger.error("문서 삭제 중 오류: %s", e)
             raise
 
     async def update_document_metadata(self, document_id: str, updates: dict) -> bool:
-        """문서 메타데이터 업데이트"""
+        """문서 메타데이터 업데이트 - 문서의 모든 청크에 같은 값을 기록"""
         try:
-            # 현재 문서 정보 조회
-            results = self.document_store.collection.get(ids=[document_id])
-            if not results['ids']:
+            catalog = self.document_store.catalog
+            source_file = await asyncio.to_thread(catalog.resolve, document_id)
+            if source_file is None:
                 return False
             
-            # 현재 메타데이터 가져오기
-            current_metadata = results['metadatas'][0]
-            
             # 업데이트할 필드만 갱신
+            fields = {}
             for key, value in updates.items():
-                if value is not None:
+                if value is not None and key in DOCUMENT_FIELDS:
                     if key == 'tags':
                         # 태그 리스트를 쉼표로 구분된 문자열로 변환
-                        current_metadata[key] = ','.join(value) if value else ''
+                        fields[key] = ','.join(split_tags(value))
                     else:
-                        current_metadata[key] = value
+                        fields[key] = value
+            if not fields:
+                return True
             
-            # 메타데이터 업데이트
-            self.document_store.collection.update(
-                ids=[document_id],
-                metadatas=[current_metadata]
-            )
+            chunk_fields = fields
+            if 'tags' in fields:
+                # 태그별 키를 새 태그로 교체 (빠진 태그의 키는 삭제)
+                document = await asyncio.to_thread(catalog.get_document, source_file)
+                previous = document["tags"] if document else ""
+                chunk_fields = {**fields, **tag_metadata(split_tags(fields['tags']), split_tags(previous))}
+            
+            chunk_ids = await asyncio.to_thread(catalog.chunk_ids, source_file)
+            if chunk_ids:
+                await asyncio.to_thread(
+                    self.document_store.update_metadata,
+                    chunk_ids,
+                    [chunk_fields] * len(chunk_ids)
+                )
+            await asyncio.to_thread(catalog.update_document, source_file, fields)
+            self._notify_changed(source_file)
             return True
         except Exception as e:
-            print(f"메타데이터 업데이트 중 오류: {str(e)}")
+            logger.error("메타데이터 업데이트 중 오류: %s", e)
             raise
 
-    async def list_documents(self):
-        """저장된 문서 목록 반환"""
-        try:
-            documents = await self.document_store.get_documents()
-            
-            # 원본 문서별로 그룹화
-            documents_by_source = {}
-            for doc in documents:
-                source = doc['metadata']['source']
-                if source not in documents_by_source:
-                    documents_by_source[source] = {
-                        'source': source,
-                        'timestamp': doc['metadata']['timestamp'],
-                        'status': doc['metadata'].get('status', 'completed'),
-                        'category': doc['metadata'].get('category', ''),
-                        'description': doc['metadata'].get('description', ''),
-                        'tags': doc['metadata'].get('tags', ''),
-                        'chunks': []
-                    }
-                
-                documents_by_source[source]['chunks'].append({
-                    'id': doc['id'],
-                    'chunk_id': doc['metadata']['chunk_id'],
-                    'content': doc['content']
-                })
-            
-            # 결과 포맷팅
-            result = [
+    async def list_documents(self, limit: int = 20, cursor: str = None, sort: str = "timestamp",
+                             order: str = "desc", category: str = None, tag: str = None,
+                             since: str = None, until: str = None, summary: bool = False) -> Dict:
+        """문서 목록 한 페이지 (카탈로그만 조회하므로 청크 본문은 포함하지 않음)
+
+        summary가 참이면 ID, 파일명, 상태, 청크 수/크기만 반환한다.
+        청크 본문은 get_document_chunks로 문서별로 따로 조회한다.
+        """
+        if order not in ("asc", "desc"):
+            raise ValueError(f"지원하지 않는 정렬 방향입니다: {order}")
+        documents, next_cursor = await asyncio.to_thread(
+            self.document_store.catalog.query_documents,
+            limit=limit, cursor=cursor, sort=sort, descending=order != "asc",
+            category=category, tag=tag, since=since, until=until
+        )
+        columns = SUMMARY_COLUMNS if summary else CATALOG_COLUMNS
+        return {
+            "documents": [self._format_document(doc, columns) for doc in documents],
+            "count": len(documents),
+            "next_cursor": next_cursor
+        }
+
+    @staticmethod
+    def _format_document(doc: Dict, columns) -> Dict:
+        data = {column: doc[column] for column in columns if column != "document_id"}
+        return {"id": doc["document_id"], **data}
+
+    async def get_document(self, document_id: str) -> Optional[Dict]:
+        """문서 하나의 메타데이터 (문서 ID 또는 청크 ID로 조회)"""
+        catalog = self.document_store.catalog
+        source = await asyncio.to_thread(catalog.resolve, document_id)
+        if source is None:
+            return None
+        doc = await asyncio.to_thread(catalog.get_document, source)
+        if doc is None:
+            return None
+        return {
+            **self._format_document(doc, CATALOG_COLUMNS),
+            "metadata": {key: doc[key] for key in ("source", "timestamp", "status", *DOCUMENT_FIELDS)}
+        }
+
+    async def get_document_chunks(self, document_id: str, offset: int = 0, limit: int = 50) -> Optional[Dict]:
+        """문서의 청크 본문을 순서대로 일부만 조회"""
+        catalog = self.document_store.catalog
+        source = await asyncio.to_thread(catalog.resolve, document_id)
+        if source is None:
+            return None
+        doc = await asyncio.to_thread(catalog.get_document, source)
+        chunk_ids = await asyncio.to_thread(catalog.chunk_ids, source, offset, limit)
+        chunks = await asyncio.to_thread(self.document_store.get_chunks, chunk_ids)
+        total = doc["chunk_count"] if doc else len(chunk_ids)
+        next_offset = offset + len(chunk_ids)
+        return {
+            "id": doc["document_id"] if doc else document_id,
+            "source": source,
+            "chunks": [
                 {
-                    'source': doc['source'],
-                    'timestamp': doc['timestamp'],
-                    'status': doc['status'],
-                    'category': doc['category'],
-                    'description': doc['description'],
-                    'tags': doc['tags'],
-                    'chunks': sorted(doc['chunks'], key=lambda x: x['chunk_id'])
+                    "id": chunk["id"],
+                    "chunk_id": chunk["metadata"].get("chunk_id", offset + i),
+                    "content": chunk["content"]
                 }
-                for doc in documents_by_source.values()
-            ]
-            
-            print(f"조회된 원본 문서 수: {len(result)}")
-            return result
-            
-        except Exception as e:
-            print(f"문서 목록 조회 중 오류 발생: {str(e)}")
-            return []
\ No newline at end of file
+                for i, chunk in enumerate(chunks)
+            ],
+            "total": total,
+            "next_offset": next_offset if next_offset < total else None
+        }
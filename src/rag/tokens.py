@@ -0,0 +1,3 @@
+def estimate_tokens(text: str) -> int:
+    """토큰 수 근사치 (UTF-8 3바이트당 1토큰, 한글/영문 모두 보수적으로 추정)"""
+    return len(text.encode('utf-8')) // 3 + 1
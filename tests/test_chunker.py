@@ -0,0 +1,24 @@
+"""청크 분할 (구분자 없는 긴 텍스트도 오버랩을 유지하는지)"""
+from src.rag.chunker import TextChunker
+
+def test_oversized_text_keeps_overlap():
+    text = "".join(str(i % 10) for i in range(5000))
+    chunks = list(TextChunker(1000, 200).iter_chunks(text))
+    assert all(len(chunk) <= 1000 for chunk in chunks)
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous[-200:] == current[:200]
+    # 겹친 부분을 빼고 이으면 원문과 같음
+    assert chunks[0] + "".join(chunk[200:] for chunk in chunks[1:]) == text
+
+def test_oversized_text_without_overlap():
+    text = "a" * 2500
+    chunks = list(TextChunker(1000, 0).iter_chunks(text))
+    assert [len(chunk) for chunk in chunks] == [1000, 1000, 500]
+
+def test_oversized_token_chunks_fit_budget():
+    text = "".join(chr(0xAC00 + i) for i in range(3000))
+    chunker = TextChunker(300, 60, unit="tokens")
+    chunks = list(chunker.iter_chunks(text))
+    assert all(chunker._size(chunk) <= 300 for chunk in chunks)
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous[-45:] == current[:45]
@@ -0,0 +1,45 @@
+"""대화 기록 생략 (drop_step 정렬이 가장 최근 턴까지 버리지 않는지)"""
+from src.chat.context import ContextBuilder
+
+MODEL_CONFIG = {"input_token_budget": 250, "system_prompt": "문서를 참고해 답하세요.\n\n{context}"}
+
+def make_history(count, chars=180):
+    """턴 하나가 약 130토큰인 대화 기록"""
+    history = []
+    for i in range(count):
+        history += [
+            {"role": "user", "content": f"{i}" + "a" * chars},
+            {"role": "assistant", "content": f"{i}" + "b" * chars},
+        ]
+    return history
+
+def build(history, drop_step=4):
+    builder = ContextBuilder(rag_ratio=0.5, summary_tokens=60, default_budget=250, drop_step=drop_step)
+    return builder.build(MODEL_CONFIG, "질문", history)
+
+def test_keeps_latest_turn_when_turns_within_drop_step():
+    history = make_history(2)
+    window = build(history)
+    assert window["history_turns"] == 1
+    assert window["dropped_turns"] == 1
+    assert [message["role"] for message in window["messages"]] == ["system", "user", "assistant", "user"]
+    assert window["messages"][1]["content"] == history[2]["content"]
+    assert window["input_tokens"] <= window["budget"]
+
+def test_keeps_latest_turn_when_alignment_would_drop_all():
+    # 6턴 중 1턴만 들어갈 때 경계 5를 4의 배수(8)로 올리면 전부 버려짐
+    window = build(make_history(6))
+    assert window["history_turns"] == 1
+    assert window["dropped_turns"] == 5
+
+def test_drops_all_when_latest_turn_does_not_fit():
+    window = build(make_history(2, chars=600))
+    assert window["history_turns"] == 0
+    assert window["dropped_turns"] == 2
+    assert [message["role"] for message in window["messages"]] == ["system", "user"]
+
+def test_drop_boundary_aligned_to_drop_step():
+    # 작은 턴이 많으면 경계를 drop_step 배수로 맞춰 더 많이 버림
+    window = build(make_history(10, chars=30), drop_step=4)
+    assert window["dropped_turns"] % 4 == 0
+    assert window["history_turns"] >= 1
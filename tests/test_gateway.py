@@ -0,0 +1,86 @@
+"""제공자 게이트웨이 재시도 (백오프 중 자리 반환, 재시도마다 한도 적용)"""
+import asyncio
+import time
+import pytest
+from src.core.gateway import ProviderGateway
+
+class RateLimited(Exception):
+    status_code = 429
+
+def make_gateway(**limits) -> ProviderGateway:
+    return ProviderGateway("test", max_queue=10, max_retries=2, retry_base_seconds=0.2, retry_max_seconds=0.2, **limits)
+
+def test_backoff_releases_slot(monkeypatch):
+    # 지터 없이 최대 백오프(0.2초)로 고정
+    monkeypatch.setattr("src.core.gateway.random.uniform", lambda low, high: high)
+    gateway = make_gateway(max_concurrency=1)
+    finished = {}
+
+    async def flaky():
+        if "first" not in finished:
+            finished["first"] = time.monotonic()
+            raise RateLimited()
+        return "retried"
+
+    async def other():
+        finished["other"] = time.monotonic()
+        return "other"
+
+    async def main():
+        retried = asyncio.create_task(gateway.call(flaky))
+        await asyncio.sleep(0.01)
+        # 첫 호출이 백오프하는 동안 다른 호출이 자리를 얻음
+        assert await asyncio.wait_for(gateway.call(other), 0.1) == "other"
+        assert await retried == "retried"
+
+    asyncio.run(main())
+    assert gateway.retries == 1
+    assert gateway.throttled == 1
+    assert gateway.in_flight == 0
+
+def test_retry_takes_from_request_bucket():
+    # 분당 2회 - 첫 호출과 재시도가 각각 한 번씩 꺼내므로 세 번째 호출은 한도에 막힘
+    gateway = make_gateway(requests_per_minute=2)
+    attempts = []
+
+    async def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise RateLimited()
+        return "ok"
+
+    async def main():
+        assert await gateway.call(flaky) == "ok"
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(gateway.call(flaky), 0.3)
+
+    asyncio.run(main())
+    assert len(attempts) == 2
+
+def test_session_keeps_slot_until_exit():
+    gateway = make_gateway(max_concurrency=1)
+
+    async def open_stream():
+        return "stream"
+
+    async def main():
+        async with gateway.session(open_stream) as stream:
+            assert stream == "stream"
+            assert gateway.in_flight == 1
+        assert gateway.in_flight == 0
+
+    asyncio.run(main())
+
+def test_non_retryable_error_releases_slot():
+    gateway = make_gateway(max_concurrency=1)
+
+    async def broken():
+        raise ValueError("bad request")
+
+    async def main():
+        with pytest.raises(ValueError):
+            await gateway.call(broken)
+
+    asyncio.run(main())
+    assert gateway.in_flight == 0
+    assert gateway.retries == 0
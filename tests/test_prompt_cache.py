@@ -0,0 +1,111 @@
+"""프롬프트 캐시 요청 구성과 캐시 토큰 집계 (네트워크 없이 기록된 응답으로 확인)"""
+import json
+from anthropic.types import Usage as AnthropicUsage
+from openai.types import CompletionUsage
+from src.chat.context import ContextBuilder
+from src.chat.prompt_cache import CACHE_CONTROL, UsageTracker, anthropic_usage, build_anthropic_request, openai_usage
+
+MODEL_CONFIG = {
+    "input_token_budget": 16000,
+    "system_prompt": "당신은 문서를 참고해 답하는 도우미입니다.\n\n{context}"
+}
+
+def build_turn(history, question, documents):
+    builder = ContextBuilder(rag_ratio=0.5, summary_tokens=300, default_budget=16000, drop_step=4)
+    window = builder.build(MODEL_CONFIG, question, history, documents)
+    return build_anthropic_request(window["messages"], cache=True)
+
+def two_turns():
+    """첫 턴과, 첫 턴의 질문/답변이 기록된 다음 턴 (턴마다 검색 문서가 다름)"""
+    history = [
+        {"role": "user", "content": "첫 질문"},
+        {"role": "assistant", "content": "첫 답변"},
+    ]
+    first = build_turn(history, "두 번째 질문", [{"content": "검색 문서 A", "metadata": {}}])
+    history += [
+        {"role": "user", "content": "두 번째 질문"},
+        {"role": "assistant", "content": "두 번째 답변"},
+    ]
+    second = build_turn(history, "세 번째 질문", [{"content": "검색 문서 B", "metadata": {}}])
+    return first, second
+
+def serialized(message):
+    """캐시 표시를 뺀 메시지 직렬화 (문자열 content는 텍스트 블록 하나와 같음)"""
+    content = message["content"]
+    if isinstance(content, str):
+        content = [{"type": "text", "text": content}]
+    blocks = [{key: value for key, value in block.items() if key != "cache_control"} for block in content]
+    return json.dumps({"role": message["role"], "content": blocks}, ensure_ascii=False).encode()
+
+def test_system_block_identical_across_turns():
+    first, second = two_turns()
+    assert json.dumps(first["system"], ensure_ascii=False).encode() == json.dumps(second["system"], ensure_ascii=False).encode()
+    # 매 턴 달라지는 검색 문서는 시스템 프롬프트가 아닌 마지막 질문에 들어감
+    assert "검색 문서" not in first["system"][0]["text"]
+    assert "검색 문서 B" in second["messages"][-1]["content"]
+
+def test_cached_prefix_identical_in_next_turn():
+    first, second = two_turns()
+    # 첫 턴의 캐시 구간(body[-2]까지)이 다음 턴 앞부분과 바이트 단위로 같아야 캐시에서 읽힘
+    prefix = first["messages"][:-1]
+    assert [serialized(message) for message in prefix] == [serialized(message) for message in second["messages"][:len(prefix)]]
+
+def test_cache_control_on_system_and_previous_message():
+    first, second = two_turns()
+    for request in (first, second):
+        assert request["system"][0]["cache_control"] == CACHE_CONTROL
+        body = request["messages"]
+        assert body[-2]["content"][-1]["cache_control"] == CACHE_CONTROL
+        # 캐시 표시는 시스템 블록과 body[-2] 두 곳뿐
+        marked = [message for message in body if not isinstance(message["content"], str)]
+        assert marked == [body[-2]]
+        assert isinstance(body[-1]["content"], str)
+
+def test_no_cache_control_when_disabled():
+    messages = [
+        {"role": "system", "content": "시스템"},
+        {"role": "user", "content": "질문"},
+        {"role": "assistant", "content": "답변"},
+        {"role": "user", "content": "다음 질문"},
+    ]
+    request = build_anthropic_request(messages, cache=False)
+    assert "cache_control" not in request["system"][0]
+    assert all(isinstance(message["content"], str) for message in request["messages"])
+
+def test_first_turn_marks_only_system():
+    request = build_anthropic_request([{"role": "system", "content": "시스템"}, {"role": "user", "content": "질문"}])
+    assert request["system"][0]["cache_control"] == CACHE_CONTROL
+    assert request["messages"] == [{"role": "user", "content": "질문"}]
+
+# 기록된 Anthropic 응답 usage (첫 턴은 캐시 기록, 다음 턴은 캐시 읽기)
+ANTHROPIC_CACHE_WRITE = {"input_tokens": 21, "cache_creation_input_tokens": 1800, "cache_read_input_tokens": 0, "output_tokens": 120}
+ANTHROPIC_CACHE_READ = {"input_tokens": 35, "cache_creation_input_tokens": 0, "cache_read_input_tokens": 1800, "output_tokens": 95}
+
+# 기록된 OpenAI 스트림 마지막 청크 usage
+OPENAI_CACHED = {
+    "prompt_tokens": 2006, "completion_tokens": 300, "total_tokens": 2306,
+    "prompt_tokens_details": {"cached_tokens": 1920, "audio_tokens": 0}
+}
+OPENAI_UNCACHED = {"prompt_tokens": 900, "completion_tokens": 80, "total_tokens": 980}
+
+def test_anthropic_usage_counts_cache_reads_and_writes():
+    written = anthropic_usage(AnthropicUsage.model_validate(ANTHROPIC_CACHE_WRITE))
+    assert written == {"input_tokens": 1821, "cached_input_tokens": 0, "cache_write_tokens": 1800, "output_tokens": 120}
+    read = anthropic_usage(AnthropicUsage.model_validate(ANTHROPIC_CACHE_READ))
+    assert read == {"input_tokens": 1835, "cached_input_tokens": 1800, "cache_write_tokens": 0, "output_tokens": 95}
+
+def test_openai_usage_counts_cached_prompt_tokens():
+    cached = openai_usage(CompletionUsage.model_validate(OPENAI_CACHED))
+    assert cached == {"input_tokens": 2006, "cached_input_tokens": 1920, "cache_write_tokens": 0, "output_tokens": 300}
+    uncached = openai_usage(CompletionUsage.model_validate(OPENAI_UNCACHED))
+    assert uncached["cached_input_tokens"] == 0
+
+def test_usage_tracker_hit_rate():
+    tracker = UsageTracker()
+    tracker.record("claude", anthropic_usage(AnthropicUsage.model_validate(ANTHROPIC_CACHE_WRITE)))
+    tracker.record("claude", anthropic_usage(AnthropicUsage.model_validate(ANTHROPIC_CACHE_READ)))
+    stats = tracker.stats()["claude"]
+    assert stats["requests"] == 2
+    assert stats["cached_input_tokens"] == 1800
+    assert stats["uncached_input_tokens"] == 1821 + 1835 - 1800
+    assert stats["cache_hit_rate"] == 1800 / (1821 + 1835)